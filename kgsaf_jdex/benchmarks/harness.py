@@ -0,0 +1,487 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+import rdflib
+import torch
+from rdflib import URIRef
+
+import kgsaf_jdex.utils.conventions.paths as pc
+from kgsaf_jdex.loaders.pytorch.dataset import KnowledgeGraph
+from kgsaf_jdex.loaders.pytorch.index import ANY
+from kgsaf_jdex.utils.conversion import OWLConverter
+from kgsaf_jdex.utils.graph_cache import parse_graph
+from kgsaf_jdex.utils.modularization import SchemaDecomposer, SignatureModularizer
+from kgsaf_jdex.utils.synthetic import SYNTHETIC_CONFIG, SyntheticDataset
+from kgsaf_jdex.utils.utility import peak_memory, reset_peak_memory
+
+RESULTS_VERSION = 1
+
+# Dataset sizes, in number of triples
+
+SCALES = [10_000, 100_000, 1_000_000, 10_000_000, 50_000_000]
+
+# Benchmark groups, each one runs in its own process
+
+BENCHMARKS = ["kg_load", "kg_queries", "owl_preprocess", "schema_decompose", "signature_modularize"]
+
+# Groups parsing the OWL files of the ABox with rdflib, only run up to `rdf_limit` triples
+
+RDF_BENCHMARKS = ["owl_preprocess"]
+
+# Number of IDs, URIs or triples given to each query
+
+QUERY_SIZE = 1024
+
+# Size of the signatures extracted by the modularizer
+
+SIGNATURE_SIZE = 10
+
+# Query methods of KnowledgeGraph, called on every input for single item methods and on the
+# whole batch for batched ones
+
+QUERIES: Dict[str, Callable[[KnowledgeGraph, dict], object]] = {
+    "individual_to_id": lambda kg, x: [kg.individual_to_id(uri) for uri in x["individual_uris"]],
+    "class_to_id": lambda kg, x: [kg.class_to_id(uri) for uri in x["class_uris"]],
+    "obj_prop_to_id": lambda kg, x: [kg.obj_prop_to_id(uri) for uri in x["obj_prop_uris"]],
+    "id_to_individual": lambda kg, x: [kg.id_to_individual(id) for id in x["individual_list"]],
+    "id_to_class": lambda kg, x: [kg.id_to_class(id) for id in x["class_list"]],
+    "id_to_obj_prop": lambda kg, x: [kg.id_to_obj_prop(id) for id in x["obj_prop_list"]],
+    "individuals.encode": lambda kg, x: kg.individuals.encode(x["individual_uris"]),
+    "individuals.decode": lambda kg, x: kg.individuals.decode(x["individuals"]),
+    "individual_classes": lambda kg, x: [kg.individual_classes(id) for id in x["individual_list"]],
+    "class_individuals": lambda kg, x: [kg.class_individuals(id) for id in x["class_list"]],
+    "sup_classes": lambda kg, x: [kg.sup_classes(id) for id in x["class_list"]],
+    "sub_classes": lambda kg, x: [kg.sub_classes(id) for id in x["class_list"]],
+    "is_leaf": lambda kg, x: [kg.is_leaf(id) for id in x["class_list"]],
+    "sup_obj_prop": lambda kg, x: [kg.sup_obj_prop(id) for id in x["obj_prop_list"]],
+    "sub_obj_prop": lambda kg, x: [kg.sub_obj_prop(id) for id in x["obj_prop_list"]],
+    "obj_prop_domain": lambda kg, x: [kg.obj_prop_domain(id) for id in x["obj_prop_list"]],
+    "obj_prop_range": lambda kg, x: [kg.obj_prop_range(id) for id in x["obj_prop_list"]],
+    "domain_obj_props": lambda kg, x: [kg.domain_obj_props(id) for id in x["class_list"]],
+    "range_obj_props": lambda kg, x: [kg.range_obj_props(id) for id in x["class_list"]],
+    "individual_classes_batch": lambda kg, x: kg.individual_classes_batch(x["individuals"]),
+    "class_individuals_batch": lambda kg, x: kg.class_individuals_batch(x["classes"]),
+    "sup_classes_batch": lambda kg, x: kg.sup_classes_batch(x["classes"]),
+    "sub_classes_batch": lambda kg, x: kg.sub_classes_batch(x["classes"]),
+    "is_leaf_batch": lambda kg, x: kg.is_leaf_batch(x["classes"]),
+    "sup_obj_prop_batch": lambda kg, x: kg.sup_obj_prop_batch(x["obj_props"]),
+    "sub_obj_prop_batch": lambda kg, x: kg.sub_obj_prop_batch(x["obj_props"]),
+    "obj_prop_domain_batch": lambda kg, x: kg.obj_prop_domain_batch(x["obj_props"]),
+    "obj_prop_range_batch": lambda kg, x: kg.obj_prop_range_batch(x["obj_props"]),
+    "domain_obj_props_batch": lambda kg, x: kg.domain_obj_props_batch(x["classes"]),
+    "range_obj_props_batch": lambda kg, x: kg.range_obj_props_batch(x["classes"]),
+    "match": lambda kg, x: kg.match(x["patterns"]),
+    "known_triples.contains": lambda kg, x: kg.known_triples.contains(x["triples"]),
+    "known_triples.filter_mask": lambda kg, x: kg.known_triples.filter_mask(
+        x["triples"][:, 0], x["triples"][:, 1], None
+    ),
+}
+
+
+def _measure(name: str, function: Callable[[], object], repeats: int) -> dict:
+    """Time a function over some repeats, with the peak memory of the process while running it
+
+    Args:
+        name (str): Benchmark name
+        function (Callable[[], object]): Function to be measured
+        repeats (int): Number of runs
+
+    Returns:
+        dict: Benchmark record, with the time of each run and their minimum and median in seconds, and the peak memory in bytes
+    """
+    seconds = []
+    peak = None
+    for _ in range(repeats):
+        reset_peak_memory()
+        start = time.perf_counter()
+        function()
+        seconds.append(time.perf_counter() - start)
+        run_peak = peak_memory()
+        if run_peak is not None:
+            peak = run_peak if peak is None else max(peak, run_peak)
+
+    return {
+        "benchmark": name,
+        "seconds": seconds,
+        "min": min(seconds),
+        "median": statistics.median(seconds),
+        "peak_memory": peak,
+    }
+
+
+def _query_inputs(kg: KnowledgeGraph, size: int, seed: int) -> dict:
+    generator = torch.Generator().manual_seed(seed)
+    individuals = torch.randint(kg.num_individuals, (size,), generator=generator)
+    classes = torch.randint(kg.num_classes, (size,), generator=generator)
+    obj_props = torch.randint(kg.num_obj_props, (size,), generator=generator)
+    triples = kg.train[torch.randint(len(kg.train), (size,), generator=generator)].to(torch.int64)
+
+    # Half of the patterns bind subject and predicate, half predicate and object
+    patterns = triples.clone()
+    patterns[: size // 2, 2] = ANY
+    patterns[size // 2 :, 0] = ANY
+
+    return {
+        "individuals": individuals,
+        "classes": classes,
+        "obj_props": obj_props,
+        "individual_list": individuals.tolist(),
+        "class_list": classes.tolist(),
+        "obj_prop_list": obj_props.tolist(),
+        "individual_uris": kg.individuals.decode(individuals),
+        "class_uris": kg.classes.decode(classes),
+        "obj_prop_uris": kg.obj_props.decode(obj_props),
+        "triples": triples,
+        "patterns": patterns,
+    }
+
+
+# Benchmark Groups
+
+
+def _bench_kg_load(path: Path, repeats: int) -> List[dict]:
+    return [
+        _measure("kg_load/no_cache", lambda: KnowledgeGraph(path, cache=False), repeats),
+        _measure("kg_load/cache_build", lambda: KnowledgeGraph(path, rebuild_cache=True), repeats),
+        _measure("kg_load/cached", lambda: KnowledgeGraph(path), repeats),
+        _measure("kg_load/lazy", lambda: KnowledgeGraph(path, lazy=True), repeats),
+        _measure("kg_load/build_indexes", lambda: KnowledgeGraph(path, build_indexes=True), repeats),
+    ]
+
+
+def _bench_kg_queries(path: Path, repeats: int) -> List[dict]:
+    kg = KnowledgeGraph(path, rebuild_cache=True, build_indexes=True)
+    inputs = _query_inputs(kg, QUERY_SIZE, seed=0)
+
+    # The schema indexes and closures are built with the graph, the pattern and known triple
+    # indexes on first access, measured on their own
+    records = [
+        _measure("kg_queries/pattern_index_build", lambda: kg.pattern_index(), 1),
+        _measure("kg_queries/known_triples_build", lambda: kg.known_triples, 1),
+    ]
+    for name, query in QUERIES.items():
+        records.append(_measure(f"kg_queries/{name}", lambda: query(kg, inputs), repeats))
+    return records
+
+
+def _bench_owl_preprocess(path: Path, repeats: int) -> List[dict]:
+    def preprocess(cache: bool):
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            OWLConverter(path, cache=cache).preprocess(verbose=False)
+
+    # The graph cache is filled by the first run, the following ones hit it
+    return [
+        _measure("owl_preprocess/no_cache", lambda: preprocess(False), repeats),
+        _measure("owl_preprocess/cache_build", lambda: preprocess(True), 1),
+        _measure("owl_preprocess/cached", lambda: preprocess(True), repeats),
+    ]
+
+
+def _bench_schema_decompose(path: Path, repeats: int) -> List[dict]:
+    schema = parse_graph(path / pc.ONTOLOGY)
+    return [
+        _measure(
+            "schema_decompose",
+            lambda: SchemaDecomposer(schema).decompose(verbose=False),
+            repeats,
+        )
+    ]
+
+
+def _bench_signature_modularize(path: Path, repeats: int) -> List[dict]:
+    schema = parse_graph(path / pc.ONTOLOGY)
+    with open(path / pc.CLASS_MAPPINGS, "r") as f:
+        classes = sorted(json.load(f))
+
+    rng = random.Random(0)
+    signatures = [
+        {URIRef(uri) for uri in rng.sample(classes, min(SIGNATURE_SIZE, len(classes)))}
+        for _ in range(QUERY_SIZE // SIGNATURE_SIZE)
+    ]
+
+    return [
+        _measure(
+            "signature_modularize",
+            lambda: SignatureModularizer(schema, signatures[0]).modularize(verbose=False),
+            repeats,
+        ),
+        _measure(
+            "signature_modularize/many",
+            lambda: SignatureModularizer(schema).modularize_many(signatures),
+            repeats,
+        ),
+    ]
+
+
+BENCHMARK_GROUPS: Dict[str, Callable[[Path, int], List[dict]]] = {
+    "kg_load": _bench_kg_load,
+    "kg_queries": _bench_kg_queries,
+    "owl_preprocess": _bench_owl_preprocess,
+    "schema_decompose": _bench_schema_decompose,
+    "signature_modularize": _bench_signature_modularize,
+}
+
+
+def _run_group(name: str, path: Path, repeats: int) -> List[dict]:
+    return BENCHMARK_GROUPS[name](path, repeats)
+
+
+# Runner
+
+
+def environment() -> dict:
+    """Versions, hardware and commit the benchmarks are run with
+
+    Returns:
+        dict: Environment description
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=Path(__file__).parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "rdflib": rdflib.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def synthetic_dataset(path: Path, dataset: SyntheticDataset, verbose: bool = True) -> Path:
+    """Generate a synthetic dataset, unless the folder already holds one with the same
+    configuration
+
+    Args:
+        path (Path): Dataset folder
+        dataset (SyntheticDataset): Dataset generator
+        verbose (bool, optional): Log printing. Defaults to True.
+
+    Returns:
+        Path: Dataset folder
+    """
+    try:
+        with open(path / SYNTHETIC_CONFIG, "r") as f:
+            if json.load(f) == dataset.config:
+                return path
+    except (OSError, ValueError):
+        pass
+
+    if verbose:
+        print(f"Generating synthetic dataset with {dataset.num_triples} triples at {path}")
+    return dataset.generate(path)
+
+
+def run_benchmarks(
+    work_path: str,
+    scales: Iterable[int] = SCALES,
+    benchmarks: Iterable[str] = BENCHMARKS,
+    repeats: int = 3,
+    rdf_limit: Optional[int] = 1_000_000,
+    isolated: bool = True,
+    dataset_options: Optional[dict] = None,
+    verbose: bool = True,
+) -> dict:
+    """Run the benchmarks on synthetic datasets of increasing size. Every benchmark group runs
+    in a new process, so that its peak memory and timings are not affected by the previous
+    ones.
+
+    Args:
+        work_path (str): Folder where the synthetic datasets are generated, and kept for the next runs
+        scales (Iterable[int], optional): Number of triples of each dataset. Defaults to SCALES.
+        benchmarks (Iterable[str], optional): Benchmark groups to be run, see `BENCHMARKS`. Defaults to BENCHMARKS.
+        repeats (int, optional): Number of runs of each benchmark. Defaults to 3.
+        rdf_limit (Optional[int], optional): Largest scale `RDF_BENCHMARKS` are run on, since rdflib parsing dominates them, no limit if None. Defaults to 1_000_000.
+        isolated (bool, optional): Run every group in its own process. Defaults to True.
+        dataset_options (Optional[dict], optional): Other arguments of `SyntheticDataset`. Defaults to None.
+        verbose (bool, optional): Log printing. Defaults to True.
+
+    Raises:
+        ValueError: If a benchmark group is unknown
+
+    Returns:
+        dict: Results, with the environment and one record for each benchmark and scale
+    """
+    benchmarks = list(benchmarks)
+    unknown = set(benchmarks) - set(BENCHMARKS)
+    if unknown:
+        raise ValueError(f"Unknown benchmarks {sorted(unknown)}, available benchmarks are {BENCHMARKS}")
+
+    results = {
+        "version": RESULTS_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(),
+        "environment": environment(),
+        "repeats": repeats,
+        "results": [],
+    }
+
+    for scale in scales:
+        dataset = SyntheticDataset(scale, **(dataset_options or {}))
+        path = synthetic_dataset(Path(work_path) / f"synthetic-{scale}", dataset, verbose)
+
+        for group in benchmarks:
+            if group in RDF_BENCHMARKS and rdf_limit is not None and scale > rdf_limit:
+                continue
+
+            if isolated:
+                context = multiprocessing.get_context("spawn")
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    records = executor.submit(_run_group, group, path, repeats).result()
+            else:
+                records = _run_group(group, path, repeats)
+
+            for record in records:
+                record.update(
+                    scale=scale,
+                    num_triples=dataset.num_triples,
+                    num_individuals=dataset.num_individuals,
+                )
+                results["results"].append(record)
+                if verbose:
+                    print(_format_record(record))
+
+    return results
+
+
+def _format_record(record: dict) -> str:
+    peak = record["peak_memory"]
+    peak = f"{peak / 2**20:.1f} MiB" if peak is not None else "n/a"
+    return f"{record['scale']:>10} {record['benchmark']}: {record['min']:.4f}s, peak memory {peak}"
+
+
+# Results
+
+
+def write_results(results: dict, path: str):
+    """Write benchmark results as JSON
+
+    Args:
+        results (dict): Results of `run_benchmarks`
+        path (str): JSON file location
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(results, f, indent=4)
+
+
+def read_results(path: str) -> dict:
+    """Read benchmark results written by `write_results`
+
+    Args:
+        path (str): JSON file location
+
+    Raises:
+        ValueError: If the results were written by a different version of the harness
+
+    Returns:
+        dict: Results
+    """
+    with open(path, "r") as f:
+        results = json.load(f)
+    if results.get("version") != RESULTS_VERSION:
+        raise ValueError(f"Unsupported benchmark results version {results.get('version')}")
+    return results
+
+
+def compare_results(baseline: dict, current: dict, tolerance: float = 0.1) -> List[dict]:
+    """Compare the minimum time and peak memory of the benchmarks found in both results
+
+    Args:
+        baseline (dict): Reference results, e.g. of the previous commit
+        current (dict): New results
+        tolerance (float, optional): Relative increase of time or memory reported as a regression. Defaults to 0.1.
+
+    Returns:
+        List[dict]: Comparison of each benchmark and scale, with the ratios of current to baseline values
+    """
+    reference = {(r["benchmark"], r["scale"]): r for r in baseline["results"]}
+
+    comparison = []
+    for record in current["results"]:
+        old = reference.get((record["benchmark"], record["scale"]))
+        if old is None:
+            continue
+
+        time_ratio = record["min"] / old["min"] if old["min"] > 0 else None
+        memory_ratio = None
+        if old["peak_memory"] and record["peak_memory"] is not None:
+            memory_ratio = record["peak_memory"] / old["peak_memory"]
+
+        comparison.append(
+            {
+                "benchmark": record["benchmark"],
+                "scale": record["scale"],
+                "baseline": old["min"],
+                "current": record["min"],
+                "time_ratio": time_ratio,
+                "memory_ratio": memory_ratio,
+                "regression": any(
+                    ratio is not None and ratio > 1 + tolerance
+                    for ratio in (time_ratio, memory_ratio)
+                ),
+            }
+        )
+    return comparison
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark kgsaf_jdex on synthetic datasets")
+    parser.add_argument("--work-dir", default="benchmarks", help="Folder of the synthetic datasets")
+    parser.add_argument("--output", default=None, help="JSON results file")
+    parser.add_argument("--scales", type=int, nargs="+", default=SCALES, help="Numbers of triples")
+    parser.add_argument("--benchmarks", nargs="+", default=BENCHMARKS, choices=BENCHMARKS)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--rdf-limit", type=int, default=1_000_000, help="Largest scale of the rdflib bound benchmarks, 0 for no limit")
+    parser.add_argument("--compare", default=None, help="Baseline JSON results to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(
+        args.work_dir,
+        scales=args.scales,
+        benchmarks=args.benchmarks,
+        repeats=args.repeats,
+        rdf_limit=args.rdf_limit or None,
+    )
+
+    if args.output is not None:
+        write_results(results, args.output)
+
+    if args.compare is not None:
+        regressions = 0
+        for row in compare_results(read_results(args.compare), results, args.tolerance):
+            time_ratio = f"{row['time_ratio']:.2f}x" if row["time_ratio"] is not None else "n/a"
+            memory_ratio = f"{row['memory_ratio']:.2f}x" if row["memory_ratio"] is not None else "n/a"
+            flag = " REGRESSION" if row["regression"] else ""
+            print(f"{row['scale']:>10} {row['benchmark']}: time {time_ratio}, memory {memory_ratio}{flag}")
+            regressions += row["regression"]
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
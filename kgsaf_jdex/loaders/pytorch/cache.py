@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import torch
+
+from kgsaf_jdex.utils.archive import ArchivePath
+from kgsaf_jdex.utils.utility import file_hash
+
+CACHE_VERSION = 1
+
+
+def write_tensor(path: Path, tensor: torch.Tensor):
+    """Write a tensor as a raw binary file (native byte order), atomically replacing the file
+
+    Args:
+        path (Path): File location
+        tensor (torch.Tensor): Tensor to be written, empty tensors write no file
+    """
+    tensor = tensor.detach().cpu().contiguous()
+    if tensor.numel() == 0:
+        return
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "wb") as f:
+        f.truncate(tensor.numel() * tensor.element_size())
+    mapped = torch.from_file(str(tmp_path), shared=True, size=tensor.numel(), dtype=tensor.dtype)
+    mapped.copy_(tensor.view(-1))
+    del mapped
+    os.replace(tmp_path, path)
+
+
+def read_tensor(path: Path, shape: Sequence[int], dtype: torch.dtype) -> torch.Tensor:
+    """Open a raw binary file written by `write_tensor` as a read-only memory map
+
+    Args:
+        path (Path): File location
+        shape (Sequence[int]): Tensor shape
+        dtype (torch.dtype): Tensor dtype
+
+    Raises:
+        RuntimeError: If the file is missing or too short
+
+    Returns:
+        torch.Tensor: Memory-mapped tensor
+    """
+    numel = 1
+    for dim in shape:
+        numel *= dim
+
+    if numel == 0:
+        return torch.empty(tuple(shape), dtype=dtype)
+
+    tensor = torch.from_file(str(path), shared=False, size=numel, dtype=dtype)
+    return tensor.view(tuple(shape))
+
+
+class KnowledgeGraphCache:
+    """Persistent cache of KnowledgeGraph tensors stored as raw memory-mapped binary files.
+
+    Every tensor is written as a contiguous binary file (native byte order) next to a JSON manifest.
+    The manifest records shape and dtype of each tensor together with a fingerprint (size, mtime
+    and content hash) of every source file it was computed from. A cached tensor is returned only
+    if all its sources are unchanged, otherwise it is considered stale and must be rebuilt.
+    """
+
+    def __init__(self, cache_path: str, source_path: str):
+        """Initialize the cache, reading the manifest if it exists
+
+        Args:
+            cache_path (str): Cache folder location
+            source_path (str): Folder or dataset archive against which source file names are resolved
+        """
+        self.cache_path = Path(cache_path)
+        self.source_path = (
+            source_path if isinstance(source_path, ArchivePath) else Path(source_path)
+        )
+        self.manifest_path = self.cache_path / "manifest.json"
+        self.manifest = self._read_manifest()
+        self._hashes = {}
+
+    # Manifest Handling
+
+    def _read_manifest(self) -> dict:
+        try:
+            with open(self.manifest_path, "r") as manifest_json:
+                manifest = json.load(manifest_json)
+        except (OSError, ValueError):
+            manifest = None
+
+        if manifest is None or manifest.get("version") != CACHE_VERSION:
+            manifest = {"version": CACHE_VERSION, "tensors": {}}
+
+        return manifest
+
+    def _write_manifest(self):
+        self.cache_path.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as manifest_json:
+            json.dump(self.manifest, manifest_json, indent=4)
+        os.replace(tmp_path, self.manifest_path)
+
+    # Source Fingerprinting
+
+    def _stat(self, source: str) -> Optional[dict]:
+        try:
+            stat = (self.source_path / source).stat()
+        except FileNotFoundError:
+            return None
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def _hash(self, source: str, stat: dict) -> str:
+        key = (source, stat["size"], stat["mtime_ns"])
+        if key not in self._hashes:
+            self._hashes[key] = file_hash(self.source_path / source)
+        return self._hashes[key]
+
+    def _fingerprint(self, source: str) -> Optional[dict]:
+        stat = self._stat(source)
+        if stat is not None:
+            stat["hash"] = self._hash(source, stat)
+        return stat
+
+    def _is_fresh(self, source: str, recorded: Optional[dict]) -> bool:
+        """Check a source file against its recorded fingerprint. Size and mtime are compared
+        first, the content is hashed again only if the mtime changed but the size did not.
+
+        Args:
+            source (str): Source file name, relative to the source path
+            recorded (Optional[dict]): Fingerprint recorded in the manifest, None if the file was missing
+
+        Returns:
+            bool: True if the file content is the one recorded in the manifest
+        """
+        stat = self._stat(source)
+
+        if recorded is None or stat is None:
+            return recorded is None and stat is None
+        if stat["size"] != recorded["size"]:
+            return False
+        if stat["mtime_ns"] == recorded["mtime_ns"]:
+            return True
+        if self._hash(source, stat) != recorded["hash"]:
+            return False
+
+        # Touched but unchanged file, remember the new mtime to skip hashing next time
+        recorded["mtime_ns"] = stat["mtime_ns"]
+        try:
+            self._write_manifest()
+        except OSError:
+            pass
+        return True
+
+    # Tensor Access
+
+    def entry_path(self, name: str) -> Path:
+        """Location of the binary file backing a cached tensor
+
+        Args:
+            name (str): Cached tensor name
+
+        Returns:
+            Path: Binary file path
+        """
+        return self.cache_path / f"{name}.bin"
+
+    def _is_valid(self, entry: Optional[dict], deltas: Optional[List[str]]) -> bool:
+        return (
+            entry is not None
+            and entry.get("deltas", []) == list(deltas or [])
+            and all(
+                self._is_fresh(source, recorded)
+                for source, recorded in entry["sources"].items()
+            )
+        )
+
+    def get(self, name: str, deltas: Optional[List[str]] = None) -> Optional[torch.Tensor]:
+        """Open a cached tensor as a read-only memory map, if present and not stale
+
+        Args:
+            name (str): Cached tensor name
+            deltas (Optional[List[str]], optional): Names of the deltas the tensor must include, in order. Defaults to None.
+
+        Returns:
+            Optional[torch.Tensor]: Memory-mapped tensor, None if missing or stale
+        """
+        entry = self.manifest["tensors"].get(name)
+
+        if not self._is_valid(entry, deltas):
+            return None
+
+        try:
+            return read_tensor(self.entry_path(name), entry["shape"], getattr(torch, entry["dtype"]))
+        except RuntimeError:
+            return None
+
+    def put(
+        self,
+        name: str,
+        tensor: torch.Tensor,
+        sources: Iterable[str],
+        deltas: Optional[List[str]] = None,
+    ):
+        """Write a tensor to the cache, recording the fingerprint of its sources
+
+        Args:
+            name (str): Cached tensor name
+            tensor (torch.Tensor): Tensor to be stored
+            sources (Iterable[str]): Source file names the tensor was computed from
+            deltas (Optional[List[str]], optional): Names of the deltas included in the tensor. Defaults to None.
+        """
+        self.cache_path.mkdir(parents=True, exist_ok=True)
+        write_tensor(self.entry_path(name), tensor)
+
+        self.manifest["tensors"][name] = {
+            "shape": list(tensor.shape),
+            "dtype": str(tensor.dtype).replace("torch.", ""),
+            "sources": {source: self._fingerprint(source) for source in sources},
+            **({"deltas": list(deltas)} if deltas else {}),
+        }
+        self._write_manifest()
+
+    def append(
+        self, name: str, rows: torch.Tensor, applied: List[str], deltas: List[str]
+    ) -> bool:
+        """Append rows to a cached tensor in place, writing only the new rows. The tensor must
+        be fresh and include exactly the `applied` deltas, its binary file is extended and
+        the manifest records the new shape and deltas.
+
+        Args:
+            name (str): Cached tensor name
+            rows (torch.Tensor): Rows to be appended, same trailing shape and dtype of the tensor
+            applied (List[str]): Names of the deltas the tensor includes
+            deltas (List[str]): Names of the deltas the tensor includes after the append
+
+        Returns:
+            bool: True if the rows were appended, False if the tensor is missing, stale or incompatible
+        """
+        entry = self.manifest["tensors"].get(name)
+        if not self._is_valid(entry, applied):
+            return False
+
+        rows = rows.detach().cpu().contiguous()
+        shape = entry["shape"]
+        numel = 1
+        for dim in shape:
+            numel *= dim
+
+        if numel == 0:
+            shape = list(rows.shape)
+        elif shape[1:] != list(rows.shape[1:]) or entry["dtype"] != str(rows.dtype).replace("torch.", ""):
+            return False
+        else:
+            shape = [shape[0] + rows.shape[0], *shape[1:]]
+
+        if rows.numel() > 0:
+            path = self.entry_path(name)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "ab") as f:
+                f.truncate((numel + rows.numel()) * rows.element_size())
+            mapped = torch.from_file(
+                str(path), shared=True, size=numel + rows.numel(), dtype=rows.dtype
+            )
+            mapped[numel:].copy_(rows.view(-1))
+            del mapped
+
+        entry["shape"] = shape
+        entry["dtype"] = str(rows.dtype).replace("torch.", "")
+        if deltas:
+            entry["deltas"] = list(deltas)
+        self._write_manifest()
+        return True
+
+    def clear(self):
+        """Remove every cached tensor and reset the manifest"""
+        for name in list(self.manifest["tensors"]):
+            self.entry_path(name).unlink(missing_ok=True)
+        self.manifest = {"version": CACHE_VERSION, "tensors": {}}
+        self._write_manifest()
+
+    @property
+    def entries(self) -> Dict[str, dict]:
+        return self.manifest["tensors"]
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+
+from typing import Optional, Tuple
+
+import torch
+
+from kgsaf_jdex.loaders.pytorch.index import CSRIndex, sorted_isin
+
+
+class HierarchyClosure:
+    """Transitive closure of a hierarchy of integer IDs, such as the class taxonomy or the
+    object property hierarchy. The closure is stored as the sorted packed keys of all its
+    (descendant, ancestor) pairs, with CSR indexes for the ancestors and descendants of a node.
+
+    When a root is given (e.g. `idc.THING` for the taxonomy), every node without parents is
+    attached to it, so that the root is an ancestor of every other node.
+    """
+
+    def __init__(
+        self,
+        edges: torch.Tensor,
+        num_nodes: int,
+        root: Optional[int] = None,
+        closure: Optional[torch.Tensor] = None,
+    ):
+        """Build the closure of the direct (child, parent) edges of the hierarchy
+
+        Args:
+            edges (torch.Tensor): Direct (child, parent) edges (N, 2)
+            num_nodes (int): Number of nodes, IDs range in [0, num_nodes) plus the root
+            root (Optional[int], optional): Root ID, ancestor of every node. Defaults to None.
+            closure (Optional[torch.Tensor], optional): Precomputed (descendant, ancestor) pairs (e.g. from `pairs`), skips the closure computation. Defaults to None.
+        """
+        edges = edges.to(torch.int64).reshape(-1, 2)
+
+        self.root = root
+        self.num_nodes = num_nodes
+        lowest = [0]
+        if root is not None:
+            lowest.append(root)
+        if len(edges) > 0:
+            lowest.append(int(edges.min()))
+
+        self.offset = -min(lowest)
+        self.width = max(num_nodes, int(edges.max()) + 1 if len(edges) else 0) + self.offset
+
+        if root is not None:
+            edges = self._attach_root(edges)
+
+        self.edges = edges
+        self._parents = CSRIndex.from_pairs(edges, offset=self.offset, num_rows=self.width)
+
+        if closure is None:
+            self.keys = self._compute_closure()
+        else:
+            self.keys = torch.sort(self._pack(*closure.to(torch.int64).reshape(-1, 2).T)).values
+
+        a, b = self._unpack(self.keys)
+        self._ancestors = CSRIndex(a, b, offset=self.offset, num_rows=self.width)
+        self._descendants = CSRIndex(b, a, offset=self.offset, num_rows=self.width)
+        self._depth = self._compute_depth()
+
+    # Construction
+
+    def _pack(self, a: torch.Tensor, b: torch.Tensor) -> torch.Tensor:
+        return (a + self.offset) * self.width + (b + self.offset)
+
+    def _unpack(self, keys: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        return keys // self.width - self.offset, keys % self.width - self.offset
+
+    def _attach_root(self, edges: torch.Tensor) -> torch.Tensor:
+        has_parent = torch.zeros(self.width, dtype=torch.bool)
+        has_parent[edges[:, 0] + self.offset] = True
+        nodes = torch.arange(self.width) - self.offset
+        orphans = nodes[~has_parent & (nodes != self.root)]
+        return torch.cat([edges, torch.stack([orphans, torch.full_like(orphans, self.root)], dim=1)])
+
+    def _compute_closure(self) -> torch.Tensor:
+        """Semi-naive fixpoint: at every round only the pairs found in the previous round are
+        joined with the direct edges.
+
+        Returns:
+            torch.Tensor: Sorted packed keys of the closure pairs
+        """
+        keys = torch.unique(self._pack(self.edges[:, 0], self.edges[:, 1]))
+        delta = keys
+
+        while len(delta) > 0:
+            a, b = self._unpack(delta)
+            parents, offsets = self._parents.batch(b)
+            rows = torch.repeat_interleave(torch.arange(len(delta)), offsets.diff())
+            new = torch.unique(self._pack(a[rows], parents))
+            delta = new[~sorted_isin(new, keys)]
+            keys = torch.sort(torch.cat([keys, delta])).values
+
+        return keys
+
+    def _compute_depth(self) -> torch.Tensor:
+        """Length of the shortest path from each node to a root of the hierarchy
+
+        Returns:
+            torch.Tensor: Depth of each node, indexed by ID + offset
+        """
+        child = self.edges[:, 0] + self.offset
+        parent = self.edges[:, 1] + self.offset
+
+        unreachable = self.width + 1
+        roots = self._parents.degree(torch.arange(self.width) - self.offset) == 0
+        depth = torch.where(roots, 0, unreachable)
+
+        while True:
+            update = depth.scatter_reduce(0, child, depth[parent] + 1, reduce="amin")
+            if torch.equal(update, depth):
+                return depth
+            depth = update
+
+    # Queries
+
+    @property
+    def pairs(self) -> torch.Tensor:
+        """All (descendant, ancestor) pairs of the closure (K, 2)"""
+        return torch.stack(self._unpack(self.keys), dim=1)
+
+    def is_subclass(self, a_ids: torch.Tensor, b_ids: torch.Tensor) -> torch.Tensor:
+        """Check if each node of `a_ids` is equal to or a descendant of the corresponding node of `b_ids`
+
+        Args:
+            a_ids (torch.Tensor): Descendant candidates
+            b_ids (torch.Tensor): Ancestor candidates, broadcastable to `a_ids`
+
+        Returns:
+            torch.Tensor: Boolean mask
+        """
+        a_ids, b_ids = torch.broadcast_tensors(
+            torch.as_tensor(a_ids, dtype=torch.int64), torch.as_tensor(b_ids, dtype=torch.int64)
+        )
+        valid = (
+            (a_ids + self.offset >= 0)
+            & (a_ids + self.offset < self.width)
+            & (b_ids + self.offset >= 0)
+            & (b_ids + self.offset < self.width)
+        )
+        return (a_ids == b_ids) | (valid & sorted_isin(self._pack(a_ids, b_ids), self.keys))
+
+    def ancestors(
+        self, ids: torch.Tensor, padded: bool = False
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Ancestors of a batch of nodes, see `CSRIndex.batch` for the output format
+
+        Args:
+            ids (torch.Tensor): Node IDs (B,)
+            padded (bool, optional): Return a padded matrix instead of a ragged tensor. Defaults to False.
+
+        Returns:
+            Tuple[torch.Tensor, torch.Tensor]: Ancestor IDs and offsets or mask
+        """
+        return self._ancestors.batch(ids, padded, padding_value=self._padding)
+
+    def descendants(
+        self, ids: torch.Tensor, padded: bool = False
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Descendants of a batch of nodes, see `CSRIndex.batch` for the output format
+
+        Args:
+            ids (torch.Tensor): Node IDs (B,)
+            padded (bool, optional): Return a padded matrix instead of a ragged tensor. Defaults to False.
+
+        Returns:
+            Tuple[torch.Tensor, torch.Tensor]: Descendant IDs and offsets or mask
+        """
+        return self._descendants.batch(ids, padded, padding_value=self._padding)
+
+    def depth(self, ids: torch.Tensor) -> torch.Tensor:
+        """Length of the shortest path from each node to a root. Nodes only reachable through a
+        cycle get a depth greater than the number of nodes.
+
+        Args:
+            ids (torch.Tensor): Node IDs (B,)
+
+        Returns:
+            torch.Tensor: Depths (B,)
+        """
+        return self._depth[torch.as_tensor(ids, dtype=torch.int64) + self.offset]
+
+    def lca(self, a_ids: torch.Tensor, b_ids: torch.Tensor) -> torch.Tensor:
+        """Deepest common ancestor (or self) of each pair of nodes, ties are broken by lowest ID
+
+        Args:
+            a_ids (torch.Tensor): First nodes (B,)
+            b_ids (torch.Tensor): Second nodes (B,)
+
+        Returns:
+            torch.Tensor: Lowest common ancestor IDs (B,), the root or -1 if the nodes have no common ancestor
+        """
+        a_ids = torch.as_tensor(a_ids, dtype=torch.int64).flatten()
+        b_ids = torch.as_tensor(b_ids, dtype=torch.int64).flatten()
+
+        values, offsets = self.ancestors(a_ids)
+        rows = torch.repeat_interleave(torch.arange(len(a_ids)), offsets.diff())
+        rows = torch.cat([torch.arange(len(a_ids)), rows])
+        candidates = torch.cat([a_ids, values])
+
+        common = self.is_subclass(b_ids[rows], candidates)
+        rows, candidates = rows[common], candidates[common]
+
+        # Deepest first, then lowest ID: the first candidate of each row wins
+        score = self.depth(candidates) * (self.width + 1) + (self.width - 1 - (candidates + self.offset))
+        best = torch.full((len(a_ids),), -1, dtype=torch.int64)
+        best = best.scatter_reduce(0, rows, score, reduce="amax")
+
+        out = torch.full((len(a_ids),), self.root if self.root is not None else -1, dtype=torch.int64)
+        found = best >= 0
+        out[found] = self.width - 1 - best[found] % (self.width + 1) - self.offset
+        return out
+
+    @property
+    def _padding(self) -> int:
+        return -self.offset - 1
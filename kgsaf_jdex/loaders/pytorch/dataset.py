@@ -1,119 +1,752 @@
 #!/usr/bin/env python3
 
+import json
+import time
+from collections import Counter
+from itertools import combinations
 from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 
-import json
 import torch
 from rdflib import OWL, URIRef
-from torch.utils.data import Dataset
+from torch.utils.data import DataLoader, Dataset
 
 import kgsaf_jdex.utils.conventions.ids as idc
 import kgsaf_jdex.utils.conventions.paths as pc
+from kgsaf_jdex.loaders.pytorch.cache import KnowledgeGraphCache
+from kgsaf_jdex.loaders.pytorch.closure import HierarchyClosure
+from kgsaf_jdex.loaders.pytorch.delta import (
+    DELTA_SPLITS,
+    DELTA_VOCABULARIES,
+    Delta,
+    delta_name,
+    read_deltas,
+)
+from kgsaf_jdex.loaders.pytorch.index import (
+    PATTERN_ARRAYS,
+    CSRIndex,
+    KnownTripleIndex,
+    TriplePatternIndex,
+)
+from kgsaf_jdex.loaders.pytorch.triples import (
+    UNKNOWN_ID,
+    load_triples,
+    load_triples_concurrently,
+)
+from kgsaf_jdex.loaders.pytorch.views import (
+    TriplesBatchSampler,
+    TriplesDataset,
+    TriplesIterableDataset,
+    TriplesIterableLoader,
+)
+from kgsaf_jdex.loaders.pytorch.vocabulary import ARRAYS, ExtendedVocabulary, Vocabulary
+from kgsaf_jdex.utils.archive import dataset_path, local_path, open_file
+from kgsaf_jdex.utils.instrumentation import PhaseRecorder, get_recorder
+
+# Components that can be loaded independently
+
+COMPONENTS = [
+    "mappings",
+    "train",
+    "test",
+    "valid",
+    "triples",
+    "class_assertions",
+    "taxonomy",
+    "obj_prop_domain_range",
+    "obj_prop_hierarchy",
+]
+
+MAPPINGS = [pc.INDIVIDUAL_MAPPINGS, pc.CLASS_MAPPINGS, pc.OBJ_PROP_MAPPINGS]
+
+# URI vocabularies, with the mapping file they are generated from
+
+VOCABULARIES = {
+    "individuals": pc.INDIVIDUAL_MAPPINGS,
+    "classes": pc.CLASS_MAPPINGS,
+    "obj_props": pc.OBJ_PROP_MAPPINGS,
+}
+
+# ABox triples files, by component name
+
+ABOX_FILES = {
+    "train": pc.TRAIN,
+    "test": pc.TEST,
+    "valid": pc.VALID,
+    "triples": pc.TRIPLES,
+}
+
+# Components extended by the dataset deltas written by `KnowledgeGraph.append`, and cached
+# tensors derived from them
+
+DELTA_COMPONENTS = ["train", "test", "valid", "triples", "class_assertions"]
+
+DELTA_DERIVED = ["known_triples", "taxonomy_closure"]
+
+# Splits the pattern indexes can be built on, any combination of them is accepted
+
+SPLITS = ["train", "valid", "test"]
+
+SPLIT_COMBINATIONS = [
+    list(splits) for size in range(1, len(SPLITS) + 1) for splits in combinations(SPLITS, size)
+]
+
+# CSR indexes built at load time, with the relation they index and whether they are keyed on
+# its second column
+
+INDEXES = {
+    "individual_classes": ("class_assertions", False),
+    "class_individuals": ("class_assertions", True),
+    "sup_classes": ("taxonomy", False),
+    "sub_classes": ("taxonomy", True),
+    "sup_obj_prop": ("obj_prop_hierarchy", False),
+    "sub_obj_prop": ("obj_prop_hierarchy", True),
+    "obj_prop_domain": ("obj_prop_domain", False),
+    "domain_obj_props": ("obj_prop_domain", True),
+    "obj_prop_range": ("obj_prop_range", False),
+    "range_obj_props": ("obj_prop_range", True),
+}
+
+# Dataset files each cached tensor is computed from, a change in any of them invalidates it
+
+CACHE_SOURCES = {
+    "train": [pc.TRAIN, pc.INDIVIDUAL_MAPPINGS, pc.OBJ_PROP_MAPPINGS],
+    "test": [pc.TEST, pc.INDIVIDUAL_MAPPINGS, pc.OBJ_PROP_MAPPINGS],
+    "valid": [pc.VALID, pc.INDIVIDUAL_MAPPINGS, pc.OBJ_PROP_MAPPINGS],
+    "triples": [
+        pc.TRIPLES,
+        pc.TRAIN,
+        pc.TEST,
+        pc.VALID,
+        pc.INDIVIDUAL_MAPPINGS,
+        pc.OBJ_PROP_MAPPINGS,
+    ],
+    "class_assertions": [pc.CLASS_ASSERTIONS, pc.INDIVIDUAL_MAPPINGS, pc.CLASS_MAPPINGS],
+    "taxonomy": [pc.TAXONOMY, pc.CLASS_MAPPINGS],
+    "obj_prop_domain_range": [
+        pc.OBJ_PROP_DOMAIN_RANGE,
+        pc.OBJ_PROP_HIERARCHY,
+        pc.OBJ_PROP_MAPPINGS,
+        pc.CLASS_MAPPINGS,
+    ],
+    "obj_prop_hierarchy": [pc.OBJ_PROP_HIERARCHY, pc.OBJ_PROP_MAPPINGS],
+    "known_triples": [
+        pc.TRIPLES,
+        pc.TRAIN,
+        pc.TEST,
+        pc.VALID,
+        pc.INDIVIDUAL_MAPPINGS,
+        pc.OBJ_PROP_MAPPINGS,
+    ],
+    "taxonomy_closure": [pc.TAXONOMY, pc.CLASS_MAPPINGS],
+    "obj_prop_hierarchy_closure": [pc.OBJ_PROP_HIERARCHY, pc.OBJ_PROP_MAPPINGS],
+    **{
+        f"patterns/{'+'.join(splits)}/{array}": [
+            *(ABOX_FILES[split] for split in splits),
+            pc.INDIVIDUAL_MAPPINGS,
+            pc.OBJ_PROP_MAPPINGS,
+        ]
+        for splits in SPLIT_COMBINATIONS
+        for array in PATTERN_ARRAYS
+    },
+    **{
+        f"vocabulary/{name}/{array}": [file_location]
+        for name, file_location in VOCABULARIES.items()
+        for array in ["blob", *ARRAYS]
+    },
+}
 
 
 class KnowledgeGraph(Dataset):
     def __init__(
         self,
         path: str,
+        components: Optional[Iterable[str]] = None,
+        lazy: bool = False,
+        cache: bool = True,
+        rebuild_cache: bool = False,
+        recorder: Optional[PhaseRecorder] = None,
+        build_indexes: bool = False,
     ):
-        """_summary_
+        """Load a dataset folder or zip archive into PyTorch tensors. Tensors are read from the memory-mapped
+        cache in `paths.KG_CACHE` when it is up to date with the dataset files, otherwise they
+        are parsed from the TSV and JSON files and written to the cache.
+
+        By default every component is loaded at construction. With `lazy=True` nothing is
+        loaded until first accessed, with `components` only the given components (see
+        `COMPONENTS`) are loaded at construction. In both cases, the remaining components are
+        loaded on first access. Indexes and hierarchy closures are built by the first query
+        using them, or at construction with `build_indexes=True`.
+
+        Deltas appended to the dataset with `append`, stored as side files in `paths.DELTAS`,
+        are merged into the loaded components.
+
+        Time, rows and memory of each loading phase (mappings, splits, schema components,
+        indexes) are recorded by `recorder`, see `kgsaf_jdex.utils.instrumentation`.
 
         Args:
-            path (str): _description_
+            path (str): Dataset location path, a folder or a zip archive read without extraction
+            components (Optional[Iterable[str]], optional): Components loaded at construction. Defaults to None.
+            lazy (bool, optional): Load every component on first access. Defaults to False.
+            cache (bool, optional): Read and write the tensor cache. Defaults to True.
+            rebuild_cache (bool, optional): Ignore existing cache content and rebuild it. Defaults to False.
+            recorder (Optional[PhaseRecorder], optional): Phase recorder, the process wide one if None. Defaults to None.
+            build_indexes (bool, optional): Build every index and hierarchy closure at construction. Defaults to False.
         """
 
         super().__init__()
 
-        
+        self.recorder = get_recorder() if recorder is None else recorder
 
         # Dataset BASE Folder
 
-        self.base_path = Path(path).resolve().absolute()
+        self.base_path = dataset_path(path)
+
+        # Tensor Cache
 
-        # Mapping URIS to IDs and Back
+        self._cache = None
+        if cache:
+            self._cache = KnowledgeGraphCache(
+                local_path(self.base_path) / pc.KG_CACHE, self.base_path
+            )
+            if rebuild_cache:
+                self._cache.clear()
 
-        self._individual_to_id = self._load_mappings(pc.INDIVIDUAL_MAPPINGS)
-        self._class_to_id = self._load_mappings(pc.CLASS_MAPPINGS)
-        self._obj_prop_to_id = self._load_mappings(pc.OBJ_PROP_MAPPINGS)
+        # Loaded State, filled on first access
 
-        self._class_to_id[str(OWL.Thing)] = idc.THING
-        self._class_to_id[str("http://schema.org/Thing")] = idc.THING
+        self._mappings = {}
+        self._inverse_mappings = {}
+        self._vocabularies = {}
+        self._components = {}
+        self._indexes = {}
+        self._closures = {}
+        self._known_triples = None
+        self._pattern_indexes = {}
+        self._mapped_files = {}
 
-        self._id_to_individual = {v: k for k, v in self._individual_to_id.items()}
-        self._id_to_class = {v: k for k, v in self._class_to_id.items()}
-        self._id_to_obj_prop = {v: k for k, v in self._obj_prop_to_id.items()}
+        # Dataset Deltas, merged into the loaded components
 
-        # ABox
+        self._deltas = read_deltas(local_path(self.base_path) / pc.DELTAS)
 
-        self._train_triples = self._load_abox_triples(pc.TRAIN)
-        self._test_triples = self._load_abox_triples(pc.TEST)
-        self._valid_triples = self._load_abox_triples(pc.VALID)
+        # Components
 
-        self._class_assertions = self._load_abox_class_assertions()
+        eager = components is None and not lazy
+        components = COMPONENTS if eager else list(components or [])
 
-        # TBox
+        unknown = set(components) - set(COMPONENTS)
+        if unknown:
+            raise ValueError(
+                f"Unknown components {sorted(unknown)}, available components are {COMPONENTS}"
+            )
 
-        self._taxonomy = self._load_tbox_taxonomy()
+        with self.recorder.phase("knowledge_graph") as phase:
+            phase.set(path=str(self.base_path))
+            self._load_components(components)
 
-        # RBox
+            # Indexes and Hierarchy Closures
 
-        self._obj_prop_domain_range = self._load_rbox_domain_range()
-        self._obj_prop_hierarchy = self._load_rbox_hierarchy()
+            if build_indexes:
+                for name in INDEXES:
+                    self.index(name)
+                self._closure("taxonomy")
+                self._closure("obj_prop_hierarchy")
 
     # General Functions
 
     def _warning(self, count):
         print(f"WARNING: {count} complex URIs detected. These classes are skipped during loading.")
 
+    def _unknown_warning(self, file_location: str, unknown: Counter):
+        examples = ", ".join(uri for uri, _ in unknown.most_common(3))
+        print(
+            f"WARNING: {len(unknown)} unknown URIs in {sum(unknown.values())} occurrences detected in {file_location} "
+            f"(e.g. {examples}). Triples containing them are skipped during loading."
+        )
+
+    def _load_components(self, names: Iterable[str]):
+        """Load the given components, skipping the ones already loaded. ABox splits missing
+        from the cache are read concurrently.
+
+        Args:
+            names (Iterable[str]): Component names, see `COMPONENTS`
+        """
+        names = [name for name in names if name not in self._components]
+
+        if "mappings" in names:
+            for name in VOCABULARIES:
+                self._vocabulary(name)
+            self._components["mappings"] = None
+
+        abox = [name for name in names if name in ABOX_FILES]
+        if abox:
+            self._components.update(self._load_abox_splits(abox))
+
+        loaders = {
+            "class_assertions": self._load_abox_class_assertions,
+            "taxonomy": self._load_tbox_taxonomy,
+            "obj_prop_domain_range": self._load_rbox_domain_range,
+            "obj_prop_hierarchy": self._load_rbox_hierarchy,
+        }
+
+        for name in names:
+            if name in loaders:
+                self._components[name] = self._load_cached(name, loaders[name])
+
+    def _component(self, name: str) -> torch.Tensor:
+        if name not in self._components:
+            self._load_components([name])
+        return self._components[name]
+
+    def _mapping(self, file_location: str) -> Dict[str, int]:
+        if file_location not in self._mappings:
+            with self.recorder.phase(f"mapping/{Path(file_location).stem}") as phase:
+                mapping = self._load_mappings(file_location)
+                phase.set(len(mapping))
+            if file_location == pc.CLASS_MAPPINGS:
+                mapping[str(OWL.Thing)] = idc.THING
+                mapping[str("http://schema.org/Thing")] = idc.THING
+            self._mappings[file_location] = mapping
+        return self._mappings[file_location]
+
+    def _inverse_mapping(self, file_location: str) -> Dict[int, str]:
+        if file_location not in self._inverse_mappings:
+            self._inverse_mappings[file_location] = {
+                v: k for k, v in self._mapping(file_location).items()
+            }
+        return self._inverse_mappings[file_location]
+
+    def _vocabulary(self, name: str) -> Vocabulary:
+        if name not in self._vocabularies:
+            with self.recorder.phase(f"mappings/{name}") as phase:
+                vocabulary = self._load_vocabulary(name)
+                self._vocabularies[name] = self._extend_vocabulary(name, vocabulary)
+                phase.set(self._vocabularies[name].num_ids)
+        return self._vocabularies[name]
+
+    def _extend_vocabulary(self, name: str, vocabulary: Vocabulary):
+        """Add the URIs of the deltas to a vocabulary, with the IDs they were assigned
+
+        Args:
+            name (str): Vocabulary name, key of `VOCABULARIES`
+            vocabulary (Vocabulary): Vocabulary generated from the mapping file
+
+        Raises:
+            ValueError: If the IDs of a delta do not follow the vocabulary, i.e. the mappings changed after the delta was written
+
+        Returns:
+            Union[Vocabulary, ExtendedVocabulary]: Vocabulary including the URIs of the deltas
+        """
+        mapping = {}
+        next_id = vocabulary.num_ids
+
+        for delta in self._deltas:
+            uris = delta.uris[name]
+            if uris and delta.first_ids[name] != next_id:
+                raise ValueError(
+                    f"Delta {delta.name} assigns {name} IDs from {delta.first_ids[name]}, expected {next_id}. "
+                    f"The dataset mappings changed after the delta was written."
+                )
+            for uri in uris:
+                mapping[uri] = next_id
+                next_id += 1
+
+        if not mapping:
+            return vocabulary
+        return ExtendedVocabulary(vocabulary, Vocabulary.from_mapping(mapping))
+
+    def _load_vocabulary(self, name: str) -> Vocabulary:
+        """Open a vocabulary from the cache, where its blob is memory-mapped, generating it from
+        the mapping file if it is missing or stale.
+
+        Args:
+            name (str): Vocabulary name, key of `VOCABULARIES`
+
+        Returns:
+            Vocabulary: URI vocabulary
+        """
+        prefix = f"vocabulary/{name}/"
+
+        blob = self._get_cached(prefix + "blob")
+        arrays = {array: self._get_cached(prefix + array) for array in ARRAYS}
+
+        if blob is not None and all(tensor is not None for tensor in arrays.values()):
+            return Vocabulary.from_files(self._cache.entry_path(prefix + "blob"), arrays)
+
+        vocabulary = Vocabulary.from_mapping(self._mapping(VOCABULARIES[name]))
+
+        self._put_cached(prefix + "blob", vocabulary.blob_tensor)
+        for array, tensor in vocabulary.arrays.items():
+            self._put_cached(prefix + array, tensor)
+
+        return vocabulary
+
+    def _get_cached(self, name: str) -> Optional[torch.Tensor]:
+        if self._cache is None:
+            return None
+        tensor = self._cache.get(name, self._cached_deltas(name))
+        if tensor is None and name in DELTA_COMPONENTS and self._deltas:
+            tensor = self._catch_up(name)
+        if tensor is not None:
+            self._mapped_files[name] = self._cache.entry_path(name)
+        return tensor
+
+    def _put_cached(self, name: str, tensor: torch.Tensor):
+        if self._cache is None:
+            return
+        try:
+            self._cache.put(name, tensor, CACHE_SOURCES[name], self._cached_deltas(name))
+            self._mapped_files[name] = self._cache.entry_path(name)
+        except OSError as e:
+            print(f"WARNING: unable to write cache at {self._cache.cache_path} ({e}).")
+
+    def _append_cached(self, name: str, rows: torch.Tensor, applied: List[str]) -> bool:
+        if self._cache is None:
+            return False
+        try:
+            return self._cache.append(name, rows, applied, self.deltas)
+        except OSError as e:
+            print(f"WARNING: unable to write cache at {self._cache.cache_path} ({e}).")
+            return False
+
+    def _cached_deltas(self, name: str) -> List[str]:
+        """Deltas a cached tensor must include: all of them for the ABox components and the
+        tensors derived from them, none for the others"""
+        if name in DELTA_COMPONENTS or name in DELTA_DERIVED or name.startswith("patterns/"):
+            return self.deltas
+        return []
+
+    def _catch_up(self, name: str) -> Optional[torch.Tensor]:
+        """Append to a cached component the rows of the deltas written after it was cached,
+        e.g. by another process
+
+        Args:
+            name (str): Component name, one of `DELTA_COMPONENTS`
+
+        Returns:
+            Optional[torch.Tensor]: Memory-mapped tensor, None if the cached one is missing or stale
+        """
+        entry = self._cache.entries.get(name)
+        if entry is None:
+            return None
+
+        applied = entry.get("deltas", [])
+        if applied != self.deltas[: len(applied)]:
+            return None
+
+        rows = self._delta_rows(name, self._deltas[len(applied) :])
+        if not self._append_cached(name, rows, applied):
+            return None
+        return self._cache.get(name, self.deltas)
+
+    def _load_cached(self, name: str, loader: Callable[[], torch.Tensor]) -> torch.Tensor:
+        """Read a tensor from the cache, falling back to the loader if it is missing or stale.
+
+        Args:
+            name (str): Component name, key of `CACHE_SOURCES`
+            loader (Callable[[], torch.Tensor]): Function parsing the component from the dataset files
+
+        Returns:
+            torch.Tensor: Component tensor
+        """
+        with self.recorder.phase(name) as phase:
+            tensor = self._get_cached(name)
+            source = "cache"
+
+            if tensor is None:
+                tensor = loader()
+                if name in DELTA_COMPONENTS:
+                    tensor = self._concat(tensor, self._delta_rows(name))
+                source = "files"
+                self._put_cached(name, tensor)
+
+            phase.set(len(tensor), source=source)
+
+        return tensor
+
+    def _split_domain_range(self, kind: int) -> torch.Tensor:
+        dm = self.obj_props_domains_range.to(torch.int64).reshape(-1, 3)
+        return dm[dm[:, 1] == kind][:, [0, 2]]
+
+    def _build_index(self, name: str) -> CSRIndex:
+        """Build the CSR index of one direction of a schema or type relation. Indexes keyed on
+        class IDs are shifted by one to store `idc.THING`.
+
+        Args:
+            name (str): Index name, key of `INDEXES`
+
+        Returns:
+            CSRIndex: Relation index
+        """
+        # Relation pairs and ID offset of their first and second column
+        relations = {
+            "class_assertions": (lambda: self.class_assertions, (0, 1)),
+            "taxonomy": (lambda: self.taxonomy, (1, 1)),
+            "obj_prop_hierarchy": (lambda: self.obj_props_hierarchy, (0, 0)),
+            "obj_prop_domain": (lambda: self.obj_props_domain, (0, 1)),
+            "obj_prop_range": (lambda: self.obj_props_range, (0, 1)),
+        }
+
+        relation, reverse = INDEXES[name]
+        pairs, offsets = relations[relation]
+        return CSRIndex.from_pairs(pairs(), reverse=reverse, offset=offsets[int(reverse)])
+
+    def _closure(self, name: str) -> HierarchyClosure:
+        if name not in self._closures:
+            if name == "taxonomy":
+                edges, num_nodes, root = self.taxonomy, self.num_classes, idc.THING
+            else:
+                edges, num_nodes, root = self.obj_props_hierarchy, self.num_obj_props, None
+            with self.recorder.phase(f"closure/{name}") as phase:
+                closure = self._load_closure(f"{name}_closure", edges, num_nodes, root)
+                phase.set(len(closure.pairs))
+            self._closures[name] = closure
+        return self._closures[name]
+
+    def _load_closure(
+        self, name: str, edges: torch.Tensor, num_nodes: int, root: Optional[int] = None
+    ) -> HierarchyClosure:
+        cached = self._get_cached(name)
+        closure = HierarchyClosure(edges, num_nodes, root, closure=cached)
+        if cached is None:
+            self._put_cached(name, closure.pairs)
+        return closure
+
+    def _load_known_triples(self) -> KnownTripleIndex:
+        cached = self._get_cached("known_triples")
+        triples = self.triples if cached is None else None
+        index = KnownTripleIndex(triples, self.num_individuals, self.num_obj_props, keys=cached)
+        if cached is None:
+            self._put_cached("known_triples", index.keys)
+        return index
+
+    def _load_pattern_index(self, splits: List[str]) -> TriplePatternIndex:
+        prefix = f"patterns/{'+'.join(splits)}/"
+        arrays = {array: self._get_cached(prefix + array) for array in PATTERN_ARRAYS}
+
+        if all(tensor is not None for tensor in arrays.values()):
+            return TriplePatternIndex(None, self.num_individuals, self.num_obj_props, arrays)
+
+        triples = torch.cat([self._component(split).reshape(-1, 3) for split in splits])
+        index = TriplePatternIndex(triples, self.num_individuals, self.num_obj_props)
+
+        for array, tensor in index.arrays.items():
+            self._put_cached(prefix + array, tensor)
+
+        return index
+
     def _load_mappings(self, file_location: str):
-        with open(self.base_path / file_location, "r") as map_json:
+        with open_file(self.base_path / file_location, "r") as map_json:
             return json.load(map_json)
 
+    @property
+    def _individual_to_id(self) -> Dict[str, int]:
+        return self._mapping(pc.INDIVIDUAL_MAPPINGS)
+
+    @property
+    def _class_to_id(self) -> Dict[str, int]:
+        return self._mapping(pc.CLASS_MAPPINGS)
+
+    @property
+    def _obj_prop_to_id(self) -> Dict[str, int]:
+        return self._mapping(pc.OBJ_PROP_MAPPINGS)
+
+    @property
+    def _id_to_individual(self) -> Dict[int, str]:
+        return self._inverse_mapping(pc.INDIVIDUAL_MAPPINGS)
+
+    @property
+    def _id_to_class(self) -> Dict[int, str]:
+        return self._inverse_mapping(pc.CLASS_MAPPINGS)
+
+    @property
+    def _id_to_obj_prop(self) -> Dict[int, str]:
+        return self._inverse_mapping(pc.OBJ_PROP_MAPPINGS)
+
+    @property
+    def individuals(self) -> Vocabulary:
+        return self._vocabulary("individuals")
+
+    @property
+    def classes(self) -> Vocabulary:
+        return self._vocabulary("classes")
+
+    @property
+    def obj_props(self) -> Vocabulary:
+        return self._vocabulary("obj_props")
+
+    def _decode(self, vocabulary: Vocabulary, id: int) -> str:
+        uri = vocabulary.decode(torch.tensor([id]))[0]
+        if uri is None:
+            raise KeyError(id)
+        return uri
+
     def individual_to_id(self, individual_uri: str) -> int:
-        return self._individual_to_id[individual_uri]
+        return self.individuals[individual_uri]
 
     def class_to_id(self, class_uri: str) -> int:
-        return self._class_to_id[class_uri]
+        return self.classes[class_uri]
 
     def obj_prop_to_id(self, obj_prop_uri: str) -> int:
-        return self._obj_prop_to_id[obj_prop_uri]
+        return self.obj_props[obj_prop_uri]
 
     def id_to_individual(self, individual_id: int) -> str:
-        return self._id_to_individual[individual_id]
+        return self._decode(self.individuals, individual_id)
 
     def id_to_class(self, class_id: int) -> str:
-        return self._id_to_class[class_id]
+        return self._decode(self.classes, class_id)
 
     def id_to_obj_prop(self, obj_prop_id: int) -> str:
-        return self._id_to_obj_prop[obj_prop_id]
+        return self._decode(self.obj_props, obj_prop_id)
+
+    def index(self, name: str) -> CSRIndex:
+        """CSR index of a schema or type relation, see `INDEXES` for the available names
+
+        Args:
+            name (str): Index name
+
+        Returns:
+            CSRIndex: Relation index
+        """
+        if name not in self._indexes:
+            with self.recorder.phase(f"index/{name}") as phase:
+                self._indexes[name] = self._build_index(name)
+                phase.set(len(self._indexes[name].indices))
+        return self._indexes[name]
+
+    def pattern_index(self, splits: Optional[Iterable[str]] = None) -> TriplePatternIndex:
+        """SPO, POS and OSP permutation index of the triples of some ABox splits, built on first
+        use and cached
+
+        Args:
+            splits (Optional[Iterable[str]], optional): Any combination of "train", "valid" and "test", all of them if None. Defaults to None.
+
+        Returns:
+            TriplePatternIndex: Pattern index
+        """
+        splits = set(SPLITS if splits is None else splits)
+
+        unknown = splits - set(SPLITS)
+        if unknown or not splits:
+            raise ValueError(f"Unknown splits {sorted(unknown)}, available splits are {SPLITS}")
+
+        splits = [split for split in SPLITS if split in splits]
+        key = "+".join(splits)
+        if key not in self._pattern_indexes:
+            with self.recorder.phase(f"index/patterns/{key}") as phase:
+                self._pattern_indexes[key] = self._load_pattern_index(splits)
+                phase.set(len(self._pattern_indexes[key]))
+        return self._pattern_indexes[key]
+
+    def match(
+        self, patterns: torch.Tensor, splits: Optional[Iterable[str]] = None
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Triples matching a batch of patterns, see `TriplePatternIndex.match`
+
+        Args:
+            patterns (torch.Tensor): Patterns (B, 3), `index.ANY` marks the unbound positions
+            splits (Optional[Iterable[str]], optional): Splits to be queried, all of them if None. Defaults to None.
+
+        Returns:
+            Tuple[torch.Tensor, torch.Tensor]: Flat matching triples and offsets (B + 1,)
+        """
+        return self.pattern_index(splits).match(patterns)
+
+    def contains(self, triples: torch.Tensor) -> torch.Tensor:
+        """Check which triples are known in any ABox split, see `KnownTripleIndex.contains`
+
+        Args:
+            triples (torch.Tensor): Triples (..., 3)
+
+        Returns:
+            torch.Tensor: Boolean mask (...)
+        """
+        return self.known_triples.contains(triples)
+
+    def filter_mask(
+        self,
+        heads: Optional[torch.Tensor],
+        relations: torch.Tensor,
+        tails: Optional[torch.Tensor],
+    ) -> torch.Tensor:
+        """Known triple mask of a link prediction scoring matrix, see `KnownTripleIndex.filter_mask`
+
+        Args:
+            heads (Optional[torch.Tensor]): Head of each query (B,), or candidate heads
+            relations (torch.Tensor): Relation of each query (B,)
+            tails (Optional[torch.Tensor]): Tail of each query (B,), or candidate tails
+
+        Returns:
+            torch.Tensor: Boolean mask (B, C), or (B, num_entities) when scoring all entities
+        """
+        return self.known_triples.filter_mask(heads, relations, tails)
 
     def individual_classes(self, individual_id: int) -> torch.tensor:
-        return self.class_assertions[self.class_assertions[:, 0] == individual_id, 1]
+        return self.index("individual_classes").neighbors(individual_id)
+
+    def class_individuals(self, class_id: int) -> torch.tensor:
+        return self.index("class_individuals").neighbors(class_id)
 
     def sup_classes(self, class_id: int) -> torch.tensor:
-        return self.taxonomy[self.taxonomy[:, 0] == class_id, 1]
+        return self.index("sup_classes").neighbors(class_id)
 
     def sub_classes(self, class_id: int) -> torch.tensor:
-        return self.taxonomy[self.taxonomy[:, 1] == class_id, 0]
-    
+        return self.index("sub_classes").neighbors(class_id)
+
     def is_leaf(self, class_id: int) -> bool:
-        return len(self.sub_classes(class_id)) == 0
+        return bool(self.index("sub_classes").degree(torch.tensor([class_id]))[0] == 0)
 
     def sup_obj_prop(self, obj_prop_id: int) -> torch.tensor:
-        return self.obj_props_hierarchy[
-            self.obj_props_hierarchy[:, 0] == obj_prop_id, 1
-        ]
+        return self.index("sup_obj_prop").neighbors(obj_prop_id)
 
     def sub_obj_prop(self, obj_prop_id: int) -> torch.tensor:
-        return self.obj_props_hierarchy[
-            self.obj_props_hierarchy[:, 1] == obj_prop_id, 0
-        ]
+        return self.index("sub_obj_prop").neighbors(obj_prop_id)
 
     def obj_prop_domain(self, obj_prop_id: int) -> torch.tensor:
-        return self.obj_props_domain[self.obj_props_domain[:, 0] == obj_prop_id, 1]
+        return self.index("obj_prop_domain").neighbors(obj_prop_id)
 
     def obj_prop_range(self, obj_prop_id: int) -> torch.tensor:
-        return self.obj_props_range[self.obj_props_range[:, 0] == obj_prop_id, 1]
+        return self.index("obj_prop_range").neighbors(obj_prop_id)
+
+    def domain_obj_props(self, class_id: int) -> torch.tensor:
+        return self.index("domain_obj_props").neighbors(class_id)
+
+    def range_obj_props(self, class_id: int) -> torch.tensor:
+        return self.index("range_obj_props").neighbors(class_id)
+
+    # Batched Getters, see CSRIndex.batch for the output format
+
+    def individual_classes_batch(self, individual_ids: torch.Tensor, padded: bool = False):
+        return self.index("individual_classes").batch(individual_ids, padded)
+
+    def class_individuals_batch(self, class_ids: torch.Tensor, padded: bool = False):
+        return self.index("class_individuals").batch(class_ids, padded)
+
+    def sup_classes_batch(self, class_ids: torch.Tensor, padded: bool = False):
+        return self.index("sup_classes").batch(class_ids, padded)
+
+    def sub_classes_batch(self, class_ids: torch.Tensor, padded: bool = False):
+        return self.index("sub_classes").batch(class_ids, padded)
+
+    def is_leaf_batch(self, class_ids: torch.Tensor) -> torch.Tensor:
+        return self.index("sub_classes").degree(class_ids) == 0
+
+    def sup_obj_prop_batch(self, obj_prop_ids: torch.Tensor, padded: bool = False):
+        return self.index("sup_obj_prop").batch(obj_prop_ids, padded)
+
+    def sub_obj_prop_batch(self, obj_prop_ids: torch.Tensor, padded: bool = False):
+        return self.index("sub_obj_prop").batch(obj_prop_ids, padded)
+
+    def obj_prop_domain_batch(self, obj_prop_ids: torch.Tensor, padded: bool = False):
+        return self.index("obj_prop_domain").batch(obj_prop_ids, padded)
+
+    def obj_prop_range_batch(self, obj_prop_ids: torch.Tensor, padded: bool = False):
+        return self.index("obj_prop_range").batch(obj_prop_ids, padded)
+
+    def domain_obj_props_batch(self, class_ids: torch.Tensor, padded: bool = False):
+        return self.index("domain_obj_props").batch(class_ids, padded)
+
+    def range_obj_props_batch(self, class_ids: torch.Tensor, padded: bool = False):
+        return self.index("range_obj_props").batch(class_ids, padded)
 
     # Getters
 
@@ -121,59 +754,424 @@ class KnowledgeGraph(Dataset):
     def dataset_location(self) -> str:
         return str(self.base_path)
 
+    @property
+    def num_individuals(self) -> int:
+        return self.individuals.num_ids
+
+    @property
+    def num_classes(self) -> int:
+        return self.classes.num_ids
+
+    @property
+    def num_obj_props(self) -> int:
+        return self.obj_props.num_ids
+
     @property
     def train(self) -> torch.tensor:
-        return self._train_triples
+        return self._component("train")
 
     @property
     def valid(self) -> torch.tensor:
-        return self._valid_triples
+        return self._component("valid")
 
     @property
     def test(self) -> torch.tensor:
-        return self._test_triples
+        return self._component("test")
+
+    @property
+    def triples(self) -> torch.tensor:
+        return self._component("triples")
 
     @property
     def class_assertions(self) -> torch.tensor:
-        return self._class_assertions
+        return self._component("class_assertions")
 
     @property
     def taxonomy(self) -> torch.tensor:
-        return self._taxonomy
+        return self._component("taxonomy")
 
     @property
     def obj_props_hierarchy(self) -> torch.tensor:
-        return self._obj_prop_hierarchy
+        return self._component("obj_prop_hierarchy")
 
     @property
     def obj_props_domain(self) -> torch.tensor:
-        return self._obj_prop_domain_range[
-            self._obj_prop_domain_range[:, 1] == idc.DOMAIN
-        ][:, [0, 2]]
+        if "obj_prop_domain" not in self._components:
+            self._components["obj_prop_domain"] = self._split_domain_range(idc.DOMAIN)
+        return self._components["obj_prop_domain"]
 
     @property
     def obj_props_range(self) -> torch.tensor:
-        return self._obj_prop_domain_range[
-            self._obj_prop_domain_range[:, 1] == idc.RANGE
-        ][:, [0, 2]]
+        if "obj_prop_range" not in self._components:
+            self._components["obj_prop_range"] = self._split_domain_range(idc.RANGE)
+        return self._components["obj_prop_range"]
 
     @property
     def obj_props_domains_range(self) -> torch.tensor:
-        return self._obj_prop_domain_range
+        return self._component("obj_prop_domain_range")
+
+    @property
+    def known_triples(self) -> KnownTripleIndex:
+        """Index of all the known ABox triples, built on first access"""
+        if self._known_triples is None:
+            with self.recorder.phase("index/known_triples") as phase:
+                self._known_triples = self._load_known_triples()
+                phase.set(len(self._known_triples))
+        return self._known_triples
+
+    @property
+    def taxonomy_closure(self) -> HierarchyClosure:
+        return self._closure("taxonomy")
+
+    @property
+    def obj_props_hierarchy_closure(self) -> HierarchyClosure:
+        return self._closure("obj_prop_hierarchy")
+
+    # Dataset Deltas
+
+    @property
+    def deltas(self) -> List[str]:
+        """Names of the dataset deltas merged into the knowledge graph, in order"""
+        return [delta.name for delta in self._deltas]
+
+    def _delta_rows(self, name: str, deltas: Optional[List[Delta]] = None) -> torch.Tensor:
+        width = 2 if name == "class_assertions" else 3
+        rows = [delta.component(name) for delta in (self._deltas if deltas is None else deltas)]
+        return torch.cat([torch.empty((0, width), dtype=torch.int64), *rows])
+
+    @staticmethod
+    def _concat(tensor: torch.Tensor, rows: torch.Tensor) -> torch.Tensor:
+        if len(rows) == 0:
+            return tensor
+        if tensor.numel() == 0:
+            return rows
+        return torch.cat([tensor.to(rows.dtype).reshape(-1, rows.shape[1]), rows])
+
+    def _encode_delta(self, name: str, uris: List[str]) -> Tuple[torch.Tensor, List[str]]:
+        """Encode the URIs of a delta, assigning IDs after the existing ones to the URIs missing
+        from the vocabulary
+
+        Args:
+            name (str): Vocabulary name, key of `VOCABULARIES`
+            uris (List[str]): URIs
+
+        Returns:
+            Tuple[torch.Tensor, List[str]]: IDs of the URIs and new URIs, in the order of their IDs
+        """
+        vocabulary = self._vocabulary(name)
+        ids = vocabulary.encode(uris)
+
+        unknown = (ids == UNKNOWN_ID).nonzero().flatten()
+        new = list(dict.fromkeys(uris[i] for i in unknown.tolist()))
+        assigned = {uri: vocabulary.num_ids + i for i, uri in enumerate(new)}
+        ids[unknown] = torch.tensor([assigned[uris[i]] for i in unknown.tolist()], dtype=torch.int64)
+
+        return ids, new
+
+    def append(
+        self,
+        train: Optional[Iterable[Sequence[str]]] = None,
+        valid: Optional[Iterable[Sequence[str]]] = None,
+        test: Optional[Iterable[Sequence[str]]] = None,
+        class_assertions: Optional[Iterable[Sequence[str]]] = None,
+    ) -> Delta:
+        """Append triples and class assertions to the dataset, without parsing or converting it
+        again. URIs missing from the vocabularies get IDs after the existing ones. The additions
+        are written as a delta side file in `paths.DELTAS` (in the overlay folder for archives),
+        merged by every later load, and applied in place:
+
+        - loaded components are extended, and their cached tensors are extended on disk by writing only the new rows
+        - loaded class assertion indexes, known triples index and pattern indexes are merged with the new rows, without sorting the existing ones again, and written back to the cache
+
+        Cached tensors depending on the ABox that are not loaded become stale and are rebuilt
+        on their next load, cached components are extended with the missing deltas instead.
+
+        Args:
+            train (Optional[Iterable[Sequence[str]]], optional): Training triples, as (subject, predicate, object) URIs. Defaults to None.
+            valid (Optional[Iterable[Sequence[str]]], optional): Validation triples. Defaults to None.
+            test (Optional[Iterable[Sequence[str]]], optional): Test triples. Defaults to None.
+            class_assertions (Optional[Iterable[Sequence[str]]], optional): Class assertions, as (individual, class) URIs. Defaults to None.
+
+        Raises:
+            ValueError: If other deltas were written to the dataset after it was loaded
+
+        Returns:
+            Delta: Written delta, with the IDs of the new rows
+        """
+        folder = local_path(self.base_path) / pc.DELTAS
+        written = sorted(path.stem for path in folder.glob("*.json")) if folder.is_dir() else []
+        if written != self.deltas:
+            raise ValueError(
+                f"The dataset has deltas not merged in this knowledge graph ({len(written)} written, "
+                f"{len(self._deltas)} merged), load it again before appending."
+            )
+
+        with self.recorder.phase("append") as phase:
+            triples = {
+                split: [tuple(map(str, triple)) for triple in rows or []]
+                for split, rows in zip(["train", "valid", "test"], [train, valid, test])
+            }
+            triples = [triples[split] for split in DELTA_SPLITS]
+            assertions = [tuple(map(str, assertion)) for assertion in class_assertions or []]
+            flat = [triple for rows in triples for triple in rows]
+
+            first_ids = {name: self._vocabulary(name).num_ids for name in DELTA_VOCABULARIES}
+            individuals, new_individuals = self._encode_delta(
+                "individuals", [uri for t in flat for uri in (t[0], t[2])] + [a[0] for a in assertions]
+            )
+            obj_props, new_obj_props = self._encode_delta("obj_props", [t[1] for t in flat])
+            classes, new_classes = self._encode_delta("classes", [a[1] for a in assertions])
+
+            ends = individuals[: 2 * len(flat)].reshape(-1, 2)
+            encoded = torch.stack([ends[:, 0], obj_props, ends[:, 1]], dim=1)
+            sizes = [len(rows) for rows in triples]
+            rows = dict(zip(DELTA_SPLITS, torch.split(encoded, sizes)))
+            rows["class_assertions"] = torch.stack([individuals[2 * len(flat) :], classes], dim=1)
+
+            new_uris = {
+                "individuals": new_individuals,
+                "classes": new_classes,
+                "obj_props": new_obj_props,
+            }
+            delta = Delta(delta_name(len(self._deltas)), first_ids, new_uris, rows)
+            delta.write(folder)
+
+            applied = self.deltas
+            self._deltas.append(delta)
+
+            for name in DELTA_VOCABULARIES:
+                if delta.uris[name] and name in self._vocabularies:
+                    vocabulary = self._vocabularies[name]
+                    base = vocabulary.base if isinstance(vocabulary, ExtendedVocabulary) else vocabulary
+                    self._vocabularies[name] = self._extend_vocabulary(name, base)
+
+            self._apply_delta(delta, applied)
+            phase.set(len(encoded) + len(assertions), delta=delta.name)
+
+        return delta
+
+    def _apply_delta(self, delta: Delta, applied: List[str]):
+        """Extend the components, indexes and cached tensors with the rows of a new delta
+
+        Args:
+            delta (Delta): New delta, already in the deltas of the knowledge graph
+            applied (List[str]): Deltas merged before the new one
+        """
+        for name in DELTA_COMPONENTS:
+            rows = delta.component(name)
+            appended = self._append_cached(name, rows, applied)
+            if not appended:
+                # The cached file misses the new rows, views share the tensor memory instead
+                self._mapped_files.pop(name, None)
+            if name in self._components:
+                if appended:
+                    self._components[name] = self._get_cached(name)
+                else:
+                    self._components[name] = self._concat(self._components[name], rows)
+
+        num_individuals, num_obj_props = self.num_individuals, self.num_obj_props
+
+        if self._known_triples is not None:
+            self._known_triples = self._known_triples.extend(
+                delta.component("triples"), num_individuals, num_obj_props
+            )
+            self._put_cached("known_triples", self._known_triples.keys)
+
+        for key, index in list(self._pattern_indexes.items()):
+            rows = torch.cat([delta.component(split) for split in key.split("+")])
+            index = index.extend(rows, num_individuals, num_obj_props)
+            self._pattern_indexes[key] = index
+            for array, tensor in index.arrays.items():
+                self._put_cached(f"patterns/{key}/{array}", tensor)
+
+        assertions = delta.component("class_assertions")
+        if "individual_classes" in self._indexes:
+            index = self._indexes["individual_classes"]
+            self._indexes["individual_classes"] = index.extend(assertions[:, 0], assertions[:, 1])
+        if "class_individuals" in self._indexes:
+            index = self._indexes["class_individuals"]
+            self._indexes["class_individuals"] = index.extend(assertions[:, 1], assertions[:, 0])
+
+        # New classes are attached to the root of the taxonomy closure, which is rebuilt
+        if "taxonomy" in self._closures:
+            if delta.uris["classes"]:
+                del self._closures["taxonomy"]
+            else:
+                self._put_cached("taxonomy_closure", self._closures["taxonomy"].pairs)
+
+    # Dataset Views
+
+    def _check_split(self, split: str):
+        if split not in ABOX_FILES:
+            raise ValueError(f"Unknown split {split}, available splits are {list(ABOX_FILES)}")
+
+    def dataset(self, split: str = "train") -> TriplesDataset:
+        """Map-style dataset view of an ABox split. The view only holds the split tensor, backed
+        by the memory-mapped cache when available, so DataLoader workers map the cache file
+        again (or share memory) instead of copying the triples.
+
+        Args:
+            split (str, optional): Split name, one of "train", "valid", "test" and "triples". Defaults to "train".
+
+        Returns:
+            TriplesDataset: Split view
+        """
+        self._check_split(split)
+        return TriplesDataset(self._component(split), self._mapped_files.get(split))
+
+    def iterable_dataset(
+        self,
+        split: str = "train",
+        batch_size: int = 1024,
+        shuffle: bool = True,
+        drop_last: bool = False,
+        seed: int = 0,
+    ) -> TriplesIterableDataset:
+        """Iterable dataset view of an ABox split yielding whole batches, see `dataset`
+
+        Args:
+            split (str, optional): Split name, one of "train", "valid", "test" and "triples". Defaults to "train".
+            batch_size (int, optional): Number of triples of each batch. Defaults to 1024.
+            shuffle (bool, optional): Shuffle the triples at every epoch. Defaults to True.
+            drop_last (bool, optional): Drop the last batch if it is smaller than batch_size. Defaults to False.
+            seed (int, optional): Seed of the permutations. Defaults to 0.
+
+        Returns:
+            TriplesIterableDataset: Split view
+        """
+        self._check_split(split)
+        return TriplesIterableDataset(
+            self._component(split),
+            batch_size,
+            shuffle,
+            drop_last,
+            seed,
+            path=self._mapped_files.get(split),
+        )
+
+    def loader(
+        self,
+        split: str = "train",
+        batch_size: int = 1024,
+        shuffle: bool = True,
+        drop_last: bool = False,
+        iterable: bool = False,
+        generator: Optional[torch.Generator] = None,
+        seed: int = 0,
+        **kwargs,
+    ) -> DataLoader:
+        """DataLoader yielding (B, 3) batches of an ABox split, fetched with a single indexing
+        operation per batch
+
+        Args:
+            split (str, optional): Split name, one of "train", "valid", "test" and "triples". Defaults to "train".
+            batch_size (int, optional): Number of triples of each batch. Defaults to 1024.
+            shuffle (bool, optional): Shuffle the triples at every epoch. Defaults to True.
+            drop_last (bool, optional): Drop the last batch if it is smaller than batch_size. Defaults to False.
+            iterable (bool, optional): Use the iterable view instead of the map-style one. Defaults to False.
+            generator (Optional[torch.Generator], optional): Random number generator of the map-style shuffling. Defaults to None.
+            seed (int, optional): Seed of the iterable shuffling, every pass adds one to the epoch added to it. Defaults to 0.
+            **kwargs: Other DataLoader arguments, e.g. num_workers
+
+        Returns:
+            DataLoader: Split loader
+        """
+        if iterable:
+            view = self.iterable_dataset(split, batch_size, shuffle, drop_last, seed)
+            return TriplesIterableLoader(view, batch_size=None, **kwargs)
+
+        view = self.dataset(split)
+        sampler = TriplesBatchSampler(len(view), batch_size, shuffle, drop_last, generator)
+        return DataLoader(view, batch_sampler=sampler, collate_fn=TriplesDataset.collate, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.train)
+
+    def __getitem__(self, index: int) -> torch.Tensor:
+        return self.train[index]
+
+    def __getitems__(self, indices: Sequence[int]) -> torch.Tensor:
+        return self.train[torch.as_tensor(indices, dtype=torch.int64)]
 
     # ABOX Loading Functions
 
     def _load_abox_triples(self, file_location: str):
-        triples = []
-        with open(self.base_path / file_location, "r") as triples_txt:
-            for t in triples_txt.readlines():
-                triple_split = t.strip().split("\t")
-                s = self.individual_to_id(triple_split[0])
-                p = self.obj_prop_to_id(triple_split[1])
-                o = self.individual_to_id(triple_split[2])
-                triples.append([s, p, o])
+        triples, unknown = load_triples(
+            self.base_path / file_location, self._individual_to_id, self._obj_prop_to_id
+        )
+
+        if unknown:
+            self._unknown_warning(file_location, unknown)
+
+        return triples
+
+    def _load_abox_splits(self, names: List[str]) -> Dict[str, torch.Tensor]:
+        """Load ABox triples components, reading the TSV files of the ones missing from the
+        cache concurrently. If `paths.TRIPLES` does not exist, the `triples` component is the
+        concatenation of the three splits.
+
+        Args:
+            names (List[str]): Component names, keys of `ABOX_FILES`
+
+        Returns:
+            Dict[str, torch.Tensor]: Triples tensors, by component name
+        """
+        with self.recorder.phase("abox"):
+            return self._read_abox_splits(names)
+
+    def _get_cached_split(self, name: str) -> Optional[torch.Tensor]:
+        start = time.perf_counter()
+        tensor = self._get_cached(name)
+        if tensor is not None:
+            self.recorder.record(name, time.perf_counter() - start, len(tensor), source="cache")
+        return tensor
+
+    def _read_abox_splits(self, names: List[str]) -> Dict[str, torch.Tensor]:
+        abox = {name: self._get_cached_split(name) for name in names}
+
+        merge = (
+            "triples" in abox
+            and abox["triples"] is None
+            and not (self.base_path / pc.TRIPLES).exists()
+        )
+
+        if merge:
+            for name in ["train", "test", "valid"]:
+                if name not in abox:
+                    abox[name] = self._get_cached_split(name)
+
+        missing = [
+            name
+            for name, tensor in abox.items()
+            if tensor is None and not (merge and name == "triples")
+        ]
 
-        return torch.tensor(triples, dtype=torch.int64)
+        loaded = {}
+        if missing:
+            loaded = load_triples_concurrently(
+                {name: self.base_path / ABOX_FILES[name] for name in missing},
+                self._individual_to_id,
+                self._obj_prop_to_id,
+                recorder=self.recorder,
+            )
+
+        for name, (triples, unknown) in loaded.items():
+            if unknown:
+                self._unknown_warning(ABOX_FILES[name], unknown)
+            abox[name] = self._concat(triples, self._delta_rows(name))
+
+        if merge:
+            start = time.perf_counter()
+            abox["triples"] = torch.cat([abox["train"], abox["test"], abox["valid"]])
+            self.recorder.record(
+                "triples", time.perf_counter() - start, len(abox["triples"]), source="splits"
+            )
+            missing.append("triples")
+
+        for name in missing:
+            self._put_cached(name, abox[name])
+
+        return {name: abox[name] for name in names}
 
     def _load_abox_class_assertions(self):
 
@@ -182,13 +1180,13 @@ class KnowledgeGraph(Dataset):
 
         casrt = []
 
-        with open(self.base_path / pc.CLASS_ASSERTIONS, "r") as casrt_json:
+        with open_file(self.base_path / pc.CLASS_ASSERTIONS, "r") as casrt_json:
             data = json.load(casrt_json)
 
         for ind_uri in data:
-            ind_id = self.individual_to_id(ind_uri)
+            ind_id = self._individual_to_id[ind_uri]
             for class_uri in data[ind_uri]:
-                class_id = self.class_to_id(class_uri)
+                class_id = self._class_to_id[class_uri]
                 casrt.append([ind_id, class_id])
 
         return torch.tensor(casrt, dtype=torch.int64)
@@ -203,18 +1201,18 @@ class KnowledgeGraph(Dataset):
         taxonomy = []
         complex_uri = 0
 
-        with open(self.base_path / pc.TAXONOMY, "r") as taxonomy_json:
+        with open_file(self.base_path / pc.TAXONOMY, "r") as taxonomy_json:
             data = json.load(taxonomy_json)
 
         for c_uri in data:
-            c_id = self.class_to_id(c_uri)
+            c_id = self._class_to_id[c_uri]
             for sup_c_uri in data[c_uri]:
 
                 if isinstance(sup_c_uri, dict):
                     complex_uri += 1
                     
                 else:
-                    sup_c_id = self.class_to_id(sup_c_uri)
+                    sup_c_id = self._class_to_id[sup_c_uri]
                     taxonomy.append([c_id, sup_c_id])
 
         if complex_uri > 0:
@@ -230,13 +1228,13 @@ class KnowledgeGraph(Dataset):
         
         complex_uri = 0
 
-        with open(self.base_path / pc.OBJ_PROP_DOMAIN_RANGE, "r") as role_dm_json:
+        with open_file(self.base_path / pc.OBJ_PROP_DOMAIN_RANGE, "r") as role_dm_json:
             data = json.load(role_dm_json)
 
         dm = []
 
         for r_uri in data:
-            r_id = self.obj_prop_to_id(r_uri)
+            r_id = self._obj_prop_to_id[r_uri]
             domain, ex_d = self._compute_domain_range(data[r_uri]["domain"])
             range, ex_r = self._compute_domain_range(data[r_uri]["range"])
 
@@ -260,11 +1258,11 @@ class KnowledgeGraph(Dataset):
         for elem in subdata:
             if type(elem) is dict and str(OWL.unionOf) in elem.keys():
                 for unionclass in elem[str(OWL.unionOf)]:
-                    out.append(self.class_to_id(unionclass))
+                    out.append(self._class_to_id[unionclass])
             elif type(elem) is dict:
                 excluded += 1
             else:
-                out.append(self.class_to_id(elem))
+                out.append(self._class_to_id[elem])
         return out, excluded
 
     def _load_rbox_hierarchy(self):
@@ -274,16 +1272,16 @@ class KnowledgeGraph(Dataset):
         rh = []
         complex_uri = 0
 
-        with open(self.base_path / pc.OBJ_PROP_HIERARCHY, "r") as role_h_json:
+        with open_file(self.base_path / pc.OBJ_PROP_HIERARCHY, "r") as role_h_json:
             data = json.load(role_h_json)
 
         for r_uri in data:
-            r_id = self.obj_prop_to_id(r_uri)
+            r_id = self._obj_prop_to_id[r_uri]
             for sup_r_uri in data[r_uri]:
                 if type(sup_r_uri) is dict:
                     complex_uri += 1
                 else:
-                    rh.append([r_id, self.obj_prop_to_id(sup_r_uri)])
+                    rh.append([r_id, self._obj_prop_to_id[sup_r_uri]])
 
         if complex_uri > 0:
             self._warning(complex_uri)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import torch
+
+# Vocabularies a delta can extend, and ABox splits it can add triples to
+
+DELTA_VOCABULARIES = ["individuals", "classes", "obj_props"]
+
+DELTA_SPLITS = ["train", "test", "valid"]
+
+
+class Delta:
+    """Batch of triples and class assertions appended to a dataset, stored as a JSON side file.
+    URIs that were not in the dataset vocabularies are listed in the order they got their IDs,
+    starting from `first_ids`, and the triples and class assertions are stored as IDs.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        first_ids: Dict[str, int],
+        uris: Dict[str, List[str]],
+        rows: Dict[str, torch.Tensor],
+    ):
+        """Initialize the delta
+
+        Args:
+            name (str): Delta name, its position in the sequence of deltas of the dataset
+            first_ids (Dict[str, int]): ID of the first new URI of each vocabulary
+            uris (Dict[str, List[str]]): New URIs of each vocabulary, see `DELTA_VOCABULARIES`
+            rows (Dict[str, torch.Tensor]): Triples (N, 3) of each split and class assertions (M, 2)
+        """
+        self.name = name
+        self.first_ids = {vocabulary: int(first_ids[vocabulary]) for vocabulary in DELTA_VOCABULARIES}
+        self.uris = {vocabulary: list(uris.get(vocabulary, [])) for vocabulary in DELTA_VOCABULARIES}
+        self.rows = {
+            "class_assertions": _rows(rows.get("class_assertions"), 2),
+            **{split: _rows(rows.get(split), 3) for split in DELTA_SPLITS},
+        }
+
+    def component(self, name: str) -> torch.Tensor:
+        """Rows the delta adds to a component, the `triples` component gets the triples of
+        every split
+
+        Args:
+            name (str): Component name
+
+        Returns:
+            torch.Tensor: Added rows
+        """
+        if name == "triples":
+            return torch.cat([self.rows[split] for split in DELTA_SPLITS])
+        return self.rows[name]
+
+    def to_dict(self) -> dict:
+        return {
+            "first_ids": self.first_ids,
+            **self.uris,
+            **{name: rows.tolist() for name, rows in self.rows.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, name: str, data: dict) -> "Delta":
+        return cls(
+            name,
+            data["first_ids"],
+            {vocabulary: data.get(vocabulary, []) for vocabulary in DELTA_VOCABULARIES},
+            {
+                component: torch.tensor(data.get(component, []), dtype=torch.int64)
+                for component in ["class_assertions", *DELTA_SPLITS]
+            },
+        )
+
+    def write(self, folder: Path):
+        """Write the delta to `folder/<name>.json`, atomically so that readers never see a
+        partial delta
+
+        Args:
+            folder (Path): Deltas folder
+        """
+        folder = Path(folder)
+        folder.mkdir(parents=True, exist_ok=True)
+        path = folder / f"{self.name}.json"
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+
+def _rows(tensor: Optional[torch.Tensor], width: int) -> torch.Tensor:
+    if tensor is None:
+        return torch.empty((0, width), dtype=torch.int64)
+    return torch.as_tensor(tensor, dtype=torch.int64).reshape(-1, width)
+
+
+def delta_name(position: int) -> str:
+    """Name of the delta at a position of the sequence, sorting in the same order
+
+    Args:
+        position (int): Position, from 0
+
+    Returns:
+        str: Delta name
+    """
+    return f"{position + 1:06d}"
+
+
+def read_deltas(folder: Path) -> List[Delta]:
+    """Read the deltas of a dataset in the order they were written
+
+    Args:
+        folder (Path): Deltas folder, may be missing
+
+    Returns:
+        List[Delta]: Deltas
+    """
+    folder = Path(folder)
+    if not folder.is_dir():
+        return []
+
+    deltas = []
+    for path in sorted(folder.glob("*.json")):
+        with open(path, "r") as f:
+            deltas.append(Delta.from_dict(path.stem, json.load(f)))
+    return deltas
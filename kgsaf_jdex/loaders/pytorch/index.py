@@ -0,0 +1,616 @@
+#!/usr/bin/env python3
+
+from typing import Dict, Optional, Tuple
+
+import torch
+
+# Wildcard of triple patterns
+ANY = -1
+
+# Permutations of the pattern index, as the order of the (subject, predicate, object) columns
+PERMUTATIONS = {"spo": (0, 1, 2), "pos": (1, 2, 0), "osp": (2, 0, 1)}
+
+# Arrays stored for each permutation
+PATTERN_ARRAYS = [f"{name}_{array}" for name in PERMUTATIONS for array in ("keys", "indptr")]
+
+# Permutation and number of bound leading columns answering each pattern, by bound positions
+PATTERN_PLANS = {
+    (False, False, False): ("spo", 0),
+    (True, False, False): ("spo", 1),
+    (True, True, False): ("spo", 2),
+    (True, True, True): ("spo", 3),
+    (False, True, False): ("pos", 1),
+    (False, True, True): ("pos", 2),
+    (False, False, True): ("osp", 1),
+    (True, False, True): ("osp", 2),
+}
+
+
+def ragged_ranges(
+    starts: torch.Tensor, lengths: torch.Tensor
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    """Expand a batch of [start, start + length) ranges into flat positions
+
+    Args:
+        starts (torch.Tensor): Range starts (B,)
+        lengths (torch.Tensor): Range lengths (B,)
+
+    Returns:
+        Tuple[torch.Tensor, torch.Tensor]: Row of each position in the batch and position itself
+    """
+    rows = torch.repeat_interleave(torch.arange(len(lengths)), lengths)
+    first = torch.cumsum(lengths, dim=0) - lengths
+    positions = torch.arange(len(rows)) - first[rows] + starts[rows]
+    return rows, positions
+
+
+def sorted_isin(keys: torch.Tensor, sorted_keys: torch.Tensor) -> torch.Tensor:
+    """Membership test of a batch of keys against a sorted key tensor
+
+    Args:
+        keys (torch.Tensor): Query keys
+        sorted_keys (torch.Tensor): Sorted reference keys
+
+    Returns:
+        torch.Tensor: Boolean mask, same shape of the query keys
+    """
+    if len(sorted_keys) == 0:
+        return torch.zeros(keys.shape, dtype=torch.bool)
+    pos = torch.searchsorted(sorted_keys, keys).clamp_(max=len(sorted_keys) - 1)
+    return sorted_keys[pos] == keys
+
+
+def merge_sorted(sorted_keys: torch.Tensor, keys: torch.Tensor) -> torch.Tensor:
+    """Sorted union of a sorted tensor of unique keys and a batch of new keys, without sorting
+    the existing keys again
+
+    Args:
+        sorted_keys (torch.Tensor): Sorted unique keys
+        keys (torch.Tensor): Keys to be added, in any order and possibly already present
+
+    Returns:
+        torch.Tensor: Sorted unique keys
+    """
+    keys = torch.unique(keys.to(sorted_keys.dtype))
+    keys = keys[~sorted_isin(keys, sorted_keys)]
+
+    positions = torch.searchsorted(sorted_keys, keys) + torch.arange(len(keys))
+    existing = torch.ones(len(sorted_keys) + len(keys), dtype=torch.bool)
+    existing[positions] = False
+
+    out = torch.empty(len(existing), dtype=sorted_keys.dtype)
+    out[positions] = keys
+    out[existing] = sorted_keys
+    return out
+
+
+class CSRIndex:
+    """Compressed sparse row index of a binary relation between integer IDs, mapping every
+    source ID to the contiguous slice of its targets. IDs are shifted by `offset` before
+    indexing, so that relations involving negative IDs (e.g. `idc.THING`) can be stored.
+    """
+
+    def __init__(
+        self,
+        src: torch.Tensor,
+        dst: torch.Tensor,
+        offset: int = 0,
+        num_rows: Optional[int] = None,
+    ):
+        """Build the index from the (src, dst) pairs of the relation. Targets of the same source
+        keep the order they have in the input tensors.
+
+        Args:
+            src (torch.Tensor): Source IDs (N,)
+            dst (torch.Tensor): Target IDs (N,)
+            offset (int, optional): Shift applied to source IDs. Defaults to 0.
+            num_rows (Optional[int], optional): Number of rows, inferred from the sources if None. Defaults to None.
+        """
+        keys = src.to(torch.int64) + offset
+
+        if len(keys) > 0 and int(keys.min()) < 0:
+            raise ValueError(f"Source IDs lower than {-offset} cannot be indexed")
+
+        if num_rows is None:
+            num_rows = int(keys.max()) + 1 if len(keys) > 0 else 0
+
+        self.offset = offset
+        self.num_rows = num_rows
+
+        order = torch.argsort(keys, stable=True)
+        self.indices = dst.to(torch.int64)[order]
+        self.indptr = torch.zeros(num_rows + 1, dtype=torch.int64)
+        self.indptr[1:] = torch.cumsum(torch.bincount(keys, minlength=num_rows), dim=0)
+
+    @classmethod
+    def from_pairs(cls, pairs: torch.Tensor, reverse: bool = False, **kwargs) -> "CSRIndex":
+        """Build the index from a (N, 2) tensor of pairs, empty tensors are accepted
+
+        Args:
+            pairs (torch.Tensor): Relation pairs (N, 2)
+            reverse (bool, optional): Index the second column instead of the first. Defaults to False.
+
+        Returns:
+            CSRIndex: Index of the relation
+        """
+        pairs = pairs.to(torch.int64).reshape(-1, 2)
+        src, dst = (pairs[:, 1], pairs[:, 0]) if reverse else (pairs[:, 0], pairs[:, 1])
+        return cls(src, dst, **kwargs)
+
+    def extend(self, src: torch.Tensor, dst: torch.Tensor) -> "CSRIndex":
+        """Index with new (src, dst) pairs added after the existing targets of each source, as
+        if it were built from all the pairs. Existing rows are moved with a single copy instead
+        of sorting every pair again.
+
+        Args:
+            src (torch.Tensor): New source IDs (N,)
+            dst (torch.Tensor): New target IDs (N,)
+
+        Returns:
+            CSRIndex: Extended index
+        """
+        keys = src.to(torch.int64) + self.offset
+
+        if len(keys) > 0 and int(keys.min()) < 0:
+            raise ValueError(f"Source IDs lower than {-self.offset} cannot be indexed")
+
+        num_rows = max(self.num_rows, int(keys.max()) + 1 if len(keys) > 0 else 0)
+
+        old_degree = torch.zeros(num_rows, dtype=torch.int64)
+        old_degree[: self.num_rows] = self.indptr.diff()
+        new_degree = torch.bincount(keys, minlength=num_rows)
+
+        indptr = torch.zeros(num_rows + 1, dtype=torch.int64)
+        indptr[1:] = torch.cumsum(old_degree + new_degree, dim=0)
+        indices = torch.empty(int(indptr[-1]), dtype=torch.int64)
+
+        # Existing targets move by the number of new targets of the preceding rows
+        first = torch.cumsum(new_degree, dim=0) - new_degree
+        rows = torch.repeat_interleave(torch.arange(num_rows), old_degree)
+        indices[torch.arange(len(rows)) + first[rows]] = self.indices
+
+        order = torch.argsort(keys, stable=True)
+        rows = keys[order]
+        positions = indptr[rows] + old_degree[rows] + torch.arange(len(rows)) - first[rows]
+        indices[positions] = dst.to(torch.int64)[order]
+
+        index = CSRIndex.__new__(CSRIndex)
+        index.offset = self.offset
+        index.num_rows = num_rows
+        index.indices = indices
+        index.indptr = indptr
+        return index
+
+    def _bounds(self, ids: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        rows = ids.to(torch.int64) + self.offset
+        valid = (rows >= 0) & (rows < self.num_rows)
+        rows = torch.where(valid, rows, 0)
+        starts = self.indptr[rows]
+        lengths = torch.where(valid, self.indptr[rows + 1] - starts, 0)
+        return starts, lengths
+
+    def degree(self, ids: torch.Tensor) -> torch.Tensor:
+        """Number of targets of each source ID
+
+        Args:
+            ids (torch.Tensor): Source IDs (B,)
+
+        Returns:
+            torch.Tensor: Degrees (B,)
+        """
+        return self._bounds(torch.as_tensor(ids))[1]
+
+    def neighbors(self, id: int) -> torch.Tensor:
+        """Targets of a single source ID, as a view on the index
+
+        Args:
+            id (int): Source ID
+
+        Returns:
+            torch.Tensor: Target IDs
+        """
+        row = int(id) + self.offset
+        if row < 0 or row >= self.num_rows:
+            return self.indices[:0]
+        return self.indices[self.indptr[row] : self.indptr[row + 1]]
+
+    def batch(
+        self, ids: torch.Tensor, padded: bool = False, padding_value: int = 0
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Targets of a batch of source IDs
+
+        Args:
+            ids (torch.Tensor): Source IDs (B,)
+            padded (bool, optional): Return a padded matrix instead of a ragged tensor. Defaults to False.
+            padding_value (int, optional): Fill value of padded positions. Defaults to 0.
+
+        Returns:
+            Tuple[torch.Tensor, torch.Tensor]: If ragged, flat targets and offsets (B + 1,) so that
+            the targets of the i-th ID are `values[offsets[i]:offsets[i + 1]]`. If padded, targets
+            (B, max_degree) and boolean mask of the valid positions.
+        """
+        starts, lengths = self._bounds(torch.as_tensor(ids).flatten())
+        rows, positions = ragged_ranges(starts, lengths)
+        values = self.indices[positions]
+
+        if not padded:
+            offsets = torch.zeros(len(lengths) + 1, dtype=torch.int64)
+            offsets[1:] = torch.cumsum(lengths, dim=0)
+            return values, offsets
+
+        width = int(lengths.max()) if len(lengths) > 0 else 0
+        columns = torch.arange(len(values)) - (torch.cumsum(lengths, dim=0) - lengths)[rows]
+        out = torch.full((len(lengths), width), padding_value, dtype=torch.int64)
+        mask = torch.zeros((len(lengths), width), dtype=torch.bool)
+        out[rows, columns] = values
+        mask[rows, columns] = True
+        return out, mask
+
+
+class KnownTripleIndex:
+    """Membership index of a set of known triples, e.g. all the ABox splits for filtered
+    link prediction. Every triple is packed into a single int64 key, `(h * R + r) * E + t`, and
+    the keys are kept sorted, so a batch of triples is looked up with one `searchsorted`. All
+    the tails known for a (head, relation) pair are a contiguous range of keys; the same holds
+    for heads in a second key array, ordered by tail and relation, built on first use.
+    """
+
+    def __init__(
+        self,
+        triples: Optional[torch.Tensor],
+        num_entities: int,
+        num_relations: int,
+        keys: Optional[torch.Tensor] = None,
+    ):
+        """Build the index of a set of triples
+
+        Args:
+            triples (Optional[torch.Tensor]): Known triples (N, 3), may be None if the keys are given
+            num_entities (int): Number of entities, IDs range in [0, num_entities)
+            num_relations (int): Number of relations, IDs range in [0, num_relations)
+            keys (Optional[torch.Tensor], optional): Precomputed sorted keys (e.g. from `keys`), skips the sorting. Defaults to None.
+
+        Raises:
+            ValueError: If the packed keys do not fit in 64 bits
+        """
+        if num_entities * num_entities * max(num_relations, 1) >= torch.iinfo(torch.int64).max:
+            raise ValueError(
+                f"{num_entities} entities and {num_relations} relations cannot be packed in int64 keys"
+            )
+
+        self.num_entities = num_entities
+        self.num_relations = num_relations
+
+        if keys is None:
+            triples = triples.to(torch.int64).reshape(-1, 3)
+            keys = torch.unique(self.pack(triples[:, 0], triples[:, 1], triples[:, 2]))
+
+        self.keys = keys
+        self._inverse_keys = None
+
+    def pack(self, heads: torch.Tensor, relations: torch.Tensor, tails: torch.Tensor) -> torch.Tensor:
+        return (heads * self.num_relations + relations) * self.num_entities + tails
+
+    @staticmethod
+    def _valid(ids: torch.Tensor, num: int) -> torch.Tensor:
+        return (ids >= 0) & (ids < num)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def extend(
+        self, triples: torch.Tensor, num_entities: int, num_relations: int
+    ) -> "KnownTripleIndex":
+        """Index with new triples added, possibly involving new entities and relations. The
+        existing keys keep their order when packed with the new sizes, so they are merged
+        with the new ones without sorting them again.
+
+        Args:
+            triples (torch.Tensor): New triples (N, 3)
+            num_entities (int): Number of entities, not lower than the current one
+            num_relations (int): Number of relations, not lower than the current one
+
+        Returns:
+            KnownTripleIndex: Extended index
+        """
+        index = KnownTripleIndex(None, num_entities, num_relations, keys=self.keys)
+        if (num_entities, num_relations) != (self.num_entities, self.num_relations):
+            index.keys = index.pack(*self.triples.unbind(dim=1))
+
+        triples = torch.as_tensor(triples, dtype=torch.int64).reshape(-1, 3)
+        index.keys = merge_sorted(index.keys, index.pack(*triples.unbind(dim=1)))
+        return index
+
+    def contains(self, triples: torch.Tensor) -> torch.Tensor:
+        """Check which triples are known, IDs out of range are never known
+
+        Args:
+            triples (torch.Tensor): Triples (..., 3)
+
+        Returns:
+            torch.Tensor: Boolean mask (...)
+        """
+        triples = torch.as_tensor(triples, dtype=torch.int64)
+        heads, relations, tails = triples.unbind(dim=-1)
+        return self._contains(heads, relations, tails)
+
+    def _contains(
+        self, heads: torch.Tensor, relations: torch.Tensor, tails: torch.Tensor
+    ) -> torch.Tensor:
+        heads, relations, tails = torch.broadcast_tensors(heads, relations, tails)
+        valid = (
+            self._valid(heads, self.num_entities)
+            & self._valid(relations, self.num_relations)
+            & self._valid(tails, self.num_entities)
+        )
+        return valid & sorted_isin(self.pack(heads, relations, tails), self.keys)
+
+    def filter_mask(
+        self,
+        heads: Optional[torch.Tensor],
+        relations: torch.Tensor,
+        tails: Optional[torch.Tensor],
+    ) -> torch.Tensor:
+        """Known triple mask of a link prediction scoring matrix, to be used for filtered
+        ranking. One of `heads` and `tails` holds the fixed entity of each query (B,), the other
+        the candidates to be scored: a (B, C) tensor of entity IDs, or None for all entities.
+
+        Args:
+            heads (Optional[torch.Tensor]): Head of each query (B,), or candidate heads
+            relations (torch.Tensor): Relation of each query (B,)
+            tails (Optional[torch.Tensor]): Tail of each query (B,), or candidate tails
+
+        Returns:
+            torch.Tensor: Boolean mask (B, C), or (B, num_entities) when scoring all entities
+        """
+        relations = torch.as_tensor(relations, dtype=torch.int64).flatten()
+
+        if heads is None and tails is None:
+            raise ValueError("Either heads or tails must be given")
+
+        if heads is not None and tails is not None:
+            heads = torch.as_tensor(heads, dtype=torch.int64)
+            tails = torch.as_tensor(tails, dtype=torch.int64)
+            if tails.dim() == 2:
+                return self._contains(heads.reshape(-1, 1), relations.reshape(-1, 1), tails)
+            return self._contains(heads, relations.reshape(-1, 1), tails.reshape(-1, 1))
+
+        if tails is None:
+            query, keys = torch.as_tensor(heads, dtype=torch.int64).flatten(), self.keys
+        else:
+            query, keys = torch.as_tensor(tails, dtype=torch.int64).flatten(), self.inverse_keys
+
+        # Every known completion of a query is in the key range of its prefix
+        prefix = query * self.num_relations + relations
+        valid = self._valid(query, self.num_entities) & self._valid(relations, self.num_relations)
+        starts = torch.searchsorted(keys, prefix * self.num_entities)
+        ends = torch.searchsorted(keys, (prefix + 1) * self.num_entities)
+        lengths = torch.where(valid, ends - starts, 0)
+
+        rows, positions = ragged_ranges(starts, lengths)
+        mask = torch.zeros((len(query), self.num_entities), dtype=torch.bool)
+        mask[rows, keys[positions] % self.num_entities] = True
+        return mask
+
+    @property
+    def inverse_keys(self) -> torch.Tensor:
+        """Sorted keys of the triples packed as `(t * R + r) * E + h`"""
+        if self._inverse_keys is None:
+            t = self.keys % self.num_entities
+            hr = self.keys // self.num_entities
+            h, r = hr // self.num_relations, hr % self.num_relations
+            self._inverse_keys = torch.sort(self.pack(t, r, h)).values
+        return self._inverse_keys
+
+    @property
+    def triples(self) -> torch.Tensor:
+        """All the known triples, sorted by head, relation and tail (N, 3)"""
+        t = self.keys % self.num_entities
+        hr = self.keys // self.num_entities
+        return torch.stack([hr // self.num_relations, hr % self.num_relations, t], dim=1)
+
+
+class TriplePatternIndex:
+    """Index answering triple pattern queries such as (s, ?, ?), (?, r, o) or (s, ?, o) over a
+    set of integer triples. The triples are stored in three sorted permutations (SPO, POS and
+    OSP), each as packed int64 keys with an offsets array over its leading column: every
+    pattern is a contiguous range of one permutation, found with the offsets for a single bound
+    column and with `searchsorted` otherwise.
+    """
+
+    def __init__(
+        self,
+        triples: Optional[torch.Tensor],
+        num_entities: int,
+        num_relations: int,
+        arrays: Optional[Dict[str, torch.Tensor]] = None,
+    ):
+        """Build the permutations of a set of triples, duplicates are removed
+
+        Args:
+            triples (Optional[torch.Tensor]): Triples (N, 3), may be None if the arrays are given
+            num_entities (int): Number of entities, IDs range in [0, num_entities)
+            num_relations (int): Number of relations, IDs range in [0, num_relations)
+            arrays (Optional[Dict[str, torch.Tensor]], optional): Precomputed arrays (e.g. from `arrays`), by name (see `PATTERN_ARRAYS`). Defaults to None.
+
+        Raises:
+            ValueError: If the packed keys do not fit in 64 bits
+        """
+        if num_entities * num_entities * max(num_relations, 1) >= torch.iinfo(torch.int64).max:
+            raise ValueError(
+                f"{num_entities} entities and {num_relations} relations cannot be packed in int64 keys"
+            )
+
+        self.num_entities = num_entities
+        self.num_relations = num_relations
+        self.sizes = (num_entities, num_relations, num_entities)
+
+        if arrays is None:
+            triples = torch.unique(triples.to(torch.int64).reshape(-1, 3), dim=0)
+            arrays = {}
+            for name, order in PERMUTATIONS.items():
+                columns = triples[:, list(order)]
+                keys = torch.sort(self._pack(name, columns.unbind(dim=1))).values
+                indptr = torch.zeros(self.sizes[order[0]] + 1, dtype=torch.int64)
+                indptr[1:] = torch.cumsum(
+                    torch.bincount(columns[:, 0], minlength=self.sizes[order[0]]), dim=0
+                )
+                arrays[f"{name}_keys"] = keys
+                arrays[f"{name}_indptr"] = indptr
+
+        self._arrays = arrays
+
+    @property
+    def arrays(self) -> Dict[str, torch.Tensor]:
+        """Every array of the index, by name"""
+        return dict(self._arrays)
+
+    def __len__(self) -> int:
+        return len(self._arrays["spo_keys"])
+
+    def extend(
+        self, triples: torch.Tensor, num_entities: int, num_relations: int
+    ) -> "TriplePatternIndex":
+        """Index with new triples added, possibly involving new entities and relations, see
+        `KnownTripleIndex.extend`
+
+        Args:
+            triples (torch.Tensor): New triples (N, 3)
+            num_entities (int): Number of entities, not lower than the current one
+            num_relations (int): Number of relations, not lower than the current one
+
+        Returns:
+            TriplePatternIndex: Extended index
+        """
+        index = TriplePatternIndex(None, num_entities, num_relations, self.arrays)
+        triples = torch.as_tensor(triples, dtype=torch.int64).reshape(-1, 3)
+        resized = index.sizes != self.sizes
+
+        arrays = {}
+        for name, order in PERMUTATIONS.items():
+            keys = self._arrays[f"{name}_keys"]
+            if resized:
+                keys = index._pack(name, self._unpack(name, keys)[:, list(order)].unbind(dim=1))
+            keys = merge_sorted(keys, index._pack(name, triples[:, list(order)].unbind(dim=1)))
+
+            _, n2, n3 = index._dims(name)
+            size = index.sizes[order[0]]
+            indptr = torch.zeros(size + 1, dtype=torch.int64)
+            indptr[1:] = torch.cumsum(torch.bincount(keys // (n2 * n3), minlength=size), dim=0)
+            arrays[f"{name}_keys"] = keys
+            arrays[f"{name}_indptr"] = indptr
+
+        index._arrays = arrays
+        return index
+
+    def _dims(self, name: str) -> Tuple[int, int, int]:
+        return tuple(self.sizes[i] for i in PERMUTATIONS[name])
+
+    def _pack(self, name: str, columns: Tuple[torch.Tensor, ...]) -> torch.Tensor:
+        _, n2, n3 = self._dims(name)
+        a, b, c = columns
+        return (a * n2 + b) * n3 + c
+
+    def _unpack(self, name: str, keys: torch.Tensor) -> torch.Tensor:
+        """Triples of a permutation, back in (subject, predicate, object) order"""
+        _, n2, n3 = self._dims(name)
+        ab, c = keys // n3, keys % n3
+        columns = torch.stack([ab // n2, ab % n2, c], dim=1)
+        out = torch.empty_like(columns)
+        out[:, list(PERMUTATIONS[name])] = columns
+        return out
+
+    def _ranges(
+        self, name: str, bound: int, columns: torch.Tensor
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Key range of each pattern in a permutation
+
+        Args:
+            name (str): Permutation name
+            bound (int): Number of bound leading columns
+            columns (torch.Tensor): Patterns with the permutation column order (B, 3)
+
+        Returns:
+            Tuple[torch.Tensor, torch.Tensor]: Range starts and lengths (B,)
+        """
+        keys, indptr = self._arrays[f"{name}_keys"], self._arrays[f"{name}_indptr"]
+        dims = self._dims(name)
+
+        if bound == 0:
+            starts = torch.zeros(len(columns), dtype=torch.int64)
+            return starts, torch.full_like(starts, len(keys))
+
+        valid = torch.ones(len(columns), dtype=torch.bool)
+        for i in range(bound):
+            valid &= (columns[:, i] >= 0) & (columns[:, i] < dims[i])
+        columns = torch.where(valid.unsqueeze(1), columns, 0)
+
+        if bound == 1:
+            starts = indptr[columns[:, 0]]
+            ends = indptr[columns[:, 0] + 1]
+        elif bound == 2:
+            low = self._pack(name, (columns[:, 0], columns[:, 1], torch.zeros_like(columns[:, 0])))
+            starts = torch.searchsorted(keys, low)
+            ends = torch.searchsorted(keys, low + dims[2])
+        else:
+            full = self._pack(name, columns.unbind(dim=1))
+            starts = torch.searchsorted(keys, full)
+            ends = torch.searchsorted(keys, full, right=True)
+
+        return starts, torch.where(valid, ends - starts, 0)
+
+    def _plan(self, patterns: torch.Tensor):
+        """Group a batch of patterns by bound positions, with the permutation answering them"""
+        patterns = torch.as_tensor(patterns, dtype=torch.int64).reshape(-1, 3)
+        bound = patterns != ANY
+        codes = bound[:, 0] * 4 + bound[:, 1] * 2 + bound[:, 2]
+
+        starts = torch.zeros(len(patterns), dtype=torch.int64)
+        lengths = torch.zeros(len(patterns), dtype=torch.int64)
+        groups = []
+
+        for code in torch.unique(codes).tolist():
+            rows = (codes == code).nonzero().flatten()
+            name, num_bound = PATTERN_PLANS[(bool(code & 4), bool(code & 2), bool(code & 1))]
+            columns = patterns[rows][:, list(PERMUTATIONS[name])]
+            starts[rows], lengths[rows] = self._ranges(name, num_bound, columns)
+            groups.append((name, rows))
+
+        return starts, lengths, groups
+
+    def count(self, patterns: torch.Tensor) -> torch.Tensor:
+        """Number of triples matching each pattern
+
+        Args:
+            patterns (torch.Tensor): Patterns (B, 3), `ANY` marks the unbound positions
+
+        Returns:
+            torch.Tensor: Match counts (B,)
+        """
+        return self._plan(patterns)[1]
+
+    def match(self, patterns: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Triples matching each pattern of a batch, patterns may bind any combination of
+        subject, predicate and object
+
+        Args:
+            patterns (torch.Tensor): Patterns (B, 3), `ANY` marks the unbound positions
+
+        Returns:
+            Tuple[torch.Tensor, torch.Tensor]: Flat matching triples (M, 3) and offsets (B + 1,),
+            so that the matches of the i-th pattern are `values[offsets[i]:offsets[i + 1]]`,
+            sorted by the permutation answering the pattern
+        """
+        starts, lengths, groups = self._plan(patterns)
+
+        offsets = torch.zeros(len(lengths) + 1, dtype=torch.int64)
+        offsets[1:] = torch.cumsum(lengths, dim=0)
+        values = torch.empty((int(offsets[-1]), 3), dtype=torch.int64)
+
+        for name, rows in groups:
+            local, positions = ragged_ranges(starts[rows], lengths[rows])
+            first = torch.cumsum(lengths[rows], dim=0) - lengths[rows]
+            targets = offsets[rows][local] + torch.arange(len(local)) - first[local]
+            values[targets] = self._unpack(name, self._arrays[f"{name}_keys"][positions])
+
+        return values, offsets
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional
+
+import torch
+
+import kgsaf_jdex.utils.conventions.ids as idc
+from kgsaf_jdex.loaders.pytorch.index import CSRIndex, sorted_isin
+
+
+class Subgraph:
+    """Sampled subgraph, with nodes and edges relabeled to local indexes"""
+
+    def __init__(
+        self,
+        nodes: torch.Tensor,
+        is_class: torch.Tensor,
+        seeds: torch.Tensor,
+        edge_index: torch.Tensor,
+        edge_type: torch.Tensor,
+        edge_ids: torch.Tensor,
+    ):
+        """Initialize the subgraph
+
+        Args:
+            nodes (torch.Tensor): ID of each local node, an individual or a class ID (N,)
+            is_class (torch.Tensor): Boolean mask of the class nodes (N,)
+            seeds (torch.Tensor): Local index of each seed (B,)
+            edge_index (torch.Tensor): Local source and target of each edge (2, M)
+            edge_type (torch.Tensor): Relation ID of each edge, `NeighborSampler.type_relation` for type edges (M,)
+            edge_ids (torch.Tensor): Row of each edge in the sampled triples, -1 for type edges (M,)
+        """
+        self.nodes = nodes
+        self.is_class = is_class
+        self.seeds = seeds
+        self.edge_index = edge_index
+        self.edge_type = edge_type
+        self.edge_ids = edge_ids
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.nodes)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.edge_type)
+
+
+class NeighborSampler:
+    """Sample k-hop subgraphs around batches of seed individuals, for message passing models.
+
+    Edges incident to each node are stored in a CSR index. At every hop, at most `fanouts[k]`
+    edges of each frontier node are drawn without replacement, all the frontier at once: the
+    edges are shuffled within their node by sorting on node plus a random fraction. Type edges
+    from individuals to their asserted classes can be added for every sampled individual; they
+    are not followed by the sampling, so class nodes never join the frontier.
+    """
+
+    def __init__(
+        self,
+        kg,
+        fanouts: List[int],
+        relations: Optional[Iterable[int]] = None,
+        include_types: bool = False,
+        undirected: bool = True,
+        triples: Optional[torch.Tensor] = None,
+    ):
+        """Index the triples to be sampled
+
+        Args:
+            kg (KnowledgeGraph): Knowledge graph
+            fanouts (List[int]): Maximum number of edges sampled for each node at each hop, -1 for all of them
+            relations (Optional[Iterable[int]], optional): Relation IDs whose edges are sampled, all of them if None. Defaults to None.
+            include_types (bool, optional): Add the class assertion edges of the sampled individuals. Defaults to False.
+            undirected (bool, optional): Follow edges in both directions, outgoing edges only otherwise. Defaults to True.
+            triples (Optional[torch.Tensor], optional): Triples to be sampled (N, 3), `kg.train` if None. Defaults to None.
+        """
+        self.fanouts = list(fanouts)
+        self.include_types = include_types
+        self.num_individuals = kg.num_individuals
+        self.type_relation = kg.num_obj_props
+
+        triples = (kg.train if triples is None else triples).to(torch.int64).reshape(-1, 3)
+        edge_ids = torch.arange(len(triples))
+
+        if relations is not None:
+            allowed = torch.zeros(kg.num_obj_props, dtype=torch.bool)
+            allowed[torch.as_tensor(list(relations), dtype=torch.int64)] = True
+            keep = allowed[triples[:, 1]]
+            triples, edge_ids = triples[keep], edge_ids[keep]
+
+        self.triples = triples
+        self.edge_ids = edge_ids
+
+        # Incident edges of each individual, as positions in the kept triples
+        positions = torch.arange(len(triples))
+        nodes, incident = triples[:, 0], positions
+        if undirected:
+            nodes = torch.cat([nodes, triples[:, 2]])
+            incident = torch.cat([incident, positions])
+        self._incidence = CSRIndex(nodes, incident, num_rows=self.num_individuals)
+
+        self._types = None
+        if include_types:
+            self._types = CSRIndex.from_pairs(kg.class_assertions, num_rows=self.num_individuals)
+
+    def _sample_edges(
+        self, frontier: torch.Tensor, fanout: int, generator: Optional[torch.Generator]
+    ) -> torch.Tensor:
+        """At most `fanout` incident edges of each frontier node, drawn without replacement"""
+        edges, offsets = self._incidence.batch(frontier)
+        if fanout < 0 or len(edges) == 0:
+            return edges
+
+        degrees = offsets.diff()
+        rows = torch.repeat_interleave(torch.arange(len(frontier)), degrees)
+        noise = torch.rand(len(edges), generator=generator, dtype=torch.float64)
+        order = torch.argsort(rows.to(torch.float64) + noise)
+        rank = torch.arange(len(edges)) - offsets[:-1][rows]
+        return edges[order[rank < fanout]]
+
+    def sample(
+        self, seeds: torch.Tensor, generator: Optional[torch.Generator] = None
+    ) -> Subgraph:
+        """Sample the subgraph of a batch of seeds
+
+        Args:
+            seeds (torch.Tensor): Seed individual IDs (B,)
+            generator (Optional[torch.Generator], optional): Random number generator. Defaults to None.
+
+        Returns:
+            Subgraph: Relabeled subgraph
+        """
+        seeds = torch.as_tensor(seeds, dtype=torch.int64).flatten().contiguous()
+
+        visited = torch.unique(seeds)
+        frontier = visited
+        sampled = []
+
+        for fanout in self.fanouts:
+            if len(frontier) == 0:
+                break
+            edges = self._sample_edges(frontier, fanout, generator)
+            sampled.append(edges)
+
+            endpoints = torch.unique(torch.cat([self.triples[edges, 0], self.triples[edges, 2]]))
+            frontier = endpoints[~sorted_isin(endpoints, visited)]
+            visited = torch.sort(torch.cat([visited, frontier])).values
+
+        edges = torch.unique(torch.cat(sampled)) if sampled else visited[:0]
+        src, rel, dst = self.triples[edges].T.contiguous()
+        edge_ids = self.edge_ids[edges]
+
+        classes = visited[:0]
+        if self.include_types:
+            classes, offsets = self._types.batch(visited)
+            type_src = torch.repeat_interleave(visited, offsets.diff())
+            type_dst = classes + self.num_individuals - idc.THING
+
+            src = torch.cat([src, type_src])
+            dst = torch.cat([dst, type_dst])
+            rel = torch.cat([rel, torch.full_like(type_src, self.type_relation)])
+            edge_ids = torch.cat([edge_ids, torch.full_like(type_src, -1)])
+            classes = torch.unique(type_dst)
+
+        # Individuals first, then classes shifted past the individual IDs
+        nodes = torch.cat([visited, classes])
+        is_class = nodes >= self.num_individuals
+
+        return Subgraph(
+            nodes=torch.where(is_class, nodes - self.num_individuals + idc.THING, nodes),
+            is_class=is_class,
+            seeds=torch.searchsorted(nodes, seeds),
+            edge_index=torch.stack([torch.searchsorted(nodes, src), torch.searchsorted(nodes, dst)]),
+            edge_type=rel,
+            edge_ids=edge_ids,
+        )
+
+    def sample_many(
+        self,
+        batches: Iterable[torch.Tensor],
+        workers: Optional[int] = None,
+        seed: Optional[int] = None,
+    ) -> List[Subgraph]:
+        """Sample the subgraphs of independent batches on a thread pool, tensor operations
+        release the GIL so batches are sampled in parallel
+
+        Args:
+            batches (Iterable[torch.Tensor]): Seed batches
+            workers (Optional[int], optional): Number of threads, chosen by the executor if None. Defaults to None.
+            seed (Optional[int], optional): Base seed, the i-th batch is sampled with seed + i. Defaults to None.
+
+        Returns:
+            List[Subgraph]: Subgraph of each batch, in order
+        """
+        batches = list(batches)
+        generators = [
+            None if seed is None else torch.Generator().manual_seed(seed + i)
+            for i in range(len(batches))
+        ]
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(self.sample, batches, generators))
+
+    def __call__(self, seeds: torch.Tensor) -> Subgraph:
+        return self.sample(seeds)
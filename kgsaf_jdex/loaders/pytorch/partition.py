@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+
+import json
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import torch
+
+from kgsaf_jdex.loaders.pytorch.cache import read_tensor, write_tensor
+
+# Strategies assigning entities to partitions
+
+STRATEGIES = ["hash", "degree", "edge_cut"]
+
+# Metadata file of an exported partitioning
+
+PARTITIONS_FILE = "partitions.json"
+
+# Multiplier of the hash strategy (Knuth's multiplicative hash), IDs are hashed modulo 2^32 and
+# the high bits of the hash select the partition
+
+HASH_MULTIPLIER = 2654435761
+
+
+class Partitioning:
+    """Assignment of the entities to partitions, with entity IDs remapped to be contiguous
+    within each partition. Every entity is identified by its partition and its local ID, its
+    offset in the partition; triples are bucketed by (head partition, tail partition) and
+    stored with local head and tail IDs, as in PyTorch-BigGraph, so that a worker only needs
+    the embeddings of the partitions of its buckets.
+    """
+
+    def __init__(self, partition: torch.Tensor, num_partitions: int, strategy: Optional[str] = None):
+        """Initialize the partitioning from the partition of each entity
+
+        Args:
+            partition (torch.Tensor): Partition of each entity (E,)
+            num_partitions (int): Number of partitions
+            strategy (Optional[str], optional): Strategy the partitioning was computed with. Defaults to None.
+        """
+        self.partition = partition.to(torch.int64)
+        self.num_partitions = num_partitions
+        self.strategy = strategy
+
+        # Entities sorted by partition, then by ID: position is the remapped global ID
+        self.entity_ids = torch.argsort(self.partition, stable=True)
+        self.sizes = torch.bincount(self.partition, minlength=num_partitions)
+        self.offsets = torch.zeros(num_partitions + 1, dtype=torch.int64)
+        self.offsets[1:] = torch.cumsum(self.sizes, dim=0)
+
+        self.local_ids = torch.empty_like(self.partition)
+        self.local_ids[self.entity_ids] = torch.arange(len(self.partition)) - self.offsets[self.partition[self.entity_ids]]
+
+    @property
+    def num_entities(self) -> int:
+        return len(self.partition)
+
+    def entities(self, partition: int) -> torch.Tensor:
+        """Original IDs of the entities of a partition, indexed by local ID
+
+        Args:
+            partition (int): Partition
+
+        Returns:
+            torch.Tensor: Entity IDs
+        """
+        return self.entity_ids[self.offsets[partition] : self.offsets[partition + 1]]
+
+    def remap(self, ids: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Partition and local ID of a batch of entities
+
+        Args:
+            ids (torch.Tensor): Entity IDs
+
+        Returns:
+            Tuple[torch.Tensor, torch.Tensor]: Partitions and local IDs, same shape of the IDs
+        """
+        ids = torch.as_tensor(ids, dtype=torch.int64)
+        return self.partition[ids], self.local_ids[ids]
+
+    def edge_cut(self, triples: torch.Tensor) -> float:
+        """Fraction of the triples whose head and tail are in different partitions
+
+        Args:
+            triples (torch.Tensor): Triples (N, 3)
+
+        Returns:
+            float: Edge cut
+        """
+        triples = torch.as_tensor(triples, dtype=torch.int64).reshape(-1, 3)
+        if len(triples) == 0:
+            return 0.0
+        cut = self.partition[triples[:, 0]] != self.partition[triples[:, 2]]
+        return float(cut.double().mean())
+
+    def buckets(self, triples: torch.Tensor) -> Dict[Tuple[int, int], torch.Tensor]:
+        """Split triples in buckets by head and tail partition, with local head and tail IDs
+
+        Args:
+            triples (torch.Tensor): Triples (N, 3)
+
+        Returns:
+            Dict[Tuple[int, int], torch.Tensor]: Triples (M, 3) of every (head partition, tail partition) bucket, in input order
+        """
+        triples = torch.as_tensor(triples, dtype=torch.int64).reshape(-1, 3)
+        heads, head_ids = self.remap(triples[:, 0])
+        tails, tail_ids = self.remap(triples[:, 2])
+
+        keys = heads * self.num_partitions + tails
+        order = torch.argsort(keys, stable=True)
+        local = torch.stack([head_ids, triples[:, 1], tail_ids], dim=1)[order]
+        counts = torch.bincount(keys, minlength=self.num_partitions**2)
+
+        return {
+            (i // self.num_partitions, i % self.num_partitions): bucket
+            for i, bucket in enumerate(torch.split(local, counts.tolist()))
+        }
+
+    def write(self, path: str, triples: torch.Tensor, num_relations: Optional[int] = None):
+        """Export the partitioning and the bucketed triples as raw binary files that workers
+        memory-map with `read_bucket` and `Partitioning.read`:
+
+        - `entities/partition.bin` and `entities/local_ids.bin`, partition and local ID of each original entity ID
+        - `entities/<p>.bin`, original IDs of the entities of partition p, by local ID
+        - `buckets/<i>_<j>.bin`, triples (M, 3) with head in partition i and tail in partition j, with local IDs
+        - `partitions.json`, sizes of the partitions and buckets
+
+        Args:
+            path (str): Output folder
+            triples (torch.Tensor): Triples (N, 3)
+            num_relations (Optional[int], optional): Number of relations, recorded in the metadata. Defaults to None.
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+
+        write_tensor(path / "entities" / "partition.bin", self.partition)
+        write_tensor(path / "entities" / "local_ids.bin", self.local_ids)
+        for p in range(self.num_partitions):
+            write_tensor(path / "entities" / f"{p}.bin", self.entities(p))
+
+        buckets = self.buckets(triples)
+        for (i, j), bucket in buckets.items():
+            write_tensor(path / "buckets" / f"{i}_{j}.bin", bucket)
+
+        metadata = {
+            "num_partitions": self.num_partitions,
+            "num_entities": self.num_entities,
+            "num_relations": num_relations,
+            "strategy": self.strategy,
+            "sizes": self.sizes.tolist(),
+            "buckets": {f"{i}_{j}": len(bucket) for (i, j), bucket in buckets.items()},
+        }
+        with open(path / PARTITIONS_FILE, "w") as f:
+            json.dump(metadata, f, indent=4)
+
+    @classmethod
+    def read(cls, path: str) -> "Partitioning":
+        """Read an exported partitioning
+
+        Args:
+            path (str): Output folder of `write`
+
+        Returns:
+            Partitioning: Partitioning
+        """
+        metadata = read_metadata(path)
+        partition = read_tensor(Path(path) / "entities" / "partition.bin", [metadata["num_entities"]], torch.int64)
+        return cls(partition, metadata["num_partitions"], metadata["strategy"])
+
+
+def read_metadata(path: str) -> dict:
+    """Metadata of an exported partitioning, see `Partitioning.write`
+
+    Args:
+        path (str): Output folder of `Partitioning.write`
+
+    Returns:
+        dict: Metadata
+    """
+    with open(Path(path) / PARTITIONS_FILE, "r") as f:
+        return json.load(f)
+
+
+def read_bucket(path: str, head_partition: int, tail_partition: int, metadata: Optional[dict] = None) -> torch.Tensor:
+    """Memory-map the triples of a bucket of an exported partitioning, without reading the
+    other buckets
+
+    Args:
+        path (str): Output folder of `Partitioning.write`
+        head_partition (int): Partition of the heads
+        tail_partition (int): Partition of the tails
+        metadata (Optional[dict], optional): Metadata of the partitioning, read from the folder if None. Defaults to None.
+
+    Returns:
+        torch.Tensor: Triples (M, 3) with local head and tail IDs
+    """
+    metadata = read_metadata(path) if metadata is None else metadata
+    name = f"{head_partition}_{tail_partition}"
+    return read_tensor(Path(path) / "buckets" / f"{name}.bin", [metadata["buckets"][name], 3], torch.int64)
+
+
+def read_entities(path: str, partition: int, metadata: Optional[dict] = None) -> torch.Tensor:
+    """Memory-map the original IDs of the entities of a partition of an exported partitioning,
+    indexed by local ID
+
+    Args:
+        path (str): Output folder of `Partitioning.write`
+        partition (int): Partition
+        metadata (Optional[dict], optional): Metadata of the partitioning, read from the folder if None. Defaults to None.
+
+    Returns:
+        torch.Tensor: Entity IDs
+    """
+    metadata = read_metadata(path) if metadata is None else metadata
+    return read_tensor(Path(path) / "entities" / f"{partition}.bin", [metadata["sizes"][partition]], torch.int64)
+
+
+class GraphPartitioner:
+    """Partition the entities of a knowledge graph for distributed training:
+
+    - `hash` spreads the entities with a multiplicative hash of their ID
+    - `degree` balances the number of triples of each partition: entities are sorted by degree and dealt to the partitions back and forth
+    - `edge_cut` starts from the degree-balanced partitioning and refines it by label propagation, moving every entity to the partition holding most of its neighbors while no partition exceeds its capacity, which reduces the triples whose head and tail are in different partitions
+
+    Every round of label propagation is vectorized: the neighbors of every entity in each
+    partition are counted at once, and a random half of the improving moves is applied, the
+    ones with the largest gains first, to avoid neighbors swapping partitions back and forth.
+    """
+
+    def __init__(
+        self,
+        kg,
+        num_partitions: int,
+        strategy: str = "degree",
+        triples: Optional[torch.Tensor] = None,
+        iterations: int = 10,
+        imbalance: float = 0.05,
+        seed: int = 0,
+    ):
+        """Initialize the partitioner
+
+        Args:
+            kg (KnowledgeGraph): Knowledge graph
+            num_partitions (int): Number of partitions
+            strategy (str, optional): Partitioning strategy, one of `STRATEGIES`. Defaults to "degree".
+            triples (Optional[torch.Tensor], optional): Triples to be partitioned (N, 3), `kg.train` if None. Defaults to None.
+            iterations (int, optional): Label propagation rounds of the edge_cut strategy. Defaults to 10.
+            imbalance (float, optional): Maximum relative excess of entities of a partition over the average, for the edge_cut strategy. Defaults to 0.05.
+            seed (int, optional): Seed of the hash and of the label propagation. Defaults to 0.
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy {strategy}, available strategies are {STRATEGIES}")
+        if num_partitions < 1:
+            raise ValueError(f"The number of partitions must be positive, got {num_partitions}")
+
+        self.num_partitions = num_partitions
+        self.strategy = strategy
+        self.iterations = iterations
+        self.imbalance = imbalance
+        self.seed = seed
+
+        self.num_entities = kg.num_individuals
+        self.num_relations = kg.num_obj_props
+        self.triples = torch.as_tensor(kg.train if triples is None else triples, dtype=torch.int64).reshape(-1, 3)
+
+    def partition(self) -> Partitioning:
+        """Assign the entities to partitions
+
+        Returns:
+            Partitioning: Partitioning of the entities
+        """
+        if self.strategy == "hash":
+            partition = self._hash()
+        elif self.strategy == "degree":
+            partition = self._degree()
+        else:
+            partition = self._edge_cut(self._degree())
+        return Partitioning(partition, self.num_partitions, self.strategy)
+
+    def write(self, path: str) -> Partitioning:
+        """Partition the entities and export the bucketed triples, see `Partitioning.write`
+
+        Args:
+            path (str): Output folder
+
+        Returns:
+            Partitioning: Partitioning of the entities
+        """
+        partitioning = self.partition()
+        partitioning.write(path, self.triples, self.num_relations)
+        return partitioning
+
+    # Strategies
+
+    def _hash(self) -> torch.Tensor:
+        ids = torch.arange(self.num_entities) + self.seed
+        return ((ids * HASH_MULTIPLIER) % 2**32 * self.num_partitions) >> 32
+
+    def _degree(self) -> torch.Tensor:
+        degree = torch.bincount(self.triples[:, 0], minlength=self.num_entities)
+        degree += torch.bincount(self.triples[:, 2], minlength=self.num_entities)
+
+        # Deal the entities by decreasing degree: 0, 1, ..., P - 1, P - 1, ..., 1, 0, 0, 1, ...
+        order = torch.argsort(degree, descending=True, stable=True)
+        rank = torch.arange(self.num_entities)
+        position = rank % self.num_partitions
+        backwards = (rank // self.num_partitions) % 2 == 1
+
+        partition = torch.empty(self.num_entities, dtype=torch.int64)
+        partition[order] = torch.where(backwards, self.num_partitions - 1 - position, position)
+        return partition
+
+    def _edge_cut(self, partition: torch.Tensor) -> torch.Tensor:
+        """Refine a partitioning by capacity constrained label propagation
+
+        Args:
+            partition (torch.Tensor): Initial partition of each entity (E,)
+
+        Returns:
+            torch.Tensor: Refined partition of each entity (E,)
+        """
+        generator = torch.Generator().manual_seed(self.seed)
+        num_partitions = self.num_partitions
+        capacity = int((1 + self.imbalance) * self.num_entities / num_partitions) + 1
+
+        # Undirected edges, self loops never cross partitions
+        heads, tails = self.triples[:, 0], self.triples[:, 2]
+        loops = heads == tails
+        src = torch.cat([heads[~loops], tails[~loops]])
+        dst = torch.cat([tails[~loops], heads[~loops]])
+
+        partition = partition.clone()
+        entities = torch.arange(self.num_entities)
+
+        for _ in range(self.iterations):
+            # Neighbors of every entity in each partition, as sorted (entity, partition) keys
+            keys, counts = torch.unique(src * num_partitions + partition[dst], return_counts=True)
+            owners = keys // num_partitions
+
+            best = torch.zeros(self.num_entities, dtype=torch.int64)
+            best = best.scatter_reduce(0, owners, counts, reduce="amax")
+
+            # Lowest partition with the most neighbors of each entity
+            candidates = (counts == best[owners]).nonzero().flatten()
+            first = torch.ones(len(candidates), dtype=torch.bool)
+            first[1:] = owners[candidates[1:]] != owners[candidates[:-1]]
+            target = partition.clone()
+            target[owners[candidates[first]]] = keys[candidates[first]] % num_partitions
+
+            current = torch.zeros(self.num_entities, dtype=torch.int64)
+            if len(keys) > 0:
+                own = entities * num_partitions + partition
+                positions = torch.searchsorted(keys, own).clamp(max=len(keys) - 1)
+                current = torch.where(keys[positions] == own, counts[positions], 0)
+
+            gain = best - current
+            movers = entities[(gain > 0) & (target != partition)]
+            movers = movers[torch.rand(len(movers), generator=generator) < 0.5]
+            if len(movers) == 0:
+                break
+
+            # Largest gains first, each partition admits entities up to its capacity
+            order = torch.argsort(gain[movers], descending=True, stable=True)
+            movers = movers[order]
+            order = torch.argsort(target[movers], stable=True)
+            movers = movers[order]
+            destinations = target[movers]
+
+            sizes = torch.bincount(partition, minlength=num_partitions)
+            starts = torch.cumsum(torch.bincount(destinations, minlength=num_partitions), dim=0)
+            starts = starts - torch.bincount(destinations, minlength=num_partitions)
+            rank = torch.arange(len(movers)) - starts[destinations]
+            admitted = rank < (capacity - sizes).clamp(min=0)[destinations]
+
+            partition[movers[admitted]] = destinations[admitted]
+
+        return partition
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+
+from typing import Iterable, Optional, Tuple
+
+import torch
+
+import kgsaf_jdex.utils.conventions.ids as idc
+from kgsaf_jdex.loaders.pytorch.index import CSRIndex, KnownTripleIndex, sorted_isin
+from kgsaf_jdex.utils.instrumentation import PhaseRecorder
+
+
+class Materializer:
+    """Forward chaining materialization of the RDFS entailments supported by the schema of the
+    datasets, computed over the integer encoded tensors of a knowledge graph:
+
+    - subclass and subproperty transitivity, from the closures of the taxonomy and of the
+      object property hierarchy
+    - type propagation through the taxonomy, `C(x), C ⊑ D => D(x)`
+    - domain and range typing, `p(x, y), ∃p.⊤ ⊑ C => C(x)` and `p(x, y), ⊤ ⊑ ∀p.C => C(y)`
+    - subproperty propagation of the triples, `p(x, y), p ⊑ q => q(x, y)`
+
+    Domain and range typing only fires for relations with a single domain (range) class: the
+    RBox is flattened into one row per class, so the classes of an `owl:unionOf` domain cannot
+    be told apart from separate domain axioms, and asserting all of them would turn the union
+    into an intersection.
+
+    Rules are applied semi-naively: at every round only the triples and class assertions
+    derived in the previous round are joined with the schema, until no new fact is derived.
+    Joins are batched CSR lookups, and facts are kept as sorted int64 keys so that new ones are
+    found with a single `searchsorted`.
+    """
+
+    def __init__(
+        self,
+        kg,
+        splits: Optional[Iterable[str]] = None,
+        include_thing: bool = False,
+        recorder: Optional[PhaseRecorder] = None,
+    ):
+        """Index the schema of the knowledge graph
+
+        Args:
+            kg (KnowledgeGraph): Knowledge graph
+            splits (Optional[Iterable[str]], optional): ABox splits whose triples are materialized, only "train" if None, so that no fact of the evaluation splits is inferred into the training data. Defaults to None.
+            include_thing (bool, optional): Also infer the trivial `owl:Thing` class assertions. Defaults to False.
+            recorder (Optional[PhaseRecorder], optional): Records the materialization phases, the recorder of the knowledge graph if None. Defaults to None.
+        """
+        self.kg = kg
+        self.splits = ["train"] if splits is None else list(splits)
+        self.include_thing = include_thing
+        self.recorder = recorder if recorder is not None else kg.recorder
+        self.rounds = 0
+
+        self.num_individuals = kg.num_individuals
+        self.num_classes = kg.num_classes
+        self.num_obj_props = kg.num_obj_props
+
+        self.taxonomy = kg.taxonomy_closure
+        self.obj_prop_hierarchy = kg.obj_props_hierarchy_closure
+        self.domains = self._schema_index(kg.obj_props_domain)
+        self.ranges = self._schema_index(kg.obj_props_range)
+
+    def _schema_index(self, pairs: torch.Tensor) -> CSRIndex:
+        pairs = torch.unique(pairs.to(torch.int64).reshape(-1, 2), dim=0)
+        degree = torch.bincount(pairs[:, 0], minlength=self.num_obj_props)
+        pairs = pairs[degree[pairs[:, 0]] == 1]
+        if not self.include_thing:
+            pairs = pairs[pairs[:, 1] != idc.THING]
+        return CSRIndex.from_pairs(pairs, num_rows=self.num_obj_props)
+
+    # Keys
+
+    def _pack_types(self, individuals: torch.Tensor, classes: torch.Tensor) -> torch.Tensor:
+        return individuals * (self.num_classes + 1) + (classes - idc.THING)
+
+    def _unpack_types(self, keys: torch.Tensor) -> torch.Tensor:
+        width = self.num_classes + 1
+        return torch.stack([keys // width, keys % width + idc.THING], dim=1)
+
+    @staticmethod
+    def _new(candidates: torch.Tensor, keys: torch.Tensor) -> torch.Tensor:
+        candidates = torch.unique(candidates)
+        return candidates[~sorted_isin(candidates, keys)]
+
+    @staticmethod
+    def _merge(keys: torch.Tensor, delta: torch.Tensor) -> torch.Tensor:
+        return torch.sort(torch.cat([keys, delta])).values
+
+    # Rules
+
+    @staticmethod
+    def _join(ids: torch.Tensor, lookup) -> Tuple[torch.Tensor, torch.Tensor]:
+        values, offsets = lookup(ids)
+        rows = torch.repeat_interleave(torch.arange(len(ids)), offsets.diff())
+        return rows, values
+
+    def _subproperty_triples(self, triples: torch.Tensor) -> torch.Tensor:
+        rows, relations = self._join(triples[:, 1], self.obj_prop_hierarchy.ancestors)
+        return torch.stack([triples[rows, 0], relations, triples[rows, 2]], dim=1)
+
+    def _domain_range_types(self, triples: torch.Tensor) -> torch.Tensor:
+        rows, domains = self._join(triples[:, 1], self.domains.batch)
+        heads = torch.stack([triples[rows, 0], domains], dim=1)
+        rows, ranges = self._join(triples[:, 1], self.ranges.batch)
+        tails = torch.stack([triples[rows, 2], ranges], dim=1)
+        return torch.cat([heads, tails])
+
+    def _taxonomy_types(self, types: torch.Tensor) -> torch.Tensor:
+        rows, classes = self._join(types[:, 1], self.taxonomy.ancestors)
+        inferred = torch.stack([types[rows, 0], classes], dim=1)
+        if not self.include_thing:
+            inferred = inferred[inferred[:, 1] != idc.THING]
+        return inferred
+
+    # Materialization
+
+    def materialize(self) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Apply the rules to a fixpoint
+
+        Returns:
+            Tuple[torch.Tensor, torch.Tensor]: Inferred class assertions (N, 2) and inferred triples (M, 3), sorted and not asserted in the knowledge graph
+        """
+        with self.recorder.phase("materialize") as phase:
+            triples = torch.cat([self.kg._component(split).reshape(-1, 3) for split in self.splits])
+            known = KnownTripleIndex(triples, self.num_individuals, self.num_obj_props)
+            asserted = self.kg.class_assertions.to(torch.int64).reshape(-1, 2)
+
+            triple_keys = known.keys
+            type_keys = torch.unique(self._pack_types(asserted[:, 0], asserted[:, 1]))
+            triple_delta, type_delta = known.triples, self._unpack_types(type_keys)
+            inferred_triples, inferred_types = [], []
+
+            self.rounds = 0
+            while len(triple_delta) > 0 or len(type_delta) > 0:
+                self.rounds += 1
+
+                new = self._subproperty_triples(triple_delta)
+                new = self._new(known.pack(new[:, 0], new[:, 1], new[:, 2]), triple_keys)
+
+                types = torch.cat([self._domain_range_types(triple_delta), self._taxonomy_types(type_delta)])
+                new_types = self._new(self._pack_types(types[:, 0], types[:, 1]), type_keys)
+
+                triple_keys = self._merge(triple_keys, new)
+                type_keys = self._merge(type_keys, new_types)
+                inferred_triples.append(new)
+                inferred_types.append(new_types)
+
+                triple_delta = KnownTripleIndex(None, self.num_individuals, self.num_obj_props, keys=new).triples
+                type_delta = self._unpack_types(new_types)
+
+            inferred_triples = torch.sort(torch.cat([known.keys[:0], *inferred_triples])).values
+            inferred_types = torch.sort(torch.cat([type_keys[:0], *inferred_types])).values
+
+            class_assertions = self._unpack_types(inferred_types)
+            triples = KnownTripleIndex(None, self.num_individuals, self.num_obj_props, keys=inferred_triples).triples
+            phase.set(len(class_assertions) + len(triples), rounds=self.rounds, splits="+".join(self.splits))
+
+        return class_assertions, triples
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+
+from typing import Optional, Union
+
+import torch
+
+import kgsaf_jdex.utils.conventions.ids as idc
+from kgsaf_jdex.loaders.pytorch.index import CSRIndex, KnownTripleIndex
+
+# Sides of the triple that can be corrupted
+
+CORRUPTIONS = ["head", "tail", "both"]
+
+
+class CandidatePool:
+    """Entities that can replace the head (or the tail) of the triples of each relation. The
+    compatible entities of a relation are stored as a CSR index from relation ID to entity IDs,
+    relations without a constraint draw from every entity.
+    """
+
+    def __init__(self, index: CSRIndex, constrained: torch.Tensor, num_entities: int):
+        """Initialize the pool from its index, see `from_schema` and `uniform` to build it
+
+        Args:
+            index (CSRIndex): Compatible entities of each relation
+            constrained (torch.Tensor): Boolean mask of the relations sampled from the index (R,)
+            num_entities (int): Number of entities, candidates of the unconstrained relations
+        """
+        self.index = index
+        self.constrained = constrained & (index.degree(torch.arange(len(constrained))) > 0)
+        self.num_entities = num_entities
+
+    @classmethod
+    def uniform(cls, num_entities: int, num_relations: int) -> "CandidatePool":
+        """Pool where every entity is a candidate for every relation
+
+        Args:
+            num_entities (int): Number of entities
+            num_relations (int): Number of relations
+
+        Returns:
+            CandidatePool: Unconstrained pool
+        """
+        empty = torch.empty(0, dtype=torch.int64)
+        index = CSRIndex(empty, empty, num_rows=num_relations)
+        return cls(index, torch.zeros(num_relations, dtype=torch.bool), num_entities)
+
+    @classmethod
+    def from_schema(cls, kg, kind: int) -> "CandidatePool":
+        """Pool of the entities compatible with the domain (or range) of each relation: the
+        instances of at least one of its domain classes, where the asserted types of every
+        individual are expanded with their ancestors in the taxonomy. Relations without a
+        domain, with `idc.THING` in the domain or whose domain has no instances are
+        unconstrained.
+
+        Args:
+            kg (KnowledgeGraph): Knowledge graph
+            kind (int): `idc.DOMAIN` for head candidates, `idc.RANGE` for tail candidates
+
+        Returns:
+            CandidatePool: Schema-aware pool
+        """
+        num_entities, num_relations = kg.num_individuals, kg.num_obj_props
+
+        schema = kg.obj_props_domain if kind == idc.DOMAIN else kg.obj_props_range
+        schema = schema.to(torch.int64).reshape(-1, 2)
+
+        constrained = torch.zeros(num_relations, dtype=torch.bool)
+        constrained[schema[:, 0]] = True
+        constrained[schema[schema[:, 1] == idc.THING][:, 0]] = False
+        schema = schema[constrained[schema[:, 0]]]
+
+        # Instances of each class, including the instances of its subclasses
+        assertions = kg.class_assertions.to(torch.int64).reshape(-1, 2)
+        ancestors, offsets = kg.taxonomy_closure.ancestors(assertions[:, 1])
+        rows = torch.repeat_interleave(torch.arange(len(assertions)), offsets.diff())
+        types = torch.cat([assertions, torch.stack([assertions[rows, 0], ancestors], dim=1)])
+        instances = CSRIndex.from_pairs(types, reverse=True, offset=-idc.THING)
+
+        entities, offsets = instances.batch(schema[:, 1])
+        rows = torch.repeat_interleave(torch.arange(len(schema)), offsets.diff())
+        keys = torch.unique(schema[rows, 0] * num_entities + entities)
+
+        index = CSRIndex(keys // num_entities, keys % num_entities, num_rows=num_relations)
+        return cls(index, constrained, num_entities)
+
+    def sizes(self, relations: torch.Tensor) -> torch.Tensor:
+        """Number of candidates of each relation
+
+        Args:
+            relations (torch.Tensor): Relation IDs
+
+        Returns:
+            torch.Tensor: Candidate counts, same shape of the relations
+        """
+        relations = torch.as_tensor(relations, dtype=torch.int64)
+        degree = self.index.degree(relations.flatten()).reshape(relations.shape)
+        return torch.where(self._constrained(relations), degree, self.num_entities)
+
+    def sample(
+        self, relations: torch.Tensor, generator: Optional[torch.Generator] = None
+    ) -> torch.Tensor:
+        """Draw one candidate uniformly at random for each relation
+
+        Args:
+            relations (torch.Tensor): Relation IDs
+            generator (Optional[torch.Generator], optional): Random number generator. Defaults to None.
+
+        Returns:
+            torch.Tensor: Entity IDs, same shape of the relations
+        """
+        relations = torch.as_tensor(relations, dtype=torch.int64)
+        noise = torch.rand(relations.shape, generator=generator, dtype=torch.float64)
+        out = (noise * self.num_entities).to(torch.int64)
+
+        constrained = self._constrained(relations)
+        if len(self.index.indices) == 0 or not bool(constrained.any()):
+            return out
+
+        relations = relations[constrained]
+        starts = self.index.indptr[relations]
+        lengths = self.index.indptr[relations + 1] - starts
+        picks = torch.minimum((noise[constrained] * lengths).to(torch.int64), lengths - 1)
+        out[constrained] = self.index.indices[starts + picks]
+        return out
+
+    def _constrained(self, relations: torch.Tensor) -> torch.Tensor:
+        valid = (relations >= 0) & (relations < len(self.constrained))
+        return valid & self.constrained[torch.where(valid, relations, 0)]
+
+
+class NegativeSampler:
+    """Generate negative triples by corrupting the head or the tail of positive triples.
+
+    With `typed=True` the replacement entities are drawn from the instances of the domain (for
+    heads) or range (for tails) of the relation, so that negatives are not trivially ruled out
+    by the schema. With `filtered=True` negatives that are known positives are drawn again, up
+    to `max_retries` times. Sampling is done for the whole batch with tensor operations, the
+    candidate pools are computed once at construction.
+    """
+
+    def __init__(
+        self,
+        kg,
+        num_negatives: int = 1,
+        corrupt: str = "both",
+        typed: bool = True,
+        filtered: bool = False,
+        known: Optional[Union[torch.Tensor, KnownTripleIndex]] = None,
+        max_retries: int = 10,
+        generator: Optional[torch.Generator] = None,
+    ):
+        """Initialize the sampler and compute the candidate pools
+
+        Args:
+            kg (KnowledgeGraph): Knowledge graph the positives come from
+            num_negatives (int, optional): Negatives generated for each positive. Defaults to 1.
+            corrupt (str, optional): Side to corrupt, one of `CORRUPTIONS`, "both" picks one at random for each negative. Defaults to "both".
+            typed (bool, optional): Sample domain and range compatible entities, uniform entities otherwise. Defaults to True.
+            filtered (bool, optional): Draw again negatives that are known positives. Defaults to False.
+            known (Optional[Union[torch.Tensor, KnownTripleIndex]], optional): Known positive triples (N, 3) or their index, `kg.known_triples` if None. Defaults to None.
+            max_retries (int, optional): Maximum number of draws of a filtered negative. Defaults to 10.
+            generator (Optional[torch.Generator], optional): Random number generator. Defaults to None.
+        """
+        if corrupt not in CORRUPTIONS:
+            raise ValueError(f"Unknown corruption {corrupt}, available corruptions are {CORRUPTIONS}")
+
+        self.num_negatives = num_negatives
+        self.corrupt = corrupt
+        self.filtered = filtered
+        self.max_retries = max_retries
+        self.generator = generator
+
+        self.num_entities = kg.num_individuals
+        self.num_relations = kg.num_obj_props
+
+        if typed:
+            self.head_pool = CandidatePool.from_schema(kg, idc.DOMAIN)
+            self.tail_pool = CandidatePool.from_schema(kg, idc.RANGE)
+        else:
+            self.head_pool = CandidatePool.uniform(self.num_entities, self.num_relations)
+            self.tail_pool = self.head_pool
+
+        self.known = None
+        if filtered:
+            if known is None:
+                known = kg.known_triples
+            elif not isinstance(known, KnownTripleIndex):
+                known = KnownTripleIndex(known, self.num_entities, self.num_relations)
+            self.known = known
+
+    def _corrupt_heads(self, num: int) -> torch.Tensor:
+        if self.corrupt == "head":
+            return torch.ones(num, dtype=torch.bool)
+        if self.corrupt == "tail":
+            return torch.zeros(num, dtype=torch.bool)
+        return torch.rand(num, generator=self.generator) < 0.5
+
+    def _replace(self, negatives: torch.Tensor, heads: torch.Tensor, rows: torch.Tensor):
+        head_rows, tail_rows = rows[heads[rows]], rows[~heads[rows]]
+        negatives[head_rows, 0] = self.head_pool.sample(negatives[head_rows, 1], self.generator)
+        negatives[tail_rows, 2] = self.tail_pool.sample(negatives[tail_rows, 1], self.generator)
+
+    def sample(self, triples: torch.Tensor) -> torch.Tensor:
+        """Corrupt a batch of positive triples
+
+        Args:
+            triples (torch.Tensor): Positive triples (B, 3)
+
+        Returns:
+            torch.Tensor: Negative triples (B, num_negatives, 3)
+        """
+        triples = torch.as_tensor(triples, dtype=torch.int64).reshape(-1, 3)
+        negatives = triples.repeat_interleave(self.num_negatives, dim=0)
+
+        heads = self._corrupt_heads(len(negatives))
+        rows = torch.arange(len(negatives))
+        self._replace(negatives, heads, rows)
+
+        if self.filtered:
+            # Only the negatives drawn again in the previous round need to be checked
+            for _ in range(self.max_retries):
+                rows = rows[self.known.contains(negatives[rows])]
+                if len(rows) == 0:
+                    break
+                self._replace(negatives, heads, rows)
+
+        return negatives.reshape(len(triples), self.num_negatives, 3)
+
+    def __call__(self, triples: torch.Tensor) -> torch.Tensor:
+        return self.sample(triples)
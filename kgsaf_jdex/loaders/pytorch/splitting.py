@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import torch
+
+import kgsaf_jdex.utils.conventions.paths as pc
+from kgsaf_jdex.loaders.pytorch.index import ragged_ranges
+from kgsaf_jdex.utils.instrumentation import PhaseRecorder, get_recorder
+
+# Split labels of the triples, in the order of `SPLIT_FILES`, and of the dropped triples
+
+SPLITS = ["train", "valid", "test"]
+
+SPLIT_FILES = [pc.TRAIN, pc.VALID, pc.TEST]
+
+DROPPED = -1
+
+# Defaults of the KG-SaF datasets: split ratios, minimum number of triples of a relation, and
+# minimum overlap of two relations for one of them to be removed as leaking
+
+RATIOS = [0.84, 0.08, 0.08]
+
+MIN_TRIPLES_RELATION = 2
+
+MINIMUM_FREQUENCY = 0.97
+
+# Number of triples decoded and written at once
+
+CHUNK_SIZE = 1 << 20
+
+
+class TripleSplitter:
+    """Seeded train, validation and test split of integer encoded triples, with the cleaning
+    steps applied to the KG-SaF datasets:
+
+    - duplicate triples are dropped, only the first occurrence is kept
+    - relations with less than `min_triples_relation` triples are dropped
+    - inverse and duplicate relation leakage is removed: two relations leak when the (head,
+      tail) pairs of one of them, reversed for inverse relations, cover at least
+      `minimum_frequency` of the pairs of both, and the one with fewer triples is dropped
+    - every entity and relation of the kept triples appears in the training split: the first
+      triple of each of them in a seeded random order goes to train, and the other triples are
+      split in that order to reach the ratios
+
+    Leakage is detected over all the triples before splitting, so that dropping a relation
+    never removes the only training triple of an entity. Every step is vectorized, relation
+    pairs are found by joining the sorted (head, tail) keys of the triples, and the split is a
+    label per triple, so triples keep their input order in every split.
+    """
+
+    def __init__(
+        self,
+        ratios: Sequence[float] = RATIOS,
+        seed: int = 0,
+        min_triples_relation: int = MIN_TRIPLES_RELATION,
+        minimum_frequency: Optional[float] = MINIMUM_FREQUENCY,
+        recorder: Optional[PhaseRecorder] = None,
+    ):
+        """Initialize the splitter
+
+        Args:
+            ratios (Sequence[float], optional): Fractions of the train, validation and test triples, summing to 1. Defaults to RATIOS.
+            seed (int, optional): Random seed, the same triples and seed always give the same split. Defaults to 0.
+            min_triples_relation (int, optional): Minimum number of distinct triples of a kept relation. Defaults to MIN_TRIPLES_RELATION.
+            minimum_frequency (Optional[float], optional): Minimum overlap of two leaking relations, no leakage removal if None. Defaults to MINIMUM_FREQUENCY.
+            recorder (Optional[PhaseRecorder], optional): Records the splitting phases, the process wide recorder if None. Defaults to None.
+
+        Raises:
+            ValueError: If the ratios are not valid
+        """
+        ratios = [float(ratio) for ratio in ratios]
+        if len(ratios) != len(SPLITS) or min(ratios) < 0 or abs(sum(ratios) - 1) > 1e-6:
+            raise ValueError(f"Invalid split ratios {ratios}, expected {len(SPLITS)} non negative ratios summing to 1")
+        if minimum_frequency is not None and not 0 < minimum_frequency <= 1:
+            raise ValueError(f"Invalid minimum frequency {minimum_frequency}")
+
+        self.ratios = ratios
+        self.seed = seed
+        self.min_triples_relation = min_triples_relation
+        self.minimum_frequency = minimum_frequency
+        self.recorder = recorder if recorder is not None else get_recorder()
+
+        self.leaking_pairs = torch.empty((0, 2), dtype=torch.int64)
+        self.leaking_relations = torch.empty(0, dtype=torch.int64)
+
+    # Cleaning
+
+    @staticmethod
+    def _first_occurrences(keys: torch.Tensor) -> torch.Tensor:
+        """Mask of the first occurrence of every key"""
+        sorted_keys, order = torch.sort(keys, stable=True)
+        first = torch.ones(len(keys), dtype=torch.bool)
+        first[1:] = sorted_keys[1:] != sorted_keys[:-1]
+        out = torch.zeros(len(keys), dtype=torch.bool)
+        out[order] = first
+        return out
+
+    @staticmethod
+    def _relation_overlaps(
+        triples: torch.Tensor, num_entities: int, inverse: bool
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Number of (head, tail) pairs of a relation that are also pairs of another one,
+        reversed if `inverse`. The count is the same from both relations, so every pair of
+        relations is returned once, lower ID first
+
+        Returns:
+            Tuple[torch.Tensor, torch.Tensor]: Relation pairs (P, 2) and their shared pairs (P,)
+        """
+        heads, relations, tails = triples.unbind(dim=1)
+        keys, order = torch.sort(heads * num_entities + tails)
+        queries = tails * num_entities + heads if inverse else keys[torch.argsort(order)]
+
+        starts = torch.searchsorted(keys, queries)
+        lengths = torch.searchsorted(keys, queries, right=True) - starts
+        rows, positions = ragged_ranges(starts, lengths)
+
+        pairs = torch.stack([relations[rows], relations[order[positions]]], dim=1)
+        pairs = pairs[pairs[:, 0] < pairs[:, 1]]
+        if len(pairs) == 0:
+            return pairs.reshape(0, 2), torch.empty(0, dtype=torch.int64)
+        return torch.unique(pairs, dim=0, return_counts=True)
+
+    def leakage(self, triples: torch.Tensor, num_entities: Optional[int] = None) -> torch.Tensor:
+        """Find the relations leaking through an inverse or duplicate relation, the leaking
+        relation pairs are kept in `leaking_pairs`
+
+        Args:
+            triples (torch.Tensor): Distinct triples (N, 3)
+            num_entities (Optional[int], optional): Number of entities, one more than the highest ID if None. Defaults to None.
+
+        Returns:
+            torch.Tensor: Sorted IDs of the relations to be dropped
+        """
+        triples = torch.as_tensor(triples, dtype=torch.int64).reshape(-1, 3)
+        self.leaking_pairs = torch.empty((0, 2), dtype=torch.int64)
+        self.leaking_relations = torch.empty(0, dtype=torch.int64)
+        if self.minimum_frequency is None or len(triples) == 0:
+            return self.leaking_relations
+
+        num_entities = num_entities or int(triples[:, [0, 2]].max()) + 1
+        sizes = torch.bincount(triples[:, 1])
+
+        pairs, frequencies = [], []
+        for inverse in (False, True):
+            overlapping, counts = self._relation_overlaps(triples, num_entities, inverse)
+            pairs.append(overlapping)
+            frequencies.append(counts / torch.maximum(sizes[overlapping[:, 0]], sizes[overlapping[:, 1]]))
+
+        pairs, frequencies = torch.cat(pairs), torch.cat(frequencies)
+        leaking = frequencies >= self.minimum_frequency
+        pairs, frequencies = pairs[leaking], frequencies[leaking]
+        self.leaking_pairs = pairs
+
+        # Drop the relation with fewer triples (the higher ID on ties) of every pair, starting
+        # from the most overlapping pairs and skipping the ones already broken by a drop
+        dropped = set()
+        for first, second in pairs[torch.argsort(frequencies, descending=True, stable=True)].tolist():
+            if first in dropped or second in dropped:
+                continue
+            dropped.add(first if sizes[first] < sizes[second] else second)
+
+        self.leaking_relations = torch.tensor(sorted(dropped), dtype=torch.int64)
+        return self.leaking_relations
+
+    # Splitting
+
+    def _coverage_split(self, triples: torch.Tensor, num_entities: int, num_relations: int) -> torch.Tensor:
+        """Split labels of the cleaned triples, see `SPLITS`"""
+        num_triples = len(triples)
+        generator = torch.Generator().manual_seed(self.seed)
+        order = torch.randperm(num_triples, generator=generator)
+        rank = torch.empty(num_triples, dtype=torch.int64)
+        rank[order] = torch.arange(num_triples)
+
+        # First triple of every entity and relation in the random order
+        covered = torch.zeros(num_triples, dtype=torch.bool)
+        for ids, ranks, num in (
+            (triples[:, [0, 2]].T.flatten(), rank.repeat(2), num_entities),
+            (triples[:, 1], rank, num_relations),
+        ):
+            first = torch.full((num,), num_triples, dtype=torch.int64)
+            first.scatter_reduce_(0, ids, ranks, reduce="amin")
+            covered[order[first[first < num_triples]]] = True
+
+        remaining = order[~covered[order]]
+        num_valid = round(num_triples * self.ratios[1])
+        num_test = round(num_triples * self.ratios[2])
+        if num_valid + num_test > len(remaining):
+            print(
+                f"WARNING: {int(covered.sum())} of {num_triples} triples are needed to cover the "
+                f"entities and relations in train, validation and test get {len(remaining)} triples"
+            )
+            evaluation = self.ratios[1] + self.ratios[2]
+            num_valid = round(len(remaining) * self.ratios[1] / evaluation) if evaluation > 0 else 0
+            num_test = len(remaining) - num_valid
+
+        labels = torch.zeros(num_triples, dtype=torch.int64)
+        labels[remaining[:num_valid]] = SPLITS.index("valid")
+        labels[remaining[num_valid : num_valid + num_test]] = SPLITS.index("test")
+        return labels
+
+    def split(self, triples: torch.Tensor, num_entities: Optional[int] = None) -> torch.Tensor:
+        """Clean and split a set of triples
+
+        Args:
+            triples (torch.Tensor): Triples (N, 3)
+            num_entities (Optional[int], optional): Number of entities, one more than the highest ID if None. Defaults to None.
+
+        Returns:
+            torch.Tensor: Split of every triple (N,), its position in `SPLITS` or `DROPPED`
+        """
+        triples = torch.as_tensor(triples, dtype=torch.int64).reshape(-1, 3)
+        labels = torch.full((len(triples),), DROPPED, dtype=torch.int64)
+        if len(triples) == 0:
+            return labels
+
+        with self.recorder.phase("split") as phase:
+            num_entities = num_entities or int(triples[:, [0, 2]].max()) + 1
+            num_relations = int(triples[:, 1].max()) + 1
+            heads, relations, tails = triples.unbind(dim=1)
+
+            kept = self._first_occurrences((heads * num_relations + relations) * num_entities + tails)
+            duplicates = len(triples) - int(kept.sum())
+
+            sizes = torch.bincount(relations[kept], minlength=num_relations)
+            kept &= sizes[relations] >= self.min_triples_relation
+            rare = int(((sizes > 0) & (sizes < self.min_triples_relation)).sum())
+
+            dropped = torch.zeros(num_relations, dtype=torch.bool)
+            dropped[self.leakage(triples[kept], num_entities)] = True
+            kept &= ~dropped[relations]
+
+            labels[kept] = self._coverage_split(triples[kept], num_entities, num_relations)
+            phase.set(
+                len(triples),
+                **{split: int((labels == i).sum()) for i, split in enumerate(SPLITS)},
+                duplicates=duplicates,
+                rare_relations=rare,
+                leaking_relations=len(self.leaking_relations),
+            )
+
+        return labels
+
+    @staticmethod
+    def splits(triples: torch.Tensor, labels: torch.Tensor) -> Dict[str, torch.Tensor]:
+        """Triples of every split, in their input order
+
+        Args:
+            triples (torch.Tensor): Triples (N, 3)
+            labels (torch.Tensor): Split labels (N,), see `split`
+
+        Returns:
+            Dict[str, torch.Tensor]: Triples of each split of `SPLITS`
+        """
+        triples = torch.as_tensor(triples).reshape(-1, 3)
+        return {split: triples[labels == i] for i, split in enumerate(SPLITS)}
+
+
+def write_splits(
+    path: str,
+    triples: torch.Tensor,
+    labels: torch.Tensor,
+    individuals,
+    obj_props,
+    chunk_size: int = CHUNK_SIZE,
+) -> Path:
+    """Write the train, validation and test TSV files of a dataset in a single pass over the
+    labelled triples, decoding the IDs to URIs. Files are replaced atomically once all of them
+    are written
+
+    Args:
+        path (str): Dataset folder
+        triples (torch.Tensor): Triples (N, 3)
+        labels (torch.Tensor): Split labels (N,), see `TripleSplitter.split`
+        individuals (Vocabulary): Individual vocabulary
+        obj_props (Vocabulary): Object property vocabulary
+        chunk_size (int, optional): Number of triples decoded at once. Defaults to CHUNK_SIZE.
+
+    Raises:
+        ValueError: If an ID is not in the vocabularies
+
+    Returns:
+        Path: Dataset folder
+    """
+    path = Path(path)
+    triples = torch.as_tensor(triples, dtype=torch.int64).reshape(-1, 3)
+    labels = torch.as_tensor(labels, dtype=torch.int64)
+
+    destinations = [path / split_file for split_file in SPLIT_FILES]
+    temporaries = [destination.with_suffix(".tmp") for destination in destinations]
+    for destination in destinations:
+        destination.parent.mkdir(parents=True, exist_ok=True)
+
+    files = [open(temporary, "w") for temporary in temporaries]
+    try:
+        for start in range(0, len(triples), chunk_size):
+            chunk = triples[start : start + chunk_size]
+            chunk_labels = labels[start : start + chunk_size]
+            kept = chunk_labels != DROPPED
+            chunk, chunk_labels = chunk[kept], chunk_labels[kept]
+
+            entities, entity_ids = torch.unique(chunk[:, [0, 2]], return_inverse=True)
+            relations, relation_ids = torch.unique(chunk[:, 1], return_inverse=True)
+            entity_uris = individuals.decode(entities)
+            relation_uris = obj_props.decode(relations)
+            if None in entity_uris or None in relation_uris:
+                raise ValueError("Triples with IDs not in the individual or object property vocabularies")
+
+            lines = [[] for _ in SPLITS]
+            for (h, t), r, split in zip(entity_ids.tolist(), relation_ids.tolist(), chunk_labels.tolist()):
+                lines[split].append(f"{entity_uris[h]}\t{relation_uris[r]}\t{entity_uris[t]}\n")
+            for f, split_lines in zip(files, lines):
+                f.writelines(split_lines)
+    finally:
+        for f in files:
+            f.close()
+
+    for temporary, destination in zip(temporaries, destinations):
+        os.replace(temporary, destination)
+    return path
+
+
+def main(argv: Optional[List[str]] = None):
+    from kgsaf_jdex.loaders.pytorch.dataset import KnowledgeGraph
+
+    parser = argparse.ArgumentParser(description="Split the ABox triples of a dataset into train, validation and test")
+    parser.add_argument("path", help="Dataset folder or zip archive")
+    parser.add_argument("--output", default=None, help="Dataset folder the splits are written to, the input one if None")
+    parser.add_argument("--source", default="triples", choices=["triples", "splits"], help="Split the triples file, or the union of the current splits")
+    parser.add_argument("--ratios", nargs=3, type=float, default=RATIOS, help="Train, validation and test ratios")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--min-triples-relation", type=int, default=MIN_TRIPLES_RELATION, help="Minimum number of triples of a relation")
+    parser.add_argument("--minimum-frequency", type=float, default=MINIMUM_FREQUENCY, help="Minimum overlap of leaking relations")
+    args = parser.parse_args(argv)
+    if args.output is None and not Path(args.path).is_dir():
+        parser.error("--output is required when the dataset is not a folder")
+
+    splitter = TripleSplitter(args.ratios, args.seed, args.min_triples_relation, args.minimum_frequency)
+    kg = KnowledgeGraph(args.path, lazy=True)
+    if args.source == "triples":
+        triples = kg.triples
+    else:
+        triples = torch.cat([kg._component(split).reshape(-1, 3) for split in SPLITS])
+
+    labels = splitter.split(triples, kg.num_individuals)
+    write_splits(args.output or args.path, triples, labels, kg.individuals, kg.obj_props)
+
+    counts = ", ".join(f"{split} {int((labels == i).sum())}" for i, split in enumerate(SPLITS))
+    print(f"{counts}, dropped {int((labels == DROPPED).sum())}, leaking relations {splitter.leaking_relations.tolist()}")
+
+
+if __name__ == "__main__":
+    main()
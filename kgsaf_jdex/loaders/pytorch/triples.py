@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+
+import os
+import time
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import torch
+
+from kgsaf_jdex.utils.archive import ArchivePath, open_file
+from kgsaf_jdex.utils.instrumentation import PhaseRecorder
+
+UNKNOWN_ID = torch.iinfo(torch.int64).min
+
+CHUNK_SIZE = 1 << 24
+
+# Size of the byte ranges of a TSV file loaded by each worker process, smaller files are
+# loaded in the calling process
+
+RANGE_SIZE = 1 << 26
+
+
+def read_range(
+    path: Path, start: int = 0, end: Optional[int] = None, chunk_size: int = CHUNK_SIZE
+) -> Iterator[bytes]:
+    """Stream the lines of a file starting in the byte range [start, end), in chunks made of
+    whole lines. Consecutive ranges of a file yield every line once.
+
+    Args:
+        path (Path): File location
+        start (int, optional): First byte of the range. Defaults to 0.
+        end (Optional[int], optional): End of the range, the end of the file if None. Defaults to None.
+        chunk_size (int, optional): Approximate chunk size in bytes. Defaults to CHUNK_SIZE.
+
+    Yields:
+        Iterator[bytes]: Chunks, each one ending at a line boundary or at the end of the file
+    """
+    with open_file(path, "rb") as f:
+        if start > 0:
+            f.seek(start - 1)
+            f.readline()
+        position = f.tell()
+        while end is None or position < end:
+            chunk = f.read(chunk_size if end is None else min(chunk_size, end - position))
+            if not chunk:
+                break
+            if not chunk.endswith(b"\n"):
+                chunk += f.readline()
+            position += len(chunk)
+            yield chunk
+
+
+def count_lines(
+    path: Path, start: int = 0, end: Optional[int] = None, chunk_size: int = CHUNK_SIZE
+) -> int:
+    """Count the lines of a file starting in a byte range without decoding them, an
+    unterminated last line is counted too
+
+    Args:
+        path (Path): File location
+        start (int, optional): First byte of the range. Defaults to 0.
+        end (Optional[int], optional): End of the range, the end of the file if None. Defaults to None.
+        chunk_size (int, optional): Read buffer size in bytes. Defaults to CHUNK_SIZE.
+
+    Returns:
+        int: Number of lines
+    """
+    lines = 0
+    last = b"\n"
+    for chunk in read_range(path, start, end, chunk_size):
+        lines += chunk.count(b"\n")
+        last = chunk[-1:]
+    return lines + (last != b"\n")
+
+
+def byte_ranges(path: Path, range_size: int = RANGE_SIZE) -> List[Tuple[int, int]]:
+    """Split a file into byte ranges to be loaded separately. Compressed archive members
+    are a single range, as seeking into them decompresses everything before the offset.
+
+    Args:
+        path (Path): File location
+        range_size (int, optional): Range size in bytes. Defaults to RANGE_SIZE.
+
+    Returns:
+        List[Tuple[int, int]]: Start and end of each range
+    """
+    size = path.stat().st_size
+    if (
+        isinstance(path, ArchivePath)
+        and not path.local_path.exists()
+        and path.archive.member_range(path.member) is None
+    ):
+        return [(0, size)]
+    return [(start, min(start + range_size, size)) for start in range(0, size, range_size)]
+
+
+def encode_uris(uris: List[str], mapping: Dict[str, int]) -> torch.Tensor:
+    """Encode a batch of URIs into IDs with a single C-level pass over the mapping
+
+    Args:
+        uris (List[str]): URIs to be encoded
+        mapping (Dict[str, int]): URI to ID mapping
+
+    Returns:
+        torch.Tensor: IDs of the URIs, `UNKNOWN_ID` for URIs missing from the mapping
+    """
+    ids = array("q", map(mapping.get, uris, repeat(UNKNOWN_ID)))
+    if len(ids) == 0:
+        return torch.empty(0, dtype=torch.int64)
+    return torch.frombuffer(ids, dtype=torch.int64)
+
+
+def _split_fields(chunk: str) -> List[str]:
+    """Split a chunk of TSV triples into a flat list of fields, three per triple. Fields are
+    separated by tabs only, so URIs and literals may contain other whitespace.
+
+    Args:
+        chunk (str): Whole lines of a TSV triples file
+
+    Raises:
+        ValueError: If a non blank line does not have three fields
+
+    Returns:
+        List[str]: Flat list of subject, predicate and object fields
+    """
+    if "\r" in chunk:
+        chunk = chunk.replace("\r\n", "\n")
+
+    lines = chunk.split("\n")
+    if lines[-1] == "":
+        lines.pop()
+
+    if set(map(str.count, lines, repeat("\t"))) == {2}:
+        return "\t".join(lines).split("\t")
+
+    # Blank or malformed lines, fall back to line by line splitting
+    fields = []
+    for line in lines:
+        triple = line.split("\t")
+        if len(triple) == 3:
+            fields.extend(triple)
+        elif line.strip():
+            raise ValueError(f"Malformed triple line: {line!r}")
+    return fields
+
+
+def load_triples(
+    path: Path,
+    entity_to_id: Dict[str, int],
+    relation_to_id: Dict[str, int],
+    chunk_size: int = CHUNK_SIZE,
+    start: int = 0,
+    end: Optional[int] = None,
+) -> Tuple[torch.Tensor, Counter]:
+    """Load a TSV triples file, or the lines starting in a byte range of it, into an integer
+    tensor. The file is streamed in chunks, each chunk is encoded column by column and written
+    in place into a preallocated int64 buffer. Triples containing URIs missing from the
+    mappings are dropped and reported in aggregate.
+
+    Args:
+        path (Path): TSV triples file location
+        entity_to_id (Dict[str, int]): Subject and object URI to ID mapping
+        relation_to_id (Dict[str, int]): Predicate URI to ID mapping
+        chunk_size (int, optional): Approximate chunk size in bytes. Defaults to CHUNK_SIZE.
+        start (int, optional): First byte of the range, see `read_range`. Defaults to 0.
+        end (Optional[int], optional): End of the range, the end of the file if None. Defaults to None.
+
+    Returns:
+        Tuple[torch.Tensor, Counter]: Triples tensor (N, 3) and occurrence counts of unknown URIs
+    """
+    triples = torch.empty((count_lines(path, start, end, chunk_size), 3), dtype=torch.int64)
+    unknown = Counter()
+    row = 0
+
+    for chunk in read_range(path, start, end, chunk_size):
+        fields = _split_fields(chunk.decode("utf-8"))
+        n = len(fields) // 3
+
+        for col, mapping in enumerate((entity_to_id, relation_to_id, entity_to_id)):
+            column = fields[col::3]
+            ids = encode_uris(column, mapping)
+            triples[row : row + n, col] = ids
+
+            missing = (ids == UNKNOWN_ID).nonzero().flatten().tolist()
+            unknown.update(column[i] for i in missing)
+
+        row += n
+
+    triples = triples[:row]
+
+    if unknown:
+        triples = triples[(triples != UNKNOWN_ID).all(dim=1)]
+
+    return triples, unknown
+
+
+# Mappings of the integer encoding, set once in every worker process
+_worker_mappings = (None, None)
+
+
+def _init_worker(entity_to_id: Dict[str, int], relation_to_id: Dict[str, int]):
+    global _worker_mappings
+    _worker_mappings = (entity_to_id, relation_to_id)
+
+
+def _load_range(path: Path, start: int, end: int, chunk_size: int) -> Tuple[torch.Tensor, Counter]:
+    """Load a byte range of a TSV triples file in a worker process, see `load_triples`"""
+    return load_triples(path, *_worker_mappings, chunk_size, start, end)
+
+
+def load_triples_concurrently(
+    paths: Dict[str, Path],
+    entity_to_id: Dict[str, int],
+    relation_to_id: Dict[str, int],
+    chunk_size: int = CHUNK_SIZE,
+    recorder: Optional[PhaseRecorder] = None,
+    workers: Optional[int] = None,
+    range_size: int = RANGE_SIZE,
+) -> Dict[str, Tuple[torch.Tensor, Counter]]:
+    """Load several TSV triples files at the same time. Files are split into byte ranges of
+    `range_size` loaded by a process pool, as encoding is bound to the interpreter lock, and
+    the triples of the ranges of each file are concatenated in order. When all the files fit
+    in a single range, or with a single worker, they are loaded in the calling process.
+
+    Args:
+        paths (Dict[str, Path]): TSV triples file locations, by name
+        entity_to_id (Dict[str, int]): Subject and object URI to ID mapping
+        relation_to_id (Dict[str, int]): Predicate URI to ID mapping
+        chunk_size (int, optional): Approximate chunk size in bytes. Defaults to CHUNK_SIZE.
+        recorder (Optional[PhaseRecorder], optional): Recorder of the loading time and rows of each file, as phases named after it. Defaults to None.
+        workers (Optional[int], optional): Number of worker processes, the number of CPUs if None. Defaults to None.
+        range_size (int, optional): Byte range size loaded by each worker task. Defaults to RANGE_SIZE.
+
+    Returns:
+        Dict[str, Tuple[torch.Tensor, Counter]]: Output of `load_triples`, by name
+    """
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    ranges = {name: byte_ranges(path, range_size) for name, path in paths.items()}
+    loaded = {}
+
+    if workers <= 1 or sum(map(len, ranges.values())) <= 1:
+        for name, path in paths.items():
+            start = time.perf_counter()
+            triples, unknown = load_triples(path, entity_to_id, relation_to_id, chunk_size)
+            loaded[name] = (triples, unknown, time.perf_counter() - start)
+    else:
+        start = time.perf_counter()
+        with ProcessPoolExecutor(
+            max_workers=min(workers, sum(map(len, ranges.values()))),
+            initializer=_init_worker,
+            initargs=(entity_to_id, relation_to_id),
+        ) as executor:
+            futures = {
+                name: [
+                    executor.submit(_load_range, paths[name], range_start, range_end, chunk_size)
+                    for range_start, range_end in file_ranges
+                ]
+                for name, file_ranges in ranges.items()
+            }
+            for name, file_futures in futures.items():
+                results = [future.result() for future in file_futures]
+                unknown = Counter()
+                for _, range_unknown in results:
+                    unknown.update(range_unknown)
+                triples = torch.cat(
+                    [torch.empty((0, 3), dtype=torch.int64)] + [triples for triples, _ in results]
+                )
+                loaded[name] = (triples, unknown, time.perf_counter() - start)
+
+    if recorder is not None:
+        for name, (triples, unknown, seconds) in loaded.items():
+            recorder.record(name, seconds, len(triples), source="files", unknown=len(unknown))
+
+    return {name: (triples, unknown) for name, (triples, unknown, _) in loaded.items()}
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import torch
+
+import kgsaf_jdex.utils.conventions.ids as idc
+from kgsaf_jdex.loaders.pytorch.index import CSRIndex, KnownTripleIndex, sorted_isin
+
+# Checks applied to every triple of the validated splits
+
+CHECKS = [
+    "out_of_range",
+    "duplicate",
+    "leaked",
+    "untyped_head",
+    "untyped_tail",
+    "domain",
+    "range",
+]
+
+# Checks failing the validation by default, the others are only reported
+
+FAILING_CHECKS = ["out_of_range", "duplicate", "leaked", "domain", "range"]
+
+
+class ValidationReport:
+    """Result of the validation of the ABox splits: a boolean mask over the triples of each split
+    for every check of `CHECKS`, plus the individuals that appear in no triple and no class
+    assertion"""
+
+    def __init__(self, masks: Dict[str, Dict[str, torch.Tensor]], orphans: torch.Tensor):
+        """Initialize the report
+
+        Args:
+            masks (Dict[str, Dict[str, torch.Tensor]]): Mask of the triples failing each check, for every split
+            orphans (torch.Tensor): Orphan individual IDs
+        """
+        self.masks = masks
+        self.orphans = orphans
+
+    def mask(self, split: str, checks: Optional[Iterable[str]] = None) -> torch.Tensor:
+        """Triples of a split failing at least one of the given checks
+
+        Args:
+            split (str): Split name
+            checks (Optional[Iterable[str]], optional): Checks, `FAILING_CHECKS` if None. Defaults to None.
+
+        Returns:
+            torch.Tensor: Boolean mask over the triples of the split
+        """
+        checks = FAILING_CHECKS if checks is None else checks
+        masks = self.masks[split]
+        out = torch.zeros(len(masks[CHECKS[0]]), dtype=torch.bool)
+        for check in checks:
+            out |= masks[check]
+        return out
+
+    @property
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        """Number of triples failing each check, for every split"""
+        return {
+            split: {"triples": len(masks[CHECKS[0]]), **{check: int(masks[check].sum()) for check in CHECKS}}
+            for split, masks in self.masks.items()
+        }
+
+    def passed(self, checks: Optional[Iterable[str]] = None) -> bool:
+        """Check that no triple fails the given checks
+
+        Args:
+            checks (Optional[Iterable[str]], optional): Checks, `FAILING_CHECKS` if None. Defaults to None.
+
+        Returns:
+            bool: True if every triple passes
+        """
+        return not any(bool(self.mask(split, checks).any()) for split in self.masks)
+
+    def to_dict(self) -> dict:
+        return {"counts": self.counts, "orphans": len(self.orphans)}
+
+    def __str__(self) -> str:
+        lines = []
+        for split, counts in self.counts.items():
+            failed = ", ".join(f"{check} {counts[check]}" for check in CHECKS if counts[check] > 0)
+            lines.append(f"{split}: {counts['triples']} triples, {failed or 'no violations'}")
+        lines.append(f"orphan individuals: {len(self.orphans)}")
+        return "\n".join(lines)
+
+
+class ABoxValidator:
+    """Batched validation of the ABox splits of a knowledge graph against its schema.
+
+    The types of every individual are its asserted classes closed over the taxonomy. A triple
+    violates the domain (range) of its relation when its head (tail) has types but none of them
+    is a domain (range) class of the relation; untyped heads and tails are reported by separate
+    checks. Relations without a domain or range, or with `owl:Thing` in it, accept every
+    individual. Triples are also checked for IDs outside the vocabularies, duplicates within a
+    split, and leaks, i.e. triples already in an earlier split.
+    """
+
+    def __init__(self, kg, splits: Optional[Iterable[str]] = None):
+        """Index the types and the schema of the knowledge graph
+
+        Args:
+            kg (KnowledgeGraph): Knowledge graph
+            splits (Optional[Iterable[str]], optional): Validated splits, in order, a triple leaks if it is in an earlier one. Defaults to "train", "valid" and "test".
+        """
+        self.kg = kg
+        self.splits = ["train", "valid", "test"] if splits is None else list(splits)
+
+        self.num_individuals = kg.num_individuals
+        self.num_classes = kg.num_classes
+        self.num_obj_props = kg.num_obj_props
+
+        assertions = kg.class_assertions.to(torch.int64).reshape(-1, 2)
+        assertions = assertions[self._in_range(assertions[:, 0], self.num_individuals)]
+        ancestors, offsets = kg.taxonomy_closure.ancestors(assertions[:, 1])
+        rows = torch.repeat_interleave(torch.arange(len(assertions)), offsets.diff())
+        types = torch.cat([assertions, torch.stack([assertions[rows, 0], ancestors], dim=1)])
+
+        self.typed = torch.zeros(self.num_individuals, dtype=torch.bool)
+        self.typed[assertions[:, 0]] = True
+        self.type_keys = torch.unique(self._pack_types(types[:, 0], types[:, 1]))
+
+        self.domains = self._schema_index(kg.obj_props_domain)
+        self.ranges = self._schema_index(kg.obj_props_range)
+
+    @staticmethod
+    def _in_range(ids: torch.Tensor, num: int) -> torch.Tensor:
+        return (ids >= 0) & (ids < num)
+
+    def _pack_types(self, individuals: torch.Tensor, classes: torch.Tensor) -> torch.Tensor:
+        return individuals * (self.num_classes + 1) + (classes - idc.THING)
+
+    def _schema_index(self, pairs: torch.Tensor) -> CSRIndex:
+        """Index of the classes constraining each relation, relations with `owl:Thing` among
+        them are left unconstrained"""
+        pairs = pairs.to(torch.int64).reshape(-1, 2)
+        unconstrained = torch.zeros(self.num_obj_props, dtype=torch.bool)
+        unconstrained[pairs[pairs[:, 1] == idc.THING][:, 0]] = True
+        return CSRIndex.from_pairs(pairs[~unconstrained[pairs[:, 0]]], num_rows=self.num_obj_props)
+
+    # Checks
+
+    def _incompatible(self, individuals: torch.Tensor, relations: torch.Tensor, schema: CSRIndex) -> torch.Tensor:
+        classes, offsets = schema.batch(relations)
+        rows = torch.repeat_interleave(torch.arange(len(relations)), offsets.diff())
+        hits = sorted_isin(self._pack_types(individuals[rows], classes), self.type_keys)
+
+        compatible = torch.zeros(len(relations), dtype=torch.bool)
+        compatible[rows[hits]] = True
+        constrained = schema.degree(relations) > 0
+        return constrained & self.typed[individuals] & ~compatible
+
+    @staticmethod
+    def _duplicates(keys: torch.Tensor) -> torch.Tensor:
+        """Every occurrence of a key after the first one"""
+        sorted_keys, order = torch.sort(keys, stable=True)
+        repeated = torch.zeros(len(keys), dtype=torch.bool)
+        repeated[1:] = sorted_keys[1:] == sorted_keys[:-1]
+        out = torch.zeros(len(keys), dtype=torch.bool)
+        out[order] = repeated
+        return out
+
+    def check(self, triples: torch.Tensor, earlier: Optional[torch.Tensor] = None) -> Dict[str, torch.Tensor]:
+        """Run every check of `CHECKS` on a batch of triples
+
+        Args:
+            triples (torch.Tensor): Triples (N, 3)
+            earlier (Optional[torch.Tensor], optional): Sorted keys of the triples of the earlier splits, packed as in `KnownTripleIndex`. Defaults to None.
+
+        Returns:
+            Dict[str, torch.Tensor]: Mask of the triples failing each check
+        """
+        triples = torch.as_tensor(triples, dtype=torch.int64).reshape(-1, 3)
+        heads, relations, tails = triples.unbind(dim=1)
+
+        valid = (
+            self._in_range(heads, self.num_individuals)
+            & self._in_range(relations, self.num_obj_props)
+            & self._in_range(tails, self.num_individuals)
+        )
+        heads, relations, tails = (torch.where(valid, ids, 0) for ids in (heads, relations, tails))
+
+        keys = (heads * self.num_obj_props + relations) * self.num_individuals + tails
+        leaked = torch.zeros(len(triples), dtype=torch.bool)
+        if earlier is not None:
+            leaked = sorted_isin(keys, earlier)
+
+        return {
+            "out_of_range": ~valid,
+            "duplicate": valid & self._duplicates(torch.where(valid, keys, -1)),
+            "leaked": valid & leaked,
+            "untyped_head": valid & ~self.typed[heads],
+            "untyped_tail": valid & ~self.typed[tails],
+            "domain": valid & self._incompatible(heads, relations, self.domains),
+            "range": valid & self._incompatible(tails, relations, self.ranges),
+        }
+
+    def orphans(self, splits: Optional[Iterable[str]] = None) -> torch.Tensor:
+        """Individuals that appear in no triple of the given splits and in no class assertion
+
+        Args:
+            splits (Optional[Iterable[str]], optional): Splits, the validated ones if None. Defaults to None.
+
+        Returns:
+            torch.Tensor: Orphan individual IDs
+        """
+        used = self.typed.clone()
+        for split in self.splits if splits is None else splits:
+            triples = self.kg._component(split).to(torch.int64).reshape(-1, 3)
+            for ids in (triples[:, 0], triples[:, 2]):
+                used[ids[self._in_range(ids, self.num_individuals)]] = True
+        return torch.nonzero(~used).flatten()
+
+    def validate(self) -> ValidationReport:
+        """Validate the splits
+
+        Returns:
+            ValidationReport: Masks of every check and orphan individuals
+        """
+        masks = {}
+        earlier = torch.empty(0, dtype=torch.int64)
+
+        for split in self.splits:
+            triples = self.kg._component(split).to(torch.int64).reshape(-1, 3)
+            masks[split] = self.check(triples, earlier)
+
+            valid = triples[~masks[split]["out_of_range"]]
+            keys = KnownTripleIndex(valid, self.num_individuals, self.num_obj_props).keys
+            earlier = torch.sort(torch.cat([earlier, keys])).values
+
+        return ValidationReport(masks, self.orphans())
+
+
+def main(argv: Optional[List[str]] = None):
+    from kgsaf_jdex.loaders.pytorch.dataset import KnowledgeGraph
+
+    parser = argparse.ArgumentParser(description="Validate the ABox splits of a dataset against its schema")
+    parser.add_argument("path", help="Dataset folder or zip archive")
+    parser.add_argument("--splits", nargs="+", default=None, help="Validated splits, in order")
+    parser.add_argument("--fail-on", nargs="+", default=FAILING_CHECKS, choices=CHECKS, help="Checks failing the validation")
+    parser.add_argument("--output", default=None, help="JSON file of the summary counts")
+    args = parser.parse_args(argv)
+
+    report = ABoxValidator(KnowledgeGraph(args.path, lazy=True), args.splits).validate()
+    print(report)
+
+    if args.output is not None:
+        with open(Path(args.output), "w") as f:
+            json.dump(report.to_dict(), f, indent=4)
+
+    sys.exit(0 if report.passed(args.fail_on) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+
+import math
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Union
+
+import torch
+from torch.utils.data import DataLoader, Dataset, IterableDataset, Sampler, get_worker_info
+
+
+class _SharedTriples:
+    """Triples tensor that is not copied when pickled for DataLoader workers. If it is backed by
+    a memory-mapped cache file, only the file location is pickled and workers map the same file
+    again; otherwise the tensor is moved to shared memory and passed by handle.
+    """
+
+    def __init__(self, triples: torch.Tensor, path: Optional[Path] = None):
+        """Wrap a triples tensor
+
+        Args:
+            triples (torch.Tensor): Triples (N, 3)
+            path (Optional[Path], optional): Binary file holding the same triples, e.g. the cache entry the tensor was mapped from. Defaults to None.
+        """
+        self.triples = triples.reshape(-1, 3)
+        self.path = path
+
+    def __len__(self) -> int:
+        return len(self.triples)
+
+    def __getstate__(self) -> dict:
+        if self.path is not None and len(self.triples) > 0:
+            return {
+                "path": str(self.path),
+                "shape": tuple(self.triples.shape),
+                "dtype": self.triples.dtype,
+            }
+        self.triples.share_memory_()
+        return {"triples": self.triples, "path": None}
+
+    def __setstate__(self, state: dict):
+        if "triples" in state:
+            self.triples, self.path = state["triples"], None
+            return
+        rows, cols = state["shape"]
+        self.path = Path(state["path"])
+        self.triples = torch.from_file(
+            state["path"], shared=False, size=rows * cols, dtype=state["dtype"]
+        ).view(rows, cols)
+
+
+class TriplesDataset(Dataset):
+    """Map-style dataset over a split of triples. A single index returns one triple (3,), while
+    DataLoaders fetch whole batches at once through `__getitems__`, which returns a (B, 3)
+    tensor with a single indexing operation. Use `collate` as the DataLoader `collate_fn` to
+    keep the batch as it is.
+    """
+
+    def __init__(self, triples: torch.Tensor, path: Optional[Path] = None):
+        """Initialize the view
+
+        Args:
+            triples (torch.Tensor): Triples (N, 3)
+            path (Optional[Path], optional): Memory-mapped file backing the triples, reopened by workers instead of copying the tensor. Defaults to None.
+        """
+        self._shared = _SharedTriples(triples, path)
+
+    @property
+    def triples(self) -> torch.Tensor:
+        return self._shared.triples
+
+    def __len__(self) -> int:
+        return len(self._shared)
+
+    def __getitem__(self, index: Union[int, slice, torch.Tensor]) -> torch.Tensor:
+        return self.triples[index]
+
+    def __getitems__(self, indices: Sequence[int]) -> torch.Tensor:
+        return self.triples[torch.as_tensor(indices, dtype=torch.int64)]
+
+    @staticmethod
+    def collate(batch: Union[torch.Tensor, List[torch.Tensor]]) -> torch.Tensor:
+        """DataLoader `collate_fn` keeping batches fetched by `__getitems__` as they are
+
+        Args:
+            batch (Union[torch.Tensor, List[torch.Tensor]]): Batch tensor, or list of triples
+
+        Returns:
+            torch.Tensor: Batch of triples (B, 3)
+        """
+        if isinstance(batch, torch.Tensor):
+            return batch
+        return torch.stack(batch)
+
+
+class TriplesBatchSampler(Sampler):
+    """Batch sampler drawing one permutation per epoch and yielding contiguous slices of it, so
+    that no per-item sampling or indexing takes place.
+    """
+
+    def __init__(
+        self,
+        num_triples: int,
+        batch_size: int,
+        shuffle: bool = True,
+        drop_last: bool = False,
+        generator: Optional[torch.Generator] = None,
+    ):
+        """Initialize the sampler
+
+        Args:
+            num_triples (int): Number of triples of the dataset
+            batch_size (int): Number of triples of each batch
+            shuffle (bool, optional): Shuffle the triples at every epoch. Defaults to True.
+            drop_last (bool, optional): Drop the last batch if it is smaller than batch_size. Defaults to False.
+            generator (Optional[torch.Generator], optional): Random number generator. Defaults to None.
+        """
+        self.num_triples = num_triples
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+        self.generator = generator
+
+    def __len__(self) -> int:
+        if self.drop_last:
+            return self.num_triples // self.batch_size
+        return math.ceil(self.num_triples / self.batch_size)
+
+    def __iter__(self) -> Iterator[List[int]]:
+        if self.shuffle:
+            order = torch.randperm(self.num_triples, generator=self.generator)
+        else:
+            order = torch.arange(self.num_triples)
+
+        for i in range(len(self)):
+            yield order[i * self.batch_size : (i + 1) * self.batch_size].tolist()
+
+
+class TriplesIterableDataset(IterableDataset):
+    """Iterable dataset yielding whole batches of triples, to be used with `batch_size=None` in
+    the DataLoader. With several workers, each one yields a disjoint share of the batches of
+    the same epoch permutation.
+
+    The epoch advances by one at the end of every pass, so each pass has a new permutation.
+    Workers started for a single pass iterate a copy of the dataset, use
+    `TriplesIterableLoader` (or call `set_epoch` before every pass) to advance the original.
+    """
+
+    def __init__(
+        self,
+        triples: torch.Tensor,
+        batch_size: int,
+        shuffle: bool = True,
+        drop_last: bool = False,
+        seed: int = 0,
+        path: Optional[Path] = None,
+    ):
+        """Initialize the view
+
+        Args:
+            triples (torch.Tensor): Triples (N, 3)
+            batch_size (int): Number of triples of each batch
+            shuffle (bool, optional): Shuffle the triples at every epoch. Defaults to True.
+            drop_last (bool, optional): Drop the last batch if it is smaller than batch_size. Defaults to False.
+            seed (int, optional): Seed of the permutations, the epoch number is added to it. Defaults to 0.
+            path (Optional[Path], optional): Memory-mapped file backing the triples, reopened by workers instead of copying the tensor. Defaults to None.
+        """
+        self._shared = _SharedTriples(triples, path)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+        self.seed = seed
+        self.epoch = 0
+
+    @property
+    def triples(self) -> torch.Tensor:
+        return self._shared.triples
+
+    def set_epoch(self, epoch: int):
+        """Set the epoch number of the next pass, every epoch has a different permutation
+        shared by all workers
+
+        Args:
+            epoch (int): Epoch number
+        """
+        self.epoch = epoch
+
+    def __len__(self) -> int:
+        return len(TriplesBatchSampler(len(self._shared), self.batch_size, drop_last=self.drop_last))
+
+    def __iter__(self) -> Iterator[torch.Tensor]:
+        if self.shuffle:
+            generator = torch.Generator().manual_seed(self.seed + self.epoch)
+            order = torch.randperm(len(self._shared), generator=generator)
+        else:
+            order = torch.arange(len(self._shared))
+        self.epoch += 1
+
+        worker = get_worker_info()
+        worker_id, num_workers = (0, 1) if worker is None else (worker.id, worker.num_workers)
+
+        for i in range(worker_id, len(self), num_workers):
+            yield self.triples[order[i * self.batch_size : (i + 1) * self.batch_size]]
+
+
+class TriplesIterableLoader(DataLoader):
+    """DataLoader of a `TriplesIterableDataset` moving it to a new epoch at every pass. The
+    dataset advances its own epoch when it is iterated in the main process or by persistent
+    workers, while workers started for a single pass get a copy of it, so in that case the
+    loader advances the epoch of the original once the workers are started.
+    """
+
+    def __iter__(self):
+        iterator = super().__iter__()
+        if self.num_workers > 0 and not self.persistent_workers:
+            self.dataset.set_epoch(self.dataset.epoch + 1)
+        return iterator
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+
+import mmap
+import zlib
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+import torch
+
+from kgsaf_jdex.loaders.pytorch.triples import UNKNOWN_ID
+
+# Arrays stored for each vocabulary, besides the string blob
+ARRAYS = ["offsets", "ids", "hashes", "table"]
+
+
+def hash_uris(encoded: List[bytes]) -> torch.Tensor:
+    """64 bit hash of a batch of UTF-8 encoded URIs, made of their Adler-32 (high bits) and
+    CRC32 (low bits) checksums. Both are computed in C, much faster than a cryptographic hash,
+    and the low bits used for table slots are well distributed.
+
+    Args:
+        encoded (List[bytes]): Encoded URIs
+
+    Returns:
+        torch.Tensor: Hashes (N,)
+    """
+    if len(encoded) == 0:
+        return torch.empty(0, dtype=torch.int64)
+    crc = torch.frombuffer(array("q", map(zlib.crc32, encoded)), dtype=torch.int64)
+    adler = torch.frombuffer(array("q", map(zlib.adler32, encoded)), dtype=torch.int64)
+    return (adler << 32) | crc
+
+
+class Vocabulary:
+    """Compact, read-only URI vocabulary. URIs are stored as a single UTF-8 blob sorted by ID,
+    with an offsets array delimiting each URI and an open addressing hash table (linear
+    probing) from URI hash to position. All the arrays can be memory-mapped from disk, so the
+    same vocabulary is shared between processes through the page cache.
+
+    Several URIs may share the same ID (e.g. the aliases of `idc.THING`), in that case the last
+    one in insertion order is returned when decoding.
+    """
+
+    def __init__(
+        self,
+        blob: Union[bytes, mmap.mmap],
+        offsets: torch.Tensor,
+        ids: torch.Tensor,
+        hashes: torch.Tensor,
+        table: torch.Tensor,
+    ):
+        """Initialize the vocabulary from its arrays, see `from_mapping` to build them
+
+        Args:
+            blob (Union[bytes, mmap.mmap]): Concatenated UTF-8 URIs
+            offsets (torch.Tensor): Start of each URI in the blob, plus the blob length (N + 1,)
+            ids (torch.Tensor): Sorted ID of each URI (N,)
+            hashes (torch.Tensor): Hash of each URI (N,)
+            table (torch.Tensor): Hash table of URI positions plus one, zero for empty slots
+        """
+        self.blob = blob
+        self.offsets = offsets
+        self.ids = ids
+        self.hashes = hashes
+        self.table = table
+        self._mask = len(table) - 1
+
+    @classmethod
+    def from_mapping(cls, mapping: Dict[str, int]) -> "Vocabulary":
+        """Build a vocabulary from a URI to ID mapping
+
+        Args:
+            mapping (Dict[str, int]): URI to ID mapping
+
+        Returns:
+            Vocabulary: In-memory vocabulary
+        """
+        uris = list(mapping.keys())
+        ids = torch.tensor(list(mapping.values()), dtype=torch.int64)
+
+        order = torch.argsort(ids, stable=True)
+        encoded = [uris[i].encode("utf-8") for i in order.tolist()]
+
+        offsets = torch.zeros(len(encoded) + 1, dtype=torch.int64)
+        lengths = torch.tensor([len(e) for e in encoded], dtype=torch.int64)
+        offsets[1:] = torch.cumsum(lengths, dim=0)
+
+        hashes = hash_uris(encoded)
+        table = cls._build_table(hashes)
+
+        return cls(b"".join(encoded), offsets, ids[order], hashes, table)
+
+    @classmethod
+    def from_files(cls, blob_path: Path, arrays: Dict[str, torch.Tensor]) -> "Vocabulary":
+        """Open a vocabulary whose blob is stored in a file, the blob is memory-mapped read-only
+
+        Args:
+            blob_path (Path): Blob file location, may be missing for an empty vocabulary
+            arrays (Dict[str, torch.Tensor]): The other arrays, by name (see `ARRAYS`)
+
+        Returns:
+            Vocabulary: Memory-mapped vocabulary
+        """
+        blob = b""
+        if int(arrays["offsets"][-1]) > 0:
+            with open(blob_path, "rb") as f:
+                blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(blob, **arrays)
+
+    @staticmethod
+    def _build_table(hashes: torch.Tensor) -> torch.Tensor:
+        """Insert every position in a power of two hash table with load factor at most 0.5.
+        All pending positions probe their next slot at the same time, in case of conflicts on
+        an empty slot a single one wins and the others keep probing.
+
+        Args:
+            hashes (torch.Tensor): Hash of each URI (N,)
+
+        Returns:
+            torch.Tensor: Hash table
+        """
+        size = 2
+        while size < 2 * len(hashes):
+            size *= 2
+
+        dtype = torch.int32 if len(hashes) < torch.iinfo(torch.int32).max else torch.int64
+        table = torch.zeros(size, dtype=dtype)
+
+        pending = torch.arange(len(hashes), dtype=torch.int64)
+        slots = hashes & (size - 1)
+
+        while len(pending) > 0:
+            free = (table[slots] == 0).nonzero().flatten()
+            table[slots[free]] = (pending[free] + 1).to(dtype)
+
+            placed = torch.zeros(len(pending), dtype=torch.bool)
+            placed[free] = table[slots[free]].to(torch.int64) == pending[free] + 1
+
+            pending = pending[~placed]
+            slots = (slots[~placed] + 1) & (size - 1)
+
+        return table
+
+    @property
+    def arrays(self) -> Dict[str, torch.Tensor]:
+        """Every array of the vocabulary except the blob, by name"""
+        return {name: getattr(self, name) for name in ARRAYS}
+
+    @property
+    def blob_tensor(self) -> torch.Tensor:
+        """Copy of the blob as a uint8 tensor, e.g. to be written to disk"""
+        if len(self.blob) == 0:
+            return torch.empty(0, dtype=torch.uint8)
+        return torch.frombuffer(bytearray(self.blob), dtype=torch.uint8)
+
+    @property
+    def num_ids(self) -> int:
+        """Highest ID plus one, zero if there are no non negative IDs"""
+        return max(int(self.ids[-1]) + 1, 0) if len(self) > 0 else 0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, uri: str) -> bool:
+        return self.position(uri) >= 0
+
+    def __getitem__(self, uri: str) -> int:
+        position = self.position(uri)
+        if position < 0:
+            raise KeyError(uri)
+        return int(self.ids[position])
+
+    def position(self, uri: str) -> int:
+        """Position of a single URI in the vocabulary, without the batch overhead of `positions`
+
+        Args:
+            uri (str): URI to be looked up
+
+        Returns:
+            int: Position, -1 for unknown URIs
+        """
+        if len(self) == 0:
+            return -1
+
+        encoded = uri.encode("utf-8")
+        slot = zlib.crc32(encoded) & self._mask
+
+        while True:
+            entry = int(self.table[slot]) - 1
+            if entry < 0:
+                return -1
+            if self.blob[int(self.offsets[entry]) : int(self.offsets[entry + 1])] == encoded:
+                return entry
+            slot = (slot + 1) & self._mask
+
+    def positions(self, uris: Iterable[str]) -> torch.Tensor:
+        """Position of a batch of URIs in the vocabulary. All the URIs probe the hash table at
+        the same time, the bytes of an entry are compared only when its hash matches.
+
+        Args:
+            uris (Iterable[str]): URIs to be looked up
+
+        Returns:
+            torch.Tensor: Positions, -1 for unknown URIs
+        """
+        encoded = [uri.encode("utf-8") for uri in uris]
+        hashes = hash_uris(encoded)
+        out = torch.full((len(encoded),), -1, dtype=torch.int64)
+
+        if len(self) == 0:
+            return out
+
+        active = torch.arange(len(encoded))
+        slots = hashes & self._mask
+
+        while len(active) > 0:
+            entries = self.table[slots].to(torch.int64) - 1
+            probing = entries >= 0
+
+            candidates = probing & (self.hashes[entries.clamp(min=0)] == hashes[active])
+            matches = candidates.nonzero().flatten()
+            if len(matches) > 0:
+                starts = self.offsets[entries[matches]].tolist()
+                ends = self.offsets[entries[matches] + 1].tolist()
+                queries = active[matches].tolist()
+                same = torch.tensor(
+                    [self.blob[s:e] == encoded[q] for s, e, q in zip(starts, ends, queries)],
+                    dtype=torch.bool,
+                )
+                out[active[matches[same]]] = entries[matches[same]]
+                probing[matches[same]] = False
+
+            active = active[probing]
+            slots = (slots[probing] + 1) & self._mask
+
+        return out
+
+    def encode(self, uris: Iterable[str]) -> torch.Tensor:
+        """Encode a batch of URIs into IDs
+
+        Args:
+            uris (Iterable[str]): URIs to be encoded
+
+        Returns:
+            torch.Tensor: IDs, `UNKNOWN_ID` for unknown URIs
+        """
+        positions = self.positions(uris)
+        ids = torch.full_like(positions, UNKNOWN_ID)
+        known = positions >= 0
+        ids[known] = self.ids[positions[known]]
+        return ids
+
+    def decode(self, ids: torch.Tensor) -> List[Optional[str]]:
+        """Decode a batch of IDs into URIs
+
+        Args:
+            ids (torch.Tensor): IDs to be decoded
+
+        Returns:
+            List[Optional[str]]: URIs, None for unknown IDs
+        """
+        ids = torch.as_tensor(ids, dtype=torch.int64).flatten()
+
+        if len(self) == 0:
+            return [None] * len(ids)
+
+        positions = torch.searchsorted(self.ids, ids, right=True) - 1
+        known = (positions >= 0) & (self.ids[positions.clamp(min=0)] == ids)
+
+        starts = self.offsets[positions.clamp(min=0)].tolist()
+        ends = self.offsets[positions.clamp(min=0) + 1].tolist()
+
+        return [
+            self.blob[s:e].decode("utf-8") if k else None
+            for s, e, k in zip(starts, ends, known.tolist())
+        ]
+
+
+class ExtendedVocabulary:
+    """Vocabulary extended with URIs added after it was built, e.g. by the dataset deltas of
+    `KnowledgeGraph.append`. The new URIs are kept in a small second vocabulary, so that the
+    base one, usually memory-mapped from the cache, is not rebuilt. URIs are looked up in the
+    base vocabulary first.
+    """
+
+    def __init__(self, base: Vocabulary, extension: Vocabulary):
+        """Initialize the extended vocabulary
+
+        Args:
+            base (Vocabulary): Base vocabulary
+            extension (Vocabulary): Vocabulary of the added URIs, with IDs following the base ones
+        """
+        self.base = base
+        self.extension = extension
+
+    @property
+    def num_ids(self) -> int:
+        return max(self.base.num_ids, self.extension.num_ids)
+
+    def __len__(self) -> int:
+        return len(self.base) + len(self.extension)
+
+    def __contains__(self, uri: str) -> bool:
+        return uri in self.base or uri in self.extension
+
+    def __getitem__(self, uri: str) -> int:
+        if uri in self.base:
+            return self.base[uri]
+        return self.extension[uri]
+
+    def encode(self, uris: Iterable[str]) -> torch.Tensor:
+        """Encode a batch of URIs into IDs, see `Vocabulary.encode`"""
+        uris = list(uris)
+        ids = self.base.encode(uris)
+        unknown = (ids == UNKNOWN_ID).nonzero().flatten()
+        if len(unknown) > 0:
+            ids[unknown] = self.extension.encode([uris[i] for i in unknown.tolist()])
+        return ids
+
+    def decode(self, ids: torch.Tensor) -> List[Optional[str]]:
+        """Decode a batch of IDs into URIs, see `Vocabulary.decode`"""
+        ids = torch.as_tensor(ids, dtype=torch.int64).flatten()
+        uris = self.base.decode(ids)
+        unknown = [i for i, uri in enumerate(uris) if uri is None]
+        if unknown:
+            for i, uri in zip(unknown, self.extension.decode(ids[unknown])):
+                uris[i] = uri
+        return uris
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import stat
+import struct
+import threading
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import Dict, Optional, Union
+
+# Fixed size part of a zip local file header, followed by the file name and the extra field
+LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+
+
+class _MemberRange(io.RawIOBase):
+    """Seekable read-only view on the byte range of an uncompressed archive member"""
+
+    def __init__(self, path: Path, name: str, offset: int, size: int):
+        self.name = name
+        self._file = open(path, "rb")
+        self._offset = offset
+        self._size = size
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self._size
+        self._position = min(max(offset, 0), self._size)
+        return self._position
+
+    def readinto(self, buffer) -> int:
+        length = min(len(buffer), self._size - self._position)
+        if length <= 0:
+            return 0
+        self._file.seek(self._offset + self._position)
+        read = self._file.readinto(memoryview(buffer)[:length])
+        self._position += read
+        return read
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+class Archive:
+    """Read-only access to the members of a zip archive. Compressed members are decompressed
+    while streaming, uncompressed (stored) members are read directly from their byte range in
+    the archive file and support seeking.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        """Index the archive members
+
+        Args:
+            path (Union[str, Path]): Zip archive location
+        """
+        self.path = Path(path).resolve()
+        self._zip = None
+        self._lock = threading.Lock()
+        self._index()
+
+    def _index(self):
+        with zipfile.ZipFile(self.path) as archive:
+            self.members: Dict[str, zipfile.ZipInfo] = {
+                info.filename.rstrip("/"): info for info in archive.infolist()
+            }
+        self.folders = {
+            str(parent)
+            for member in self.members
+            for parent in PurePosixPath(member).parents
+            if str(parent) != "."
+        }
+        self.folders.update(name for name, info in self.members.items() if info.is_dir())
+
+    def __getstate__(self) -> dict:
+        return {"path": self.path}
+
+    def __setstate__(self, state: dict):
+        self.path = state["path"]
+        self._zip = None
+        self._lock = threading.Lock()
+        self._index()
+
+    def is_file(self, member: str) -> bool:
+        return member in self.members and not self.members[member].is_dir()
+
+    def is_dir(self, member: str) -> bool:
+        return member == "" or member in self.folders
+
+    def member_range(self, member: str) -> Optional[tuple]:
+        """Byte range of an uncompressed member in the archive file
+
+        Args:
+            member (str): Member name
+
+        Returns:
+            Optional[tuple]: Offset and size of the member data, None for compressed members
+        """
+        info = self.members[member]
+        if info.compress_type != zipfile.ZIP_STORED:
+            return None
+
+        with open(self.path, "rb") as f:
+            f.seek(info.header_offset)
+            header = LOCAL_HEADER.unpack(f.read(LOCAL_HEADER.size))
+
+        name_length, extra_length = header[-2], header[-1]
+        offset = info.header_offset + LOCAL_HEADER.size + name_length + extra_length
+        return offset, info.file_size
+
+    def open(self, member: str) -> io.BufferedIOBase:
+        """Open a member for binary reading, without extracting it
+
+        Args:
+            member (str): Member name
+
+        Raises:
+            FileNotFoundError: If the member is not in the archive
+
+        Returns:
+            io.BufferedIOBase: Binary file object
+        """
+        if not self.is_file(member):
+            raise FileNotFoundError(f"{member} not found in {self.path}")
+
+        byte_range = self.member_range(member)
+        if byte_range is not None:
+            return io.BufferedReader(_MemberRange(self.path, member, *byte_range))
+
+        with self._lock:
+            if self._zip is None:
+                self._zip = zipfile.ZipFile(self.path)
+            return self._zip.open(self.members[member])
+
+
+class ArchivePath:
+    """Path-like reference to a file of a dataset distributed as a zip archive. Files are read
+    from an overlay folder next to the archive when present there, otherwise from the archive
+    itself. Files written through an `ArchivePath` (e.g. JSON conversions and caches) go to the
+    overlay folder, since the archive is never modified.
+    """
+
+    def __init__(self, archive: Archive, member: str = "", overlay: Optional[Path] = None):
+        """Initialize the reference
+
+        Args:
+            archive (Archive): Dataset archive
+            member (str, optional): Member name, the archive root if empty. Defaults to "".
+            overlay (Optional[Path], optional): Overlay folder, the archive location without suffix if None. Defaults to None.
+        """
+        self.archive = archive
+        self.member = member.strip("/")
+        self.overlay = Path(overlay) if overlay is not None else archive.path.with_suffix("")
+
+    def __truediv__(self, other: Union[str, Path]) -> "ArchivePath":
+        member = str(PurePosixPath(self.member or ".") / str(other))
+        return ArchivePath(self.archive, member if member != "." else "", self.overlay)
+
+    def __str__(self) -> str:
+        return f"{self.archive.path}/{self.member}" if self.member else str(self.archive.path)
+
+    def __repr__(self) -> str:
+        return f"ArchivePath({str(self)!r})"
+
+    def __eq__(self, other) -> bool:
+        return (
+            isinstance(other, ArchivePath)
+            and self.archive.path == other.archive.path
+            and self.member == other.member
+        )
+
+    def __hash__(self) -> int:
+        return hash((self.archive.path, self.member))
+
+    @property
+    def name(self) -> str:
+        return PurePosixPath(self.member).name
+
+    @property
+    def suffix(self) -> str:
+        return PurePosixPath(self.member).suffix
+
+    @property
+    def stem(self) -> str:
+        return PurePosixPath(self.member).stem
+
+    @property
+    def parent(self) -> "ArchivePath":
+        parent = str(PurePosixPath(self.member).parent)
+        return ArchivePath(self.archive, parent if parent != "." else "", self.overlay)
+
+    @property
+    def local_path(self) -> Path:
+        """Location of the file in the overlay folder"""
+        return self.overlay / self.member if self.member else self.overlay
+
+    def resolve(self) -> "ArchivePath":
+        return self
+
+    def absolute(self) -> "ArchivePath":
+        return self
+
+    def exists(self) -> bool:
+        return self.local_path.exists() or self.is_file() or self.is_dir()
+
+    def is_file(self) -> bool:
+        return self.local_path.is_file() or self.archive.is_file(self.member)
+
+    def is_dir(self) -> bool:
+        return self.local_path.is_dir() or self.archive.is_dir(self.member)
+
+    def stat(self) -> os.stat_result:
+        """Status of the overlay file if present, otherwise of the archive member, with the
+        modification time of the archive itself
+
+        Raises:
+            FileNotFoundError: If the file does not exist
+
+        Returns:
+            os.stat_result: File status
+        """
+        if self.local_path.exists():
+            return self.local_path.stat()
+        if not self.archive.is_file(self.member):
+            raise FileNotFoundError(str(self))
+
+        archive_stat = self.archive.path.stat()
+        size = self.archive.members[self.member].file_size
+        mtime = archive_stat.st_mtime
+        return os.stat_result(
+            (stat.S_IFREG | 0o444, 0, 0, 1, 0, 0, size, mtime, mtime, mtime),
+            {"st_mtime_ns": archive_stat.st_mtime_ns},
+        )
+
+    def mkdir(self, parents: bool = False, exist_ok: bool = False):
+        self.local_path.mkdir(parents=parents, exist_ok=exist_ok)
+
+    def open(self, mode: str = "r", encoding: Optional[str] = None, newline: Optional[str] = None):
+        """Open the file, see `open`. Writing opens the overlay file, creating its folders.
+
+        Args:
+            mode (str, optional): File mode. Defaults to "r".
+            encoding (Optional[str], optional): Text encoding, UTF-8 for archive members if None. Defaults to None.
+            newline (Optional[str], optional): Newline translation of text mode. Defaults to None.
+
+        Returns:
+            File object
+        """
+        if any(flag in mode for flag in "wax+"):
+            self.local_path.parent.mkdir(parents=True, exist_ok=True)
+            return open(self.local_path, mode, encoding=encoding, newline=newline)
+
+        if self.local_path.exists():
+            return open(self.local_path, mode, encoding=encoding, newline=newline)
+
+        binary = self.archive.open(self.member)
+        if "b" in mode:
+            return binary
+        return io.TextIOWrapper(binary, encoding=encoding or "utf-8", newline=newline)
+
+
+def is_archive(path: Union[str, Path]) -> bool:
+    """Check if a path is a zip archive
+
+    Args:
+        path (Union[str, Path]): File location
+
+    Returns:
+        bool: True for zip archives
+    """
+    path = Path(path)
+    return path.is_file() and zipfile.is_zipfile(path)
+
+
+def dataset_path(path: Union[str, Path, ArchivePath]) -> Union[Path, ArchivePath]:
+    """Root of a dataset, either a folder or a zip archive
+
+    Args:
+        path (Union[str, Path, ArchivePath]): Dataset folder or archive location
+
+    Returns:
+        Union[Path, ArchivePath]: Absolute folder path, or archive root
+    """
+    if isinstance(path, ArchivePath):
+        return path
+    path = Path(path).resolve().absolute()
+    if is_archive(path):
+        return ArchivePath(Archive(path))
+    return path
+
+
+def local_path(path: Union[Path, ArchivePath]) -> Path:
+    """Folder where files derived from a dataset are written: the dataset folder itself, or the
+    overlay folder of an archive
+
+    Args:
+        path (Union[Path, ArchivePath]): Dataset path
+
+    Returns:
+        Path: Writable location
+    """
+    if isinstance(path, ArchivePath):
+        return path.local_path
+    return Path(path)
+
+
+def open_file(
+    path: Union[str, Path, ArchivePath],
+    mode: str = "r",
+    encoding: Optional[str] = None,
+    newline: Optional[str] = None,
+):
+    """Open a file of a dataset folder or archive, see `open`
+
+    Args:
+        path (Union[str, Path, ArchivePath]): File location
+        mode (str, optional): File mode. Defaults to "r".
+        encoding (Optional[str], optional): Text encoding. Defaults to None.
+        newline (Optional[str], optional): Newline translation of text mode. Defaults to None.
+
+    Returns:
+        File object
+    """
+    if isinstance(path, ArchivePath):
+        return path.open(mode, encoding=encoding, newline=newline)
+    return open(path, mode, encoding=encoding, newline=newline)
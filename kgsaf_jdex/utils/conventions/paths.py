@@ -10,6 +10,11 @@ RDF_TRAIN = "abox/splits/train.nt"
 RDF_TEST = "abox/splits/test.nt"
 RDF_VALID = "abox/splits/valid.nt"
 
+ID_TRIPLES = "abox/obj_prop_assertions_ids.tsv"
+ID_TRAIN = "abox/splits/train_ids.tsv"
+ID_TEST = "abox/splits/test_ids.tsv"
+ID_VALID = "abox/splits/valid_ids.tsv"
+
 
 # ABOX / CLASS ASSERTIONS
 
@@ -47,7 +52,14 @@ ANNOTATIONS = "annotations.owl"
 # OTHER
 
 CACHE = ".cache"
-KG_CACHE = ".cache/knowledge_graph.pkl"
+KG_CACHE = ".cache/knowledge_graph"
+KG_CACHE_MANIFEST = ".cache/knowledge_graph/manifest.json"
+GRAPH_CACHE = ".cache/graphs"
+
+
+# DELTAS
+
+DELTAS = "deltas"
 
 
 
@@ -1,7 +1,15 @@
 #!/usr/bin/env python3
 
 import json
+import os
+import re
+import shutil
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
 from pathlib import Path
+from typing import Dict, Generator, Iterator, List, Optional, Tuple, Union
 
 from rdflib import OWL, RDF, RDFS, BNode, Graph, Literal, Namespace
 from rdflib.namespace import split_uri
@@ -9,11 +17,129 @@ from rdflib.term import URIRef
 
 import kgsaf_jdex.utils.conventions.ids as idc
 import kgsaf_jdex.utils.conventions.paths as pc
+from kgsaf_jdex.utils.archive import dataset_path, local_path, open_file
+from kgsaf_jdex.utils.graph_cache import GraphCache, GraphSnapshot, parse_graph
+from kgsaf_jdex.utils.instrumentation import Phase, PhaseRecorder, get_recorder, logger
 from kgsaf_jdex.utils.utility import verbose_print
 from kgsaf_jdex.utils.conventions.builtins import BUILTIN_URIS
 
 
-def rdf_list_to_python_list(graph: Graph, head: URIRef, depth: int, verbose: bool = True) -> list:
+# Predicates whose object is an RDF list, converted into a Python list of its elements
+
+COLLECTION_PREDICATES = {
+    str(OWL.unionOf),
+    str(OWL.intersectionOf),
+    str(OWL.oneOf),
+    str(OWL.AllDisjointClasses),
+    str(OWL.AllDisjointProperties),
+}
+
+
+def _list_items(
+    graph: Graph, head: URIRef, depth: int, verbose: bool
+) -> Generator[Tuple[URIRef, int], object, list]:
+    """Walk an RDF list, yielding each element with its depth and receiving back its conversion.
+    A list looping back on one of its cells ends there.
+    """
+    indent = "\t" * depth
+    items = []
+    visited = set()
+    while head and head != RDF.nil and head not in visited:
+        visited.add(head)
+        first = next(graph.objects(head, RDF.first), None)
+        verbose_print(f"{indent}List Element {first}", verbose)
+        if first is not None:
+            items.append((yield first, depth + 1))
+        head = next(graph.objects(head, RDF.rest), None)
+    return items
+
+
+def _bnode_items(
+    graph: Graph, node: BNode, depth: int, verbose: bool
+) -> Generator[Tuple[URIRef, int], object, dict]:
+    """Walk the description of a blank node, yielding each object with its depth and receiving
+    back its conversion
+    """
+    indent = "\t" * depth
+    verbose_print(f"{indent}Found BNode {node} Starting Recursive Evaluation", verbose)
+
+    node_dict = {}
+
+    for _, p, o in graph.triples((node, None, None)):
+        pred = str(p)
+
+        verbose_print(f"{indent}Evaluating  - {p} {o}", verbose)
+
+        if pred in COLLECTION_PREDICATES:
+            verbose_print(
+                f"{indent}\tFound Collection {pred} Starting Recursive Evaluation",
+                verbose,
+            )
+            node_dict[pred] = yield from _list_items(graph, o, depth + 1, verbose)
+        else:
+            node_dict.setdefault(pred, []).append((yield o, depth + 1))
+
+    return node_dict
+
+
+def _convert(
+    graph: Graph,
+    root: Generator,
+    root_node: Optional[BNode],
+    verbose: bool,
+    memo: Dict[BNode, dict],
+) -> Union[dict, list]:
+    """Drive the conversion of nested blank nodes with an explicit stack instead of recursion.
+    Converted blank nodes are memoized and shared by every later reference, a reference to a
+    blank node still being converted (a cycle) is converted into its identifier.
+
+    Args:
+        graph (Graph): RDFLib Graph to be parsed
+        root (Generator): Walk of the starting node, `_bnode_items` or `_list_items`
+        root_node (Optional[BNode]): Starting blank node, None for lists
+        verbose (bool): Log printing.
+        memo (Dict[BNode, dict]): Already converted blank nodes
+
+    Returns:
+        Union[dict, list]: Conversion of the starting node
+    """
+    stack = [(root_node, root)]
+    active = {root_node}
+    value = None
+
+    while True:
+        node, walk = stack[-1]
+        try:
+            child, depth = walk.send(value)
+        except StopIteration as stop:
+            stack.pop()
+            active.discard(node)
+            value = stop.value
+            if node is not None:
+                memo[node] = value
+            if not stack:
+                return value
+            continue
+
+        if not isinstance(child, BNode):
+            value = str(child)
+        elif child in memo:
+            value = memo[child]
+        elif child in active:
+            value = str(child)
+        else:
+            active.add(child)
+            stack.append((child, _bnode_items(graph, child, depth, verbose)))
+            value = None
+
+
+def rdf_list_to_python_list(
+    graph: Graph,
+    head: URIRef,
+    depth: int,
+    verbose: bool = True,
+    memo: Optional[Dict[BNode, dict]] = None,
+) -> list:
     """Convert an RDF list (rdf:first/rest/nil chain) into a Python list.
 
 
@@ -22,65 +148,110 @@ def rdf_list_to_python_list(graph: Graph, head: URIRef, depth: int, verbose: boo
         head (URIRef): List starting node
         depth (int): Recursion depth
         verbose (bool): Log printing. Defaults to True.
+        memo (Optional[Dict[BNode, dict]], optional): Blank nodes already converted on the same graph, shared between calls. Defaults to None.
 
     Returns:
         list: Python list from RDF list
     """
-    items = []
-    while head and head != RDF.nil:
-        first = next(graph.objects(head, RDF.first), None)
-        verbose_print(f"{"\t"*depth}List Element {first}", verbose)
-        if first is not None:
-            items.append(bnode_to_dict(graph, first, depth + 1))
-        head = next(graph.objects(head, RDF.rest), None)
-    return items
+    memo = {} if memo is None else memo
+    return _convert(graph, _list_items(graph, head, depth, verbose), None, verbose, memo)
 
 
-def bnode_to_dict(graph: Graph, node: URIRef, depth: int = 1, verbose: bool = True) -> dict:
-    """Recursively convert an RDF node (especially blank nodes) into JSON.
+def bnode_to_dict(
+    graph: Graph,
+    node: URIRef,
+    depth: int = 1,
+    verbose: bool = True,
+    memo: Optional[Dict[BNode, dict]] = None,
+) -> dict:
+    """Convert an RDF node (especially blank nodes) into JSON. Nested blank nodes are visited
+    iteratively, a blank node referenced more than once is converted once and the same object
+    is shared by all its references.
 
     Args:
         graph (Graph): RDFLib Graph to be parsed
         node (URIRef): Starting node
         depth (int, optional): Recursion depth. Defaults to 1.
         verbose (bool): Log printing. Defaults to True.
+        memo (Optional[Dict[BNode, dict]], optional): Blank nodes already converted on the same graph, shared between calls. Defaults to None.
 
     Returns:
         dict: Python dict from RDF description
     """
 
-    if isinstance(node, URIRef):
-        return str(node)
-    if isinstance(node, Literal):
-        return str(node)
     if not isinstance(node, BNode):
         return str(node)
 
-    node_dict = {}
+    memo = {} if memo is None else memo
 
-    verbose_print(f"{"\t"*depth}Found BNode {node} Starting Recursive Evaluation", verbose)
+    if node not in memo:
+        _convert(graph, _bnode_items(graph, node, depth, verbose), node, verbose, memo)
 
-    for _, p, o in graph.triples((node, None, None)):
-        pred = str(p)
+    return memo[node]
 
-        verbose_print(f"{"\t"*depth}Evaluating  - {p} {o}", verbose)
 
-        if pred in {
-            str(OWL.unionOf),
-            str(OWL.intersectionOf),
-            str(OWL.oneOf),
-            str(OWL.AllDisjointClasses),
-            str(OWL.AllDisjointProperties),
-        }:
-            verbose_print(
-                f"{"\t"*(depth+1)}Found Collection {pred} Starting Recursive Evaluation",
-                verbose
-            )
-            node_dict[pred] = rdf_list_to_python_list(graph, o, depth + 1, verbose)
-        else:
-            node_dict.setdefault(pred, []).append(bnode_to_dict(graph, o, depth + 1, verbose))
+# Preprocessing steps, with the OWL file they read, their JSON output and their log name.
+# Steps reading the same file share a single parsed graph.
 
-    return node_dict
+PREPROCESS_STEPS = {
+    "taxonomy": (pc.RDF_TAXONOMY, pc.TAXONOMY, "Taxonomy"),
+    "class_assertions": (pc.RDF_CLASS_ASSERTIONS, pc.CLASS_ASSERTIONS, "Class Assertions"),
+    "obj_prop_hierarchy": (pc.RDF_OBJ_PROP, pc.OBJ_PROP_HIERARCHY, "Object Property Hierarchy"),
+    "obj_prop_domain_range": (
+        pc.RDF_OBJ_PROP,
+        pc.OBJ_PROP_DOMAIN_RANGE,
+        "Object Property Domain and Range",
+    ),
+}
+
+
+def _preprocess_file(
+    base_path: Path,
+    file_location: str,
+    steps: List[str],
+    verbose: bool,
+    cache: bool,
+    enabled: bool = False,
+    trace_memory: bool = False,
+) -> Tuple[Dict[str, dict], Dict[str, float], List[Phase]]:
+    """Parse an OWL file once and run every preprocessing step reading it
+
+    Args:
+        base_path (Path): Dataset location path
+        file_location (str): OWL file, relative to the dataset path
+        steps (List[str]): Steps to be run, keys of `PREPROCESS_STEPS`
+        verbose (bool): Log printing.
+        cache (bool): Read and write the parsed graph cache.
+        enabled (bool, optional): Record the phases, so that the process peak memory is only reset when the instrumentation of the caller is on. Defaults to False.
+        trace_memory (bool, optional): Measure Python allocations with tracemalloc. Defaults to False.
+
+    Returns:
+        Tuple[Dict[str, dict], Dict[str, float], List[Phase]]: Output of each step, time in
+        seconds of the parse and of each step, and the phases of the file, of its parse and of
+        each step (empty if not enabled)
+    """
+    recorder = PhaseRecorder(enabled=enabled, trace_memory=trace_memory)
+    converter = OWLConverter(base_path, cache, recorder=recorder)
+
+    results = {}
+    timings = {}
+    with recorder.phase(file_location):
+        start = time.perf_counter()
+        with recorder.phase("parse") as phase:
+            onto = converter.load_source(file_location)
+            phase.set(len(onto))
+        timings["parse"] = time.perf_counter() - start
+
+        for step in steps:
+            verbose_print(f"Processing {PREPROCESS_STEPS[step][2]}", verbose)
+            start = time.perf_counter()
+            with recorder.phase(step) as phase:
+                results[step] = getattr(converter, f"preprocess_{step}")(verbose, onto)
+                phase.set(len(results[step]))
+            timings[step] = time.perf_counter() - start
+
+    recorder.disable()
+    return results, timings, list(recorder.report)
 
 
 class OWLConverter:
@@ -89,14 +260,55 @@ class OWLConverter:
     def __init__(
         self,
         path: str,
+        cache: bool = False,
+        recorder: Optional[PhaseRecorder] = None,
     ):
-        """Initialize the converter with a dataset base path
+        """Initialize the converter with a dataset base path. When the dataset is a zip archive,
+        OWL files are streamed from it and the JSON files and caches are written to the folder
+        with the same name next to the archive.
 
         Args:
-            path (str): Dataset location path
+            path (str): Dataset location path, a folder or a zip archive
+            cache (bool, optional): Read and write parsed OWL files in the graph cache at `paths.GRAPH_CACHE`, the preprocessing steps then get a `GraphSnapshot` in place of an rdflib `Graph`. Defaults to False.
+            recorder (Optional[PhaseRecorder], optional): Recorder of the parse and preprocessing phases, the process wide one if None. Defaults to None.
         """
         self.p_data = dict()
-        self.base_path = Path(path).resolve().absolute()
+        self.report = dict()
+        self.base_path = dataset_path(path)
+        self.cache = cache
+        self.recorder = get_recorder() if recorder is None else recorder
+
+    def load_graph(self, file_location: str) -> Graph:
+        """Parse a dataset OWL file, through the graph cache if enabled
+
+        Args:
+            file_location (str): OWL file, relative to the dataset path
+
+        Returns:
+            Graph: Parsed graph
+        """
+        if not self.cache:
+            return parse_graph(self.base_path / file_location)
+        return self._graph_cache.graph(self.base_path / file_location)
+
+    def load_source(self, file_location: str) -> Union[Graph, GraphSnapshot]:
+        """Load a dataset OWL file for the preprocessing steps. With the graph cache enabled the
+        snapshot is returned as is, skipping the rehydration into an rdflib graph, since it
+        supports the same triple pattern queries.
+
+        Args:
+            file_location (str): OWL file, relative to the dataset path
+
+        Returns:
+            Union[Graph, GraphSnapshot]: Parsed graph or its snapshot
+        """
+        if not self.cache:
+            return self.load_graph(file_location)
+        return self._graph_cache.snapshot(self.base_path / file_location)
+
+    @property
+    def _graph_cache(self) -> GraphCache:
+        return GraphCache(local_path(self.base_path) / pc.GRAPH_CACHE)
 
     def preprocess(
         self,
@@ -104,9 +316,14 @@ class OWLConverter:
         class_assertions: bool = True,
         obj_prop_domain_range: bool = True,
         obj_prop_hierarchy: bool = True,
-        verbose: bool = True
+        verbose: bool = True,
+        workers: int = 1,
     ):
-        """Preprocess a subset of the dataset schema into Python data structure
+        """Preprocess a subset of the dataset schema into Python data structure. Each OWL file
+        is parsed once and shared by the steps reading it, with `workers` greater than one
+        different files are processed in parallel by a process pool. Time and peak memory (only
+        measured when the recorder is enabled) of every file are stored in `report`, logged at INFO level on the "kgsaf_jdex" logger and
+        printed if `verbose`, and its phases are added to the recorder under "owl_converter".
 
         Args:
             taxonomy (bool, optional): Load and convert taxonomy axioms. Defaults to True.
@@ -114,48 +331,81 @@ class OWLConverter:
             obj_prop_domain_range (bool, optional): Load and convert object propoerty domain and range. Defaults to True.
             obj_prop_hierarchy (bool, optional): Load and convert object property hierarchy. Defaults to True.
             verbose (bool): Log printing. Defaults to True.
+            workers (int, optional): Number of worker processes. Defaults to 1.
         """
 
-        print(f"Processing Dataset at {self.base_path}")
+        verbose_print(f"Processing Dataset at {self.base_path}", verbose)
 
-        if taxonomy:
-            print("Processing Taxonomy")
-            self.p_data["taxonomy"] = (
-                self.preprocess_taxonomy(verbose),
-                self.base_path / pc.TAXONOMY,
-            )
-
-        if class_assertions:
-            print("Processing Class Assertions")
-            self.p_data["class_assertions"] = (
-                self.preprocess_class_assertions(verbose),
-                self.base_path / pc.CLASS_ASSERTIONS,
-            )
-
-        if obj_prop_hierarchy:
-            print("Processing Object Property Hierarchy")
-            self.p_data["obj_prop_hierarchy"] = (
-                self.preprocess_obj_prop_hierarchy(verbose),
-                self.base_path / pc.OBJ_PROP_HIERARCHY,
-            )
+        selected = {
+            "taxonomy": taxonomy,
+            "class_assertions": class_assertions,
+            "obj_prop_hierarchy": obj_prop_hierarchy,
+            "obj_prop_domain_range": obj_prop_domain_range,
+        }
 
-        if obj_prop_domain_range:
-            print("Processing Object Property Domain and Range")
-            self.p_data["obj_prop_domain_range"] = (
-                self.preprocess_obj_prop_domain_range(verbose),
-                self.base_path / pc.OBJ_PROP_DOMAIN_RANGE,
-            )
+        files = {}
+        for step, enabled in selected.items():
+            if enabled:
+                files.setdefault(PREPROCESS_STEPS[step][0], []).append(step)
+
+        enabled = self.recorder.enabled
+        trace_memory = enabled and self.recorder.trace_memory
+
+        with self.recorder.phase("owl_converter"):
+            if workers > 1 and len(files) > 1:
+                with ProcessPoolExecutor(max_workers=min(workers, len(files))) as executor:
+                    futures = {
+                        file_location: executor.submit(
+                            _preprocess_file,
+                            self.base_path,
+                            file_location,
+                            steps,
+                            verbose,
+                            self.cache,
+                            enabled,
+                            trace_memory,
+                        )
+                        for file_location, steps in files.items()
+                    }
+                    outputs = {name: future.result() for name, future in futures.items()}
+            else:
+                outputs = {
+                    file_location: _preprocess_file(
+                        self.base_path, file_location, steps, verbose, self.cache, enabled, trace_memory
+                    )
+                    for file_location, steps in files.items()
+                }
+
+            results = {}
+            for file_location, (file_results, timings, phases) in outputs.items():
+                results.update(file_results)
+
+                peak = phases[0].rss_peak if phases else None
+                self.report[file_location] = {"timings": timings, "peak_memory": peak}
+                self.recorder.extend(phases)
+
+                peak = f"{peak / 2**20:.1f} MiB" if peak is not None else "n/a"
+                steps = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items())
+                summary = f"{file_location}: {steps}, peak memory {peak}"
+                logger.info(summary)
+                verbose_print(summary, verbose)
+
+        for step in selected:
+            if step in results:
+                self.p_data[step] = (results[step], self.base_path / PREPROCESS_STEPS[step][1])
 
     def serialize(self):
         """Serialize loaded and converted data into JSON format"""
-        for values in self.p_data.values():
+        for step, values in self.p_data.items():
             obj = values[0]
             path = values[1]
 
-            with open(path, "w") as f:
-                json.dump(obj, f, indent=4)
+            with self.recorder.phase(f"owl_converter/serialize/{step}") as phase:
+                with open_file(path, "w") as f:
+                    json.dump(obj, f, indent=4)
+                phase.set(len(obj))
 
-    def preprocess_taxonomy(self, verbose: bool) -> dict:
+    def preprocess_taxonomy(self, verbose: bool, onto: Optional[Graph] = None) -> dict:
         """Process taxonomy data, the out dictionary will be formatted as:
 
         ```
@@ -166,28 +416,30 @@ class OWLConverter:
 
         Args:
             verbose (bool): Log printing.
+            onto (Optional[Graph], optional): Already parsed graph of the source file. Defaults to None.
 
         Returns:
             dict: Dictionary with list of classes and theri super classes
         """
 
-        onto = Graph()
-        onto.parse(self.base_path / pc.RDF_TAXONOMY)
+        if onto is None:
+            onto = self.load_graph(pc.RDF_TAXONOMY)
         classes = set(onto.subjects(RDF.type, OWL.Class))
 
         out_json = {}
+        memo = {}
 
         for c in classes:
             verbose_print(f"Processing main class {c}", verbose)
             sup_c = []
             for o in set(onto.objects(c, RDFS.subClassOf)) - BUILTIN_URIS:
-                sup_c.append(bnode_to_dict(onto, o, verbose=verbose))
+                sup_c.append(bnode_to_dict(onto, o, verbose=verbose, memo=memo))
             if sup_c:
                 out_json[c] = sup_c
 
         return out_json
 
-    def preprocess_class_assertions(self, verbose: bool) -> dict:
+    def preprocess_class_assertions(self, verbose: bool, onto: Optional[Graph] = None) -> dict:
         """Process class assertions data, the out dictionary will be formatted as:
 
         ```
@@ -196,13 +448,14 @@ class OWLConverter:
 
         Args:
             verbose (bool): Log printing.
+            onto (Optional[Graph], optional): Already parsed graph of the source file. Defaults to None.
 
         Returns:
             dict: Dictionary with list of individuals and their types
         """
 
-        onto = Graph()
-        onto.parse(self.base_path / pc.RDF_CLASS_ASSERTIONS)
+        if onto is None:
+            onto = self.load_graph(pc.RDF_CLASS_ASSERTIONS)
         individuals = set(onto.subjects(RDF.type, OWL.NamedIndividual))
 
         out_json = {}
@@ -217,7 +470,7 @@ class OWLConverter:
 
         return out_json
 
-    def preprocess_obj_prop_domain_range(self, verbose: bool) -> dict:
+    def preprocess_obj_prop_domain_range(self, verbose: bool, onto: Optional[Graph] = None) -> dict:
         """Process object properties domain and range, the out dictionary will be formatted as:
 
         ```
@@ -231,17 +484,19 @@ class OWLConverter:
 
         Args:
             verbose (bool): Log printing.
+            onto (Optional[Graph], optional): Already parsed graph of the source file. Defaults to None.
 
         Returns:
             dict: Dictionary with list of object properties and domain and range classes
         """
 
-        onto = Graph()
-        onto.parse(self.base_path / pc.RDF_OBJ_PROP)
+        if onto is None:
+            onto = self.load_graph(pc.RDF_OBJ_PROP)
 
         obj_props = set(onto.subjects(RDF.type, OWL.ObjectProperty))
 
         out_json = {}
+        memo = {}
 
         for prop in obj_props:
             prop_data = {}
@@ -249,20 +504,20 @@ class OWLConverter:
             # Get domains
             domains = list(onto.objects(prop, RDFS.domain))
             prop_data["domain"] = (
-                [bnode_to_dict(onto, d, verbose=verbose) for d in domains] if domains else [OWL.Thing]
+                [bnode_to_dict(onto, d, verbose=verbose, memo=memo) for d in domains] if domains else [OWL.Thing]
             )
 
             # Get ranges
             ranges = list(onto.objects(prop, RDFS.range))
             prop_data["range"] = (
-                [bnode_to_dict(onto, r, verbose=verbose) for r in ranges] if ranges else [OWL.Thing]
+                [bnode_to_dict(onto, r, verbose=verbose, memo=memo) for r in ranges] if ranges else [OWL.Thing]
             )
 
             out_json[str(prop)] = prop_data
 
         return out_json
 
-    def preprocess_obj_prop_hierarchy(self, verbose:bool) -> dict:
+    def preprocess_obj_prop_hierarchy(self, verbose: bool, onto: Optional[Graph] = None) -> dict:
         """Process object properties hierarchy, the out dictionary will be formatted as:
 
         ```
@@ -273,21 +528,357 @@ class OWLConverter:
 
         Args:
             verbose (bool): Log printing.
+            onto (Optional[Graph], optional): Already parsed graph of the source file. Defaults to None.
 
         Returns:
             dict: Dictionary with list of object properties and their hierarchy
         """
 
-        onto = Graph()
-        onto.parse(self.base_path / pc.RDF_OBJ_PROP)
+        if onto is None:
+            onto = self.load_graph(pc.RDF_OBJ_PROP)
 
         out_json = {}
+        memo = {}
 
         for r in onto.subjects(RDF.type, OWL.ObjectProperty):
             val = []
             for sup_r in set(onto.objects(r, RDFS.subPropertyOf)) - BUILTIN_URIS:
-                val.append(bnode_to_dict(onto, sup_r, verbose=verbose))
+                val.append(bnode_to_dict(onto, sup_r, verbose=verbose, memo=memo))
             if val:
                 out_json[r] = val
 
         return out_json
+
+
+# N-Triples Streaming Conversion
+
+# Subjects are IRIs or blank nodes, predicates are IRIs, objects are IRIs, blank nodes or literals
+NT_TRIPLE = re.compile(
+    r"\s*(?:<([^>]*)>|_:(\S+))"
+    r"\s*<([^>]*)>"
+    r"\s*(?:<([^>]*)>|_:(\S+)|\"((?:[^\"\\]|\\.)*)\"(?:@[A-Za-z0-9-]+|\^\^<[^>]*>)?)"
+    r"\s*\.\s*(?:#.*)?"
+)
+
+NT_ESCAPE = re.compile(r"\\(?:u([0-9A-Fa-f]{4})|U([0-9A-Fa-f]{8})|(.))")
+
+NT_ECHARS = {
+    "t": "\t",
+    "b": "\b",
+    "n": "\n",
+    "r": "\r",
+    "f": "\f",
+    '"': '"',
+    "'": "'",
+    "\\": "\\",
+}
+
+# Size of the byte ranges processed by each worker and number of lines written at once
+NT_CHUNK_SIZE = 1 << 26
+NT_WRITE_BATCH = 1 << 16
+
+
+def _nt_unescape(text: str) -> str:
+    if "\\" not in text:
+        return text
+    return NT_ESCAPE.sub(
+        lambda m: chr(int(m[1] or m[2], 16)) if m[3] is None else NT_ECHARS.get(m[3], m[3]),
+        text,
+    )
+
+
+def parse_ntriples_line(line: str) -> Optional[Tuple[str, str, str]]:
+    """Parse a single N-Triples line into the string form of its terms, the same given by
+    `str()` on the corresponding rdflib terms (IRIs without brackets, literal lexical forms).
+
+    Args:
+        line (str): N-Triples line
+
+    Raises:
+        ValueError: If the line is not a valid triple
+
+    Returns:
+        Optional[Tuple[str, str, str]]: Subject, predicate and object, None for blank or comment lines
+    """
+    # Fast path for the common <s> <p> <o> . line
+    parts = line.split("> <")
+    if len(parts) == 3 and parts[0][:1] == "<" and parts[2].rstrip().endswith("> ."):
+        s, p, o = parts[0][1:], parts[1], parts[2].rstrip()[:-3]
+        if not any(" " in term or "<" in term or ">" in term for term in (s, p, o)):
+            return _nt_unescape(s), _nt_unescape(p), _nt_unescape(o)
+
+    stripped = line.strip()
+    if not stripped or stripped.startswith("#"):
+        return None
+
+    m = NT_TRIPLE.fullmatch(stripped)
+    if m is None:
+        raise ValueError(f"Malformed triple line: {line!r}")
+
+    s = m[1] if m[1] is not None else m[2]
+    o = next(term for term in (m[4], m[5], m[6]) if term is not None)
+    return _nt_unescape(s), _nt_unescape(m[3]), _nt_unescape(o)
+
+
+def _nt_ranges(path: Path, chunk_size: int) -> List[Tuple[int, int]]:
+    size = os.path.getsize(path)
+    return [(start, min(start + chunk_size, size)) for start in range(0, size, chunk_size)]
+
+
+def _nt_read_lines(path: Path, start: int, end: int) -> Iterator[str]:
+    """Lines of a file starting in the byte range [start, end)"""
+    with open(path, "rb") as f:
+        if start > 0:
+            f.seek(start - 1)
+            f.readline()
+        position = f.tell()
+        while position < end:
+            line = f.readline()
+            if not line:
+                break
+            position += len(line)
+            yield line.decode("utf-8")
+
+
+# Mappings of the integer encoding, set once in every worker process
+_nt_worker_mappings = (None, None)
+
+
+def _nt_init_worker(
+    entity_to_id: Optional[Dict[str, int]], relation_to_id: Optional[Dict[str, int]]
+):
+    global _nt_worker_mappings
+    _nt_worker_mappings = (entity_to_id, relation_to_id)
+
+
+def _nt_flush(
+    batch: List[Tuple[str, str, str]],
+    tsv_out,
+    id_out,
+    entity_to_id: Optional[Dict[str, int]],
+    relation_to_id: Optional[Dict[str, int]],
+    unknown: Counter,
+) -> int:
+    tsv_out.writelines(f"{s}\t{p}\t{o}\n" for s, p, o in batch)
+
+    if id_out is not None:
+        subjects, predicates, objects = zip(*batch) if batch else ((), (), ())
+        columns = (
+            list(map(entity_to_id.get, subjects)),
+            list(map(relation_to_id.get, predicates)),
+            list(map(entity_to_id.get, objects)),
+        )
+        for terms, ids in zip((subjects, predicates, objects), columns):
+            unknown.update(term for term, id in zip(terms, ids) if id is None)
+        id_out.writelines(
+            f"{h}\t{r}\t{t}\n"
+            for h, r, t in zip(*columns)
+            if h is not None and r is not None and t is not None
+        )
+
+    return len(batch)
+
+
+def _nt_convert_range(
+    source: Path,
+    start: int,
+    end: int,
+    destination: Path,
+    id_destination: Optional[Path],
+    entity_to_id: Optional[Dict[str, int]] = None,
+    relation_to_id: Optional[Dict[str, int]] = None,
+) -> Tuple[int, Counter]:
+    """Convert the triples of a byte range of an N-Triples file, buffering at most
+    `NT_WRITE_BATCH` triples in memory
+
+    Returns:
+        Tuple[int, Counter]: Number of converted triples and occurrence counts of unknown URIs
+    """
+    if entity_to_id is None and relation_to_id is None:
+        entity_to_id, relation_to_id = _nt_worker_mappings
+
+    count = 0
+    unknown = Counter()
+    batch = []
+
+    with open(destination, "w", encoding="utf-8") as tsv_out, (
+        open(id_destination, "w") if id_destination is not None else nullcontext()
+    ) as id_out:
+        for line in _nt_read_lines(source, start, end):
+            triple = parse_ntriples_line(line)
+            if triple is not None:
+                batch.append(triple)
+            if len(batch) >= NT_WRITE_BATCH:
+                count += _nt_flush(batch, tsv_out, id_out, entity_to_id, relation_to_id, unknown)
+                batch = []
+        count += _nt_flush(batch, tsv_out, id_out, entity_to_id, relation_to_id, unknown)
+
+    return count, unknown
+
+
+def _concatenate(parts: List[Path], destination: Path, remove: bool = False):
+    with open(destination, "wb") as out:
+        for part in parts:
+            with open(part, "rb") as f:
+                shutil.copyfileobj(f, out)
+            if remove:
+                part.unlink()
+
+
+def ntriples_to_tsv(
+    source: Path,
+    destination: Path,
+    id_destination: Optional[Path] = None,
+    entity_to_id: Optional[Dict[str, int]] = None,
+    relation_to_id: Optional[Dict[str, int]] = None,
+    workers: int = 1,
+    chunk_size: int = NT_CHUNK_SIZE,
+) -> Tuple[int, Counter]:
+    """Convert an N-Triples file to TSV line by line, without building an rdflib Graph, so that
+    memory does not grow with the file size. Optionally, the same pass writes a second TSV file
+    with the triples encoded as integer IDs, triples with URIs missing from the mappings are
+    left out of it.
+
+    With more than one worker, the file is split into byte ranges of `chunk_size` converted by
+    a process pool into part files, concatenated in order at the end. Unlike rdflib, duplicate
+    triples are kept.
+
+    Args:
+        source (Path): N-Triples file location
+        destination (Path): TSV file location
+        id_destination (Optional[Path], optional): Integer encoded TSV file location. Defaults to None.
+        entity_to_id (Optional[Dict[str, int]], optional): Subject and object URI to ID mapping, required for the integer encoding. Defaults to None.
+        relation_to_id (Optional[Dict[str, int]], optional): Predicate URI to ID mapping, required for the integer encoding. Defaults to None.
+        workers (int, optional): Number of worker processes. Defaults to 1.
+        chunk_size (int, optional): Byte range size processed by each worker task. Defaults to NT_CHUNK_SIZE.
+
+    Raises:
+        ValueError: If the integer encoding is requested without mappings, or on malformed lines
+
+    Returns:
+        Tuple[int, Counter]: Number of converted triples and occurrence counts of unknown URIs
+    """
+    source, destination = Path(source), Path(destination)
+
+    if id_destination is not None and (entity_to_id is None or relation_to_id is None):
+        raise ValueError("Integer encoded output requires both entity and relation mappings")
+
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    if id_destination is not None:
+        id_destination = Path(id_destination)
+        id_destination.parent.mkdir(parents=True, exist_ok=True)
+
+    ranges = _nt_ranges(source, chunk_size)
+
+    if workers <= 1 or len(ranges) <= 1:
+        return _nt_convert_range(
+            source,
+            0,
+            os.path.getsize(source),
+            destination,
+            id_destination,
+            entity_to_id,
+            relation_to_id,
+        )
+
+    def part(path: Optional[Path], i: int) -> Optional[Path]:
+        return None if path is None else path.with_name(f".{path.name}.part{i}")
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_nt_init_worker,
+        initargs=(entity_to_id, relation_to_id),
+    ) as executor:
+        futures = [
+            executor.submit(
+                _nt_convert_range, source, start, end, part(destination, i), part(id_destination, i)
+            )
+            for i, (start, end) in enumerate(ranges)
+        ]
+        results = [future.result() for future in futures]
+
+    _concatenate([part(destination, i) for i in range(len(ranges))], destination, remove=True)
+    if id_destination is not None:
+        _concatenate(
+            [part(id_destination, i) for i in range(len(ranges))], id_destination, remove=True
+        )
+
+    unknown = Counter()
+    for _, counts in results:
+        unknown.update(counts)
+
+    return sum(count for count, _ in results), unknown
+
+
+def convert_abox_to_tsv(
+    path: str,
+    encode: bool = False,
+    workers: int = 1,
+    verbose: bool = True,
+    recorder: Optional[PhaseRecorder] = None,
+):
+    """Convert the N-Triples ABox splits of a dataset to the `paths.TRAIN`, `paths.TEST`,
+    `paths.VALID` and `paths.TRIPLES` TSV files. When `paths.RDF_TRIPLES` is missing, the
+    triples file is the concatenation of the splits. With `encode`, the integer encoded files
+    (`paths.ID_TRAIN`, ...) are written in the same pass, using the dataset mappings.
+
+    Args:
+        path (str): Dataset location path
+        encode (bool, optional): Also write integer encoded triples. Defaults to False.
+        workers (int, optional): Number of worker processes for each file. Defaults to 1.
+        verbose (bool): Log printing. Defaults to True.
+        recorder (Optional[PhaseRecorder], optional): Recorder of the conversion of each file, the process wide one if None. Defaults to None.
+    """
+    base_path = Path(path).resolve().absolute()
+    recorder = get_recorder() if recorder is None else recorder
+
+    with recorder.phase("abox_to_tsv"):
+        _convert_abox_files(base_path, encode, workers, verbose, recorder)
+
+
+def _convert_abox_files(
+    base_path: Path, encode: bool, workers: int, verbose: bool, recorder: PhaseRecorder
+):
+    """Convert the ABox files of `convert_abox_to_tsv`, recording a phase for each file"""
+    entity_to_id, relation_to_id = None, None
+    if encode:
+        with open(base_path / pc.INDIVIDUAL_MAPPINGS, "r") as map_json:
+            entity_to_id = json.load(map_json)
+        with open(base_path / pc.OBJ_PROP_MAPPINGS, "r") as map_json:
+            relation_to_id = json.load(map_json)
+
+    files = [
+        (pc.RDF_TRAIN, pc.TRAIN, pc.ID_TRAIN),
+        (pc.RDF_TEST, pc.TEST, pc.ID_TEST),
+        (pc.RDF_VALID, pc.VALID, pc.ID_VALID),
+    ]
+    if (base_path / pc.RDF_TRIPLES).exists():
+        files.append((pc.RDF_TRIPLES, pc.TRIPLES, pc.ID_TRIPLES))
+
+    for rdf_file, tsv_file, id_file in files:
+        verbose_print(f"Converting {rdf_file}", verbose)
+        with recorder.phase(rdf_file) as phase:
+            count, unknown = ntriples_to_tsv(
+                base_path / rdf_file,
+                base_path / tsv_file,
+                base_path / id_file if encode else None,
+                entity_to_id,
+                relation_to_id,
+                workers,
+            )
+            phase.set(count, unknown=len(unknown))
+        verbose_print(f"\tWritten {count} triples to {tsv_file}", verbose)
+        if unknown:
+            print(
+                f"WARNING: {len(unknown)} URIs of {rdf_file} missing from the mappings, "
+                f"{sum(unknown.values())} occurrences. Skipped in {id_file}."
+            )
+
+    if not (base_path / pc.RDF_TRIPLES).exists():
+        verbose_print(f"Merging splits into {pc.TRIPLES}", verbose)
+        merges = [([pc.TRAIN, pc.TEST, pc.VALID], pc.TRIPLES)]
+        if encode:
+            merges.append(([pc.ID_TRAIN, pc.ID_TEST, pc.ID_VALID], pc.ID_TRIPLES))
+        with recorder.phase("merge"):
+            for splits, destination in merges:
+                _concatenate([base_path / split for split in splits], base_path / destination)
@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import struct
+from array import array
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple, Union
+
+from rdflib import BNode, Graph, Literal, URIRef
+from rdflib.term import Node
+from rdflib.util import guess_format
+
+from kgsaf_jdex.utils.archive import ArchivePath, open_file
+from kgsaf_jdex.utils.utility import file_hash
+
+GRAPH_CACHE_VERSION = 1
+
+# Size, mtime and content hash of every cached source file, so that unchanged files are not
+# hashed again
+
+GRAPH_CACHE_INDEX = "index.json"
+
+# Term kinds stored in the term table
+URI, BLANK, PLAIN_LITERAL, LANG_LITERAL, TYPED_LITERAL = range(5)
+
+Triple = Tuple[Node, Node, Node]
+Pattern = Tuple[Optional[Node], Optional[Node], Optional[Node]]
+
+
+def parse_graph(source_path: Union[Path, ArchivePath], format: Optional[str] = None) -> Graph:
+    """Parse an RDF file with rdflib, archive members are streamed from the archive
+
+    Args:
+        source_path (Union[Path, ArchivePath]): RDF source file location
+        format (Optional[str], optional): rdflib parser format, guessed from the file name if None. Defaults to None.
+
+    Returns:
+        Graph: Graph of the file triples
+    """
+    graph = Graph()
+    if not isinstance(source_path, ArchivePath):
+        graph.parse(source_path, format=format)
+        return graph
+
+    with open_file(source_path, "rb") as f:
+        graph.parse(file=f, format=format or guess_format(source_path.name) or "xml")
+    return graph
+
+
+def _pack_strings(strings: List[str]) -> Tuple[array, bytes]:
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = array("q", [0])
+    total = 0
+    for e in encoded:
+        total += len(e)
+        offsets.append(total)
+    return offsets, b"".join(encoded)
+
+
+def _unpack_strings(offsets: array, blob: bytes) -> List[str]:
+    return [blob[offsets[i] : offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+
+class GraphSnapshot:
+    """Compact, integer encoded form of an RDF graph: a table of terms and a flat array with
+    the term IDs of every triple. It can be written to and read from a binary file much faster
+    than parsing RDF/XML, and it answers the basic triple pattern queries of an rdflib `Graph`
+    (`triples`, `subjects`, `objects`, `predicates`, `in`) without building one.
+    """
+
+    def __init__(self, terms: List[Node], triples: array):
+        """Initialize the snapshot from its term table and encoded triples
+
+        Args:
+            terms (List[Node]): Term table, the ID of a term is its position
+            triples (array): Flat subject, predicate and object IDs of every triple
+        """
+        self.terms = terms
+        self.encoded = triples
+        self._ids = None
+        self._positions = [None, None, None]
+
+    # Construction
+
+    @classmethod
+    def from_graph(cls, graph: Graph) -> "GraphSnapshot":
+        """Encode an rdflib graph
+
+        Args:
+            graph (Graph): Graph to be encoded
+
+        Returns:
+            GraphSnapshot: Snapshot of the graph
+        """
+        ids = {}
+        terms = []
+        triples = array("q")
+
+        for triple in graph:
+            for term in triple:
+                id = ids.get(term)
+                if id is None:
+                    id = ids[term] = len(terms)
+                    terms.append(term)
+                triples.append(id)
+
+        snapshot = cls(terms, triples)
+        snapshot._ids = ids
+        return snapshot
+
+    @classmethod
+    def read(cls, path: Path) -> "GraphSnapshot":
+        """Read a snapshot written by `write`
+
+        Args:
+            path (Path): Snapshot file location
+
+        Raises:
+            ValueError: If the file was written by a different snapshot version
+
+        Returns:
+            GraphSnapshot: Snapshot
+        """
+        with open(path, "rb") as f:
+            (header_size,) = struct.unpack("<q", f.read(8))
+            header = json.loads(f.read(header_size))
+
+            if header["version"] != GRAPH_CACHE_VERSION:
+                raise ValueError(f"Unsupported graph snapshot version {header['version']}")
+
+            def read_array(typecode: str, length: int) -> array:
+                values = array(typecode)
+                values.frombytes(f.read(length * values.itemsize))
+                return values
+
+            num_terms = header["num_terms"]
+            kinds = f.read(num_terms)
+            value_offsets = read_array("q", num_terms + 1)
+            values = _unpack_strings(value_offsets, f.read(header["values_size"]))
+            extra_offsets = read_array("q", num_terms + 1)
+            extras = _unpack_strings(extra_offsets, f.read(header["extras_size"]))
+            triples = read_array("q", 3 * header["num_triples"])
+
+        terms = []
+        for kind, value, extra in zip(kinds, values, extras):
+            if kind == URI:
+                terms.append(URIRef(value))
+            elif kind == BLANK:
+                terms.append(BNode(value))
+            elif kind == PLAIN_LITERAL:
+                terms.append(Literal(value))
+            elif kind == LANG_LITERAL:
+                terms.append(Literal(value, lang=extra))
+            else:
+                terms.append(Literal(value, datatype=URIRef(extra)))
+
+        return cls(terms, triples)
+
+    def write(self, path: Path):
+        """Write the snapshot to a binary file: a JSON header followed by the term kinds, the
+        term values and extras (language or datatype) as offsets and UTF-8 blobs, and the
+        encoded triples
+
+        Args:
+            path (Path): Snapshot file location
+        """
+        kinds = bytearray()
+        values = []
+        extras = []
+
+        for term in self.terms:
+            extra = ""
+            if isinstance(term, URIRef):
+                kind = URI
+            elif isinstance(term, BNode):
+                kind = BLANK
+            elif term.language is not None:
+                kind, extra = LANG_LITERAL, term.language
+            elif term.datatype is not None:
+                kind, extra = TYPED_LITERAL, str(term.datatype)
+            else:
+                kind = PLAIN_LITERAL
+            kinds.append(kind)
+            values.append(str(term))
+            extras.append(extra)
+
+        value_offsets, value_blob = _pack_strings(values)
+        extra_offsets, extra_blob = _pack_strings(extras)
+
+        header = json.dumps(
+            {
+                "version": GRAPH_CACHE_VERSION,
+                "num_terms": len(self.terms),
+                "num_triples": len(self),
+                "values_size": len(value_blob),
+                "extras_size": len(extra_blob),
+            }
+        ).encode("utf-8")
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(struct.pack("<q", len(header)))
+            f.write(header)
+            f.write(kinds)
+            f.write(value_offsets.tobytes())
+            f.write(value_blob)
+            f.write(extra_offsets.tobytes())
+            f.write(extra_blob)
+            f.write(self.encoded.tobytes())
+        tmp_path.replace(path)
+
+    def to_graph(self) -> Graph:
+        """Rehydrate the snapshot into an rdflib graph
+
+        Returns:
+            Graph: Graph with the snapshot triples
+        """
+        graph = Graph()
+        graph.addN((s, p, o, graph) for s, p, o in self)
+        return graph
+
+    # Queries
+
+    def __len__(self) -> int:
+        return len(self.encoded) // 3
+
+    def __iter__(self) -> Iterator[Triple]:
+        terms, encoded = self.terms, self.encoded
+        for i in range(0, len(encoded), 3):
+            yield terms[encoded[i]], terms[encoded[i + 1]], terms[encoded[i + 2]]
+
+    def __contains__(self, triple: Triple) -> bool:
+        return next(self.triples(triple), None) is not None
+
+    def _id(self, term: Node) -> Optional[int]:
+        if self._ids is None:
+            self._ids = {term: id for id, term in enumerate(self.terms)}
+        return self._ids.get(term)
+
+    def _rows(self, position: int, id: int) -> List[int]:
+        """Triples having the given term ID at the given position, indexed on first use"""
+        if self._positions[position] is None:
+            index = {}
+            for row, term in enumerate(self.encoded[position::3]):
+                index.setdefault(term, []).append(row)
+            self._positions[position] = index
+        return self._positions[position].get(id, [])
+
+    def triples(self, pattern: Pattern) -> Iterator[Triple]:
+        """Triples matching a pattern, None matches any term
+
+        Args:
+            pattern (Pattern): Subject, predicate and object
+
+        Yields:
+            Iterator[Triple]: Matching triples
+        """
+        bound = {}
+        for position, term in enumerate(pattern):
+            if term is not None:
+                id = self._id(term)
+                if id is None:
+                    return
+                bound[position] = id
+
+        if not bound:
+            yield from self
+            return
+
+        # Scan the triples of the most selective bound term
+        candidates = min((self._rows(position, id) for position, id in bound.items()), key=len)
+        terms, encoded = self.terms, self.encoded
+        for row in candidates:
+            ids = encoded[3 * row : 3 * row + 3]
+            if all(ids[position] == id for position, id in bound.items()):
+                yield terms[ids[0]], terms[ids[1]], terms[ids[2]]
+
+    def subjects(
+        self, predicate: Optional[Node] = None, object: Optional[Node] = None
+    ) -> Iterator[Node]:
+        for s, _, _ in self.triples((None, predicate, object)):
+            yield s
+
+    def predicates(
+        self, subject: Optional[Node] = None, object: Optional[Node] = None
+    ) -> Iterator[Node]:
+        for _, p, _ in self.triples((subject, None, object)):
+            yield p
+
+    def objects(
+        self, subject: Optional[Node] = None, predicate: Optional[Node] = None
+    ) -> Iterator[Node]:
+        for _, _, o in self.triples((subject, predicate, None)):
+            yield o
+
+
+class GraphCache:
+    """On-disk cache of parsed RDF graphs. Each source file is stored as a `GraphSnapshot`
+    named after the hash of its content, so a modified file is parsed again while moved or
+    copied files still hit the cache. The hash of a source file is recorded in an index with
+    its size and mtime, and computed again only when one of them changes.
+    """
+
+    def __init__(self, cache_path: str):
+        """Initialize the cache
+
+        Args:
+            cache_path (str): Cache folder location
+        """
+        self.cache_path = Path(cache_path)
+        self.index_path = self.cache_path / GRAPH_CACHE_INDEX
+        self._index = None
+
+    # Source Fingerprinting
+
+    def _read_index(self) -> dict:
+        try:
+            with open(self.index_path, "r") as index_json:
+                index = json.load(index_json)
+        except (OSError, ValueError):
+            index = None
+        return index if isinstance(index, dict) else {}
+
+    def _record(self, key: str, fingerprint: dict):
+        """Add a fingerprint to the index, merged with the entries written meanwhile by other
+        processes"""
+        self._index[key] = fingerprint
+        index = self._read_index()
+        index[key] = fingerprint
+        try:
+            self.cache_path.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "w") as index_json:
+                json.dump(index, index_json, indent=4)
+            os.replace(tmp_path, self.index_path)
+        except OSError:
+            pass
+
+    def source_hash(self, source_path: Path) -> str:
+        """Content hash of a source file. Size and mtime are compared with the index first, the
+        file is hashed only if it is new or one of them changed
+
+        Args:
+            source_path (Path): RDF source file location
+
+        Returns:
+            str: Hexadecimal digest of the file content
+        """
+        if self._index is None:
+            self._index = self._read_index()
+
+        stat = source_path.stat()
+        key = str(source_path.absolute())
+        recorded = self._index.get(key)
+        if recorded is not None and recorded["size"] == stat.st_size and recorded["mtime_ns"] == stat.st_mtime_ns:
+            return recorded["hash"]
+
+        digest = file_hash(source_path)
+        self._record(key, {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hash": digest})
+        return digest
+
+    # Snapshots
+
+    def entry_path(self, source_path: Path) -> Path:
+        """Snapshot location of a source file
+
+        Args:
+            source_path (Path): RDF source file location
+
+        Returns:
+            Path: Snapshot file location
+        """
+        return self.cache_path / f"{self.source_hash(source_path)}.bin"
+
+    def snapshot(self, source_path: Path, format: Optional[str] = None) -> GraphSnapshot:
+        """Snapshot of a source file, parsed with rdflib and stored on a cache miss
+
+        Args:
+            source_path (Path): RDF source file location
+            format (Optional[str], optional): rdflib parser format, guessed if None. Defaults to None.
+
+        Returns:
+            GraphSnapshot: Snapshot of the file triples
+        """
+        path = self.entry_path(source_path)
+
+        try:
+            return GraphSnapshot.read(path)
+        except (OSError, ValueError, struct.error):
+            pass
+
+        snapshot = GraphSnapshot.from_graph(parse_graph(source_path, format))
+
+        try:
+            snapshot.write(path)
+        except OSError as e:
+            print(f"WARNING: unable to write graph cache at {self.cache_path} ({e}).")
+
+        return snapshot
+
+    def graph(self, source_path: Path, format: Optional[str] = None) -> Graph:
+        """Parsed rdflib graph of a source file, rehydrated from its snapshot on a cache hit
+
+        Args:
+            source_path (Path): RDF source file location
+            format (Optional[str], optional): rdflib parser format, guessed if None. Defaults to None.
+
+        Returns:
+            Graph: Graph of the file triples
+        """
+        return self.snapshot(source_path, format).to_graph()
+
+    def clear(self):
+        """Remove every cached snapshot and the index"""
+        for path in self.cache_path.glob("*.bin"):
+            path.unlink(missing_ok=True)
+        self.index_path.unlink(missing_ok=True)
+        self._index = None
+
+
+def load_graph(
+    source_path: Path, cache_path: Optional[Path] = None, format: Optional[str] = None
+) -> Graph:
+    """Parse an RDF file into an rdflib graph, through the graph cache if a cache path is given
+
+    Args:
+        source_path (Path): RDF source file location
+        cache_path (Optional[Path], optional): Graph cache folder, no caching if None. Defaults to None.
+        format (Optional[str], optional): rdflib parser format, guessed if None. Defaults to None.
+
+    Returns:
+        Graph: Graph of the file triples
+    """
+    if cache_path is None:
+        return parse_graph(source_path, format)
+    return GraphCache(cache_path).graph(source_path, format)
@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+
+import json
+import logging
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from kgsaf_jdex.utils.utility import current_memory, peak_memory, reset_peak_memory
+
+logger = logging.getLogger("kgsaf_jdex")
+
+
+class Phase:
+    """Measurements of a completed (or running) phase"""
+
+    def __init__(self, name: str, depth: int):
+        """Initialize the record of a phase
+
+        Args:
+            name (str): Full name of the phase, the names of its enclosing phases joined by "/"
+            depth (int): Number of enclosing phases
+        """
+        self.name = name
+        self.depth = depth
+        self.seconds: Optional[float] = None
+        self.rows: Optional[int] = None
+        self.rss_peak: Optional[int] = None
+        self.rss_delta: Optional[int] = None
+        self.traced_peak: Optional[int] = None
+        self.traced_delta: Optional[int] = None
+        self.attributes: Dict[str, object] = {}
+
+    def set(self, rows: Optional[int] = None, **attributes):
+        """Record the rows processed by the phase and other attributes, e.g. the source of the
+        data
+
+        Args:
+            rows (Optional[int], optional): Number of rows (triples, URIs, axioms) processed. Defaults to None.
+        """
+        if rows is not None:
+            self.rows = int(rows)
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "depth": self.depth,
+            "seconds": self.seconds,
+            "rows": self.rows,
+            "rss_peak": self.rss_peak,
+            "rss_delta": self.rss_delta,
+            "traced_peak": self.traced_peak,
+            "traced_delta": self.traced_delta,
+            **({"attributes": self.attributes} if self.attributes else {}),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Phase":
+        phase = cls(data["name"], data["depth"])
+        for field in ["seconds", "rows", "rss_peak", "rss_delta", "traced_peak", "traced_delta"]:
+            setattr(phase, field, data.get(field))
+        phase.attributes = dict(data.get("attributes", {}))
+        return phase
+
+    def __str__(self) -> str:
+        fields = [f"{self.seconds:.4f}s" if self.seconds is not None else "running"]
+        if self.rows is not None:
+            fields.append(f"{self.rows} rows")
+        if self.rss_peak is not None:
+            fields.append(f"peak RSS {self.rss_peak / 2**20:.1f} MiB")
+        if self.rss_delta is not None:
+            fields.append(f"RSS {self.rss_delta / 2**20:+.1f} MiB")
+        if self.traced_peak is not None:
+            fields.append(f"traced peak {self.traced_peak / 2**20:.1f} MiB")
+        fields.extend(f"{key} {value}" for key, value in self.attributes.items())
+        return f"{self.name}: {', '.join(fields)}"
+
+
+class _NullPhase:
+    """Phase of a disabled recorder, entering and updating it does nothing"""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullPhase":
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set(self, rows: Optional[int] = None, **attributes):
+        pass
+
+
+NULL_PHASE = _NullPhase()
+
+
+class _ActivePhase:
+    """Context manager measuring a phase of an enabled recorder"""
+
+    def __init__(self, recorder: "PhaseRecorder", name: str, parent: Optional[str]):
+        self.recorder = recorder
+        self.name = name
+        self.parent = parent
+
+    def __enter__(self) -> Phase:
+        recorder = self.recorder
+        stack = recorder._stack()
+        parent = self.parent if self.parent is not None else (stack[-1].phase.name if stack else None)
+
+        self.phase = Phase(f"{parent}/{self.name}" if parent else self.name, len(stack))
+        recorder._append(self.phase)
+
+        # Peaks are reset for the new phase, the peak reached so far by the enclosing one is
+        # kept so that it can be restored when this one ends
+        self.rss_peak = None
+        self.traced_peak = None
+        if stack:
+            enclosing = stack[-1]
+            enclosing.rss_peak = _max(enclosing.rss_peak, peak_memory())
+            if recorder.trace_memory:
+                enclosing.traced_peak = _max(enclosing.traced_peak, tracemalloc.get_traced_memory()[1])
+
+        reset_peak_memory()
+        self.rss_start = current_memory()
+        if recorder.trace_memory:
+            tracemalloc.reset_peak()
+            self.traced_start = tracemalloc.get_traced_memory()[0]
+
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self.phase
+
+    def __exit__(self, *exc_info):
+        phase = self.phase
+        phase.seconds = time.perf_counter() - self.start
+
+        phase.rss_peak = _max(self.rss_peak, peak_memory())
+        rss = current_memory()
+        if rss is not None and self.rss_start is not None:
+            phase.rss_delta = rss - self.rss_start
+
+        traced_peak = None
+        if self.recorder.trace_memory:
+            current, traced_peak = tracemalloc.get_traced_memory()
+            traced_peak = _max(self.traced_peak, traced_peak)
+            phase.traced_peak = traced_peak - self.traced_start
+            phase.traced_delta = current - self.traced_start
+
+        stack = self.recorder._stack()
+        stack.pop()
+        if stack:
+            stack[-1].rss_peak = _max(stack[-1].rss_peak, phase.rss_peak)
+            if self.recorder.trace_memory:
+                stack[-1].traced_peak = _max(stack[-1].traced_peak, traced_peak)
+
+        if exc_info[0] is not None:
+            phase.attributes["error"] = exc_info[0].__name__
+        if self.recorder.log:
+            logger.info(str(phase))
+        return False
+
+
+def _max(a: Optional[int], b: Optional[int]) -> Optional[int]:
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return max(a, b)
+
+
+class PhaseReport:
+    """Structured report of the phases recorded by a `PhaseRecorder`, in the order they
+    started"""
+
+    def __init__(self, phases: Iterable[Phase]):
+        self.phases = list(phases)
+
+    def __len__(self) -> int:
+        return len(self.phases)
+
+    def __iter__(self) -> Iterator[Phase]:
+        return iter(self.phases)
+
+    def find(self, name: str) -> List[Phase]:
+        """Phases with the given full name, or whose name ends with "/" followed by it
+
+        Args:
+            name (str): Phase name
+
+        Returns:
+            List[Phase]: Matching phases
+        """
+        return [p for p in self.phases if p.name == name or p.name.endswith(f"/{name}")]
+
+    def seconds(self, name: str) -> float:
+        """Total time of the phases with the given name, see `find`
+
+        Args:
+            name (str): Phase name
+
+        Returns:
+            float: Time in seconds
+        """
+        return sum(p.seconds or 0.0 for p in self.find(name))
+
+    def to_dict(self) -> List[dict]:
+        return [phase.to_dict() for phase in self.phases]
+
+    def write(self, path: str):
+        """Write the report as a JSON list of phases
+
+        Args:
+            path (str): JSON file location
+        """
+        with open(Path(path), "w") as f:
+            json.dump(self.to_dict(), f, indent=4)
+
+    @classmethod
+    def read(cls, path: str) -> "PhaseReport":
+        with open(Path(path), "r") as f:
+            return cls(Phase.from_dict(data) for data in json.load(f))
+
+    def __str__(self) -> str:
+        return "\n".join(f"{'    ' * phase.depth}{phase}" for phase in self.phases)
+
+
+class PhaseRecorder:
+    """Records wall time, processed rows and memory of the phases of loaders and converters.
+
+    Phases are opened with `with recorder.phase(name) as phase:` and can be nested, the full
+    name of a phase is made of the names of its enclosing ones. For every phase the recorder
+    measures the peak resident set size of the process and its change (Linux only), and with
+    `trace_memory` the peak and change of the memory allocated by Python, tracked by
+    `tracemalloc`. Tracing slows down allocations, so it is off by default.
+
+    The peak RSS is read from the kernel high water mark (VmHWM), which every phase resets, so
+    that nested phases get their own peak. While a recorder is enabled, peaks read by the
+    caller with `kgsaf_jdex.utils.utility.peak_memory` only cover the time since the last
+    phase started, `ru_maxrss` of `resource.getrusage` is not affected.
+
+    A disabled recorder returns the same no-op phase for every call and records nothing, so
+    the instrumentation can be left in place at no cost.
+    """
+
+    def __init__(self, enabled: bool = True, trace_memory: bool = False, log: bool = False):
+        """Initialize the recorder
+
+        Args:
+            enabled (bool, optional): Record phases. Defaults to True.
+            trace_memory (bool, optional): Measure Python allocations with tracemalloc, started if not already tracing. Defaults to False.
+            log (bool, optional): Log every completed phase at INFO level on the "kgsaf_jdex" logger. Defaults to False.
+        """
+        self.enabled = False
+        self.trace_memory = False
+        self.log = log
+        self._phases: List[Phase] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._started_tracing = False
+        if enabled:
+            self.enable(trace_memory, log)
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["_lock"], state["_local"]
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def enable(self, trace_memory: bool = False, log: Optional[bool] = None):
+        """Start recording phases
+
+        Args:
+            trace_memory (bool, optional): Measure Python allocations with tracemalloc. Defaults to False.
+            log (Optional[bool], optional): Log every completed phase, unchanged if None. Defaults to None.
+        """
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self.enabled = True
+        self.trace_memory = trace_memory
+        if log is not None:
+            self.log = log
+
+    def disable(self):
+        """Stop recording phases, the recorded ones are kept"""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        self.enabled = False
+        self.trace_memory = False
+
+    def _stack(self) -> list:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _append(self, phase: Phase):
+        with self._lock:
+            self._phases.append(phase)
+
+    def phase(self, name: str, parent: Optional[str] = None):
+        """Context manager measuring a phase, see `Phase.set` to record its rows
+
+        Args:
+            name (str): Phase name
+            parent (Optional[str], optional): Full name of the enclosing phase, for phases run on other threads. Defaults to the innermost running phase of the thread.
+
+        Returns:
+            Context manager returning the `Phase` record
+        """
+        if not self.enabled:
+            return NULL_PHASE
+        return _ActivePhase(self, name, parent)
+
+    def record(self, name: str, seconds: float, rows: Optional[int] = None, **attributes):
+        """Add a phase measured elsewhere, e.g. by a worker thread or process, as a child of the
+        innermost running phase
+
+        Args:
+            name (str): Phase name
+            seconds (float): Phase time
+            rows (Optional[int], optional): Number of rows processed. Defaults to None.
+        """
+        if not self.enabled:
+            return
+        stack = self._stack()
+        parent = stack[-1].phase.name if stack else None
+        phase = Phase(f"{parent}/{name}" if parent else name, len(stack))
+        phase.seconds = seconds
+        phase.set(rows, **attributes)
+        self._append(phase)
+        if self.log:
+            logger.info(str(phase))
+
+    def extend(self, phases: Iterable[Phase]):
+        """Add phases recorded by another recorder (e.g. in a worker process) as children of
+        the innermost running phase
+
+        Args:
+            phases (Iterable[Phase]): Recorded phases
+        """
+        if not self.enabled:
+            return
+        stack = self._stack()
+        parent = stack[-1].phase.name if stack else None
+        for phase in phases:
+            if stack and phase.depth == 0:
+                stack[-1].rss_peak = _max(stack[-1].rss_peak, phase.rss_peak)
+            if parent:
+                phase.name = f"{parent}/{phase.name}"
+                phase.depth += len(stack)
+            self._append(phase)
+
+    @property
+    def report(self) -> PhaseReport:
+        with self._lock:
+            return PhaseReport(list(self._phases))
+
+    def clear(self):
+        """Forget the recorded phases"""
+        with self._lock:
+            self._phases = []
+
+
+# Recorder used by loaders and converters when none is given, disabled until enabled
+
+_recorder = PhaseRecorder(enabled=False)
+
+
+def get_recorder() -> PhaseRecorder:
+    """Process wide recorder, used by the loaders and converters when they are not given one
+
+    Returns:
+        PhaseRecorder: Default recorder
+    """
+    return _recorder
+
+
+def enable_instrumentation(trace_memory: bool = False, log: bool = False) -> PhaseRecorder:
+    """Enable the process wide recorder
+
+    Args:
+        trace_memory (bool, optional): Measure Python allocations with tracemalloc. Defaults to False.
+        log (bool, optional): Log every completed phase at INFO level. Defaults to False.
+
+    Returns:
+        PhaseRecorder: Default recorder
+    """
+    _recorder.enable(trace_memory, log)
+    return _recorder
+
+
+def disable_instrumentation():
+    """Disable the process wide recorder"""
+    _recorder.disable()
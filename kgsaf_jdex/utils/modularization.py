@@ -2,79 +2,260 @@
 
 import sys
 from pathlib import Path
-from typing import Set, Tuple
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
 from rdflib import OWL, RDF, RDFS, BNode, Graph, URIRef
-from utils.conventions.builtins import BUILTIN_URIS
 
 import kgsaf_jdex.utils.conventions.paths as pc
+from kgsaf_jdex.utils.conventions.builtins import BUILTIN_URIS
+from kgsaf_jdex.utils.instrumentation import PhaseRecorder, get_recorder
 from kgsaf_jdex.utils.utility import verbose_print
 
 
 class SignatureModularizer:
-    """Exctract a Module from an OWL Ontology given a signature (Set of target URIs)"""
-
-    def __init__(self, schema: Graph, seed: Set[URIRef]):
+    """Exctract a Module from an OWL Ontology given a signature (Set of target URIs)
+
+    The module of a signature contains every triple whose subject is reachable from the
+    signature, following objects that are blank nodes or typed as classes, object properties or
+    datatype properties in the schema. The schema is indexed once on first use: nodes are mapped
+    to integer IDs with the list of their triples and of their expandable objects, and condensed
+    into strongly connected components, so that the module of a signature is a visit of the
+    component graph, with memory linear in the size of the schema.
+    """
+
+    def __init__(
+        self,
+        schema: Graph,
+        seed: Optional[Set[URIRef]] = None,
+        recorder: Optional[PhaseRecorder] = None,
+    ):
         """Initialize modularizer with graph to be modularized and signature
 
         Args:
             schema (Graph): Graph to be modularized
-            seed (Set[URIRef]): Set of URIs to use as signature
+            seed (Optional[Set[URIRef]], optional): Set of URIs to use as signature of `modularize`, required by it. Defaults to None.
+            recorder (Optional[PhaseRecorder], optional): Recorder of the indexing and extraction phases, the process wide one if None. Defaults to None.
         """
         self.schema = schema
         self.seed = seed
+        self.recorder = get_recorder() if recorder is None else recorder
+
+        self._ids = None
+        self._nodes = []
+        self._triples = []
+        self._successors = []
+        self._components = []
+        self._members = []
+        self._component_successors = []
+
+    # Schema Index
+
+    def _node_id(self, node: URIRef) -> int:
+        node_id = self._ids.get(node)
+        if node_id is None:
+            node_id = self._ids[node] = len(self._nodes)
+            self._nodes.append(node)
+            self._triples.append([])
+            self._successors.append([])
+        return node_id
+
+    def _build_index(self):
+        """Map schema nodes to integer IDs, with the triples of each subject and the objects
+        expanded by the modularization (not builtin, blank nodes or typed nodes), then condense
+        the nodes into their strongly connected components
+        """
+        self._ids = {}
 
-    def modularize(self, verbose: bool) -> Graph:
-        """Modularize the graph and output a new RDFLib graph
+        typed = set()
+        for node_type in (OWL.Class, OWL.ObjectProperty, OWL.DatatypeProperty):
+            typed.update(self.schema.subjects(RDF.type, node_type))
 
-        Args:
-            verbose (bool): Log printing.
+        for s, p, o in self.schema:
+            node_id = self._node_id(s)
+            self._triples[node_id].append((s, p, o))
+            if o not in BUILTIN_URIS and (isinstance(o, BNode) or o in typed):
+                self._successors[node_id].append(self._node_id(o))
 
-        Returns:
-            Graph: Modularized sub graph
+        self._condense()
+
+    def _condense(self):
+        """Strongly connected components of the node graph, with an iterative Tarjan visit.
+        Sets the component of every node, the members of every component and the distinct
+        components each one points to
         """
+        num_nodes = len(self._nodes)
+        self._components = [-1] * num_nodes
+        self._members = []
+        index = [-1] * num_nodes
+        lowlink = [0] * num_nodes
+        on_stack = [False] * num_nodes
+        component_stack = []
+        counter = 0
+
+        for root in range(num_nodes):
+            if index[root] >= 0:
+                continue
+
+            index[root] = lowlink[root] = counter
+            counter += 1
+            component_stack.append(root)
+            on_stack[root] = True
+            stack = [(root, iter(self._successors[root]))]
+
+            while stack:
+                node, successors = stack[-1]
+                advanced = False
+
+                for successor in successors:
+                    if index[successor] < 0:
+                        index[successor] = lowlink[successor] = counter
+                        counter += 1
+                        component_stack.append(successor)
+                        on_stack[successor] = True
+                        stack.append((successor, iter(self._successors[successor])))
+                        advanced = True
+                        break
+                    if on_stack[successor]:
+                        lowlink[node] = min(lowlink[node], index[successor])
+
+                if advanced:
+                    continue
+
+                stack.pop()
+                if stack:
+                    parent = stack[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+
+                if lowlink[node] == index[node]:
+                    component = len(self._members)
+                    members = []
+                    while True:
+                        member = component_stack.pop()
+                        on_stack[member] = False
+                        self._components[member] = component
+                        members.append(member)
+                        if member == node:
+                            break
+                    self._members.append(members)
+
+        self._component_successors = []
+        for component, members in enumerate(self._members):
+            successors = {
+                self._components[successor]
+                for member in members
+                for successor in self._successors[member]
+            }
+            successors.discard(component)
+            self._component_successors.append(list(successors))
+
+    def _module(self, seed: Iterable[URIRef], verbose: bool) -> Graph:
+        visited = set()
+        to_visit = []
+        for node in seed:
+            node_id = self._ids.get(node)
+            if node_id is None:
+                node_id = self._node_id(node)
+                self._components.append(len(self._members))
+                self._members.append([node_id])
+                self._component_successors.append([])
+            to_visit.append(self._components[node_id])
+
+        while to_visit:
+            component = to_visit.pop()
+            if component in visited:
+                continue
+            visited.add(component)
+            to_visit.extend(c for c in self._component_successors[component] if c not in visited)
+
+        node_ids = sorted(member for component in visited for member in self._members[component])
+
+        if verbose:
+            for node_id in node_ids:
+                print(f"Processing {self._nodes[node_id]}")
 
         extracted_graph = Graph()
-        elem_to_process = set(self.seed)
-        processed = set()
+        extracted_graph.addN(
+            (s, p, o, extracted_graph) for node_id in node_ids for s, p, o in self._triples[node_id]
+        )
+        return extracted_graph
 
-        while elem_to_process:
+    # Modularization
 
-            e = elem_to_process.pop()
-            processed.add(e)
+    def modularize(self, verbose: bool) -> Graph:
+        """Modularize the graph and output a new RDFLib graph
 
-            verbose_print(f"Processing {e}", verbose)
+        Args:
+            verbose (bool): Log printing.
 
-            for s, p, o in self.schema.triples((e, None, None)):
-                extracted_graph.add((s, p, o))
+        Raises:
+            ValueError: If the modularizer has no signature
 
-                if (o not in BUILTIN_URIS) and (o not in processed):
+        Returns:
+            Graph: Modularized sub graph
+        """
+        if self.seed is None:
+            raise ValueError("No signature to modularize, pass `seed` to the modularizer or use `modularize_many`")
+        return self.modularize_many([self.seed], verbose)[0]
 
-                    if isinstance(o, BNode):
-                        elem_to_process.add(o)
+    def modularize_many(self, signatures: List[Set[URIRef]], verbose: bool = False) -> List[Graph]:
+        """Modularize the graph for each signature, indexing the schema once for all of them
 
-                    if (o, RDF.type, OWL.Class) in self.schema:
-                        elem_to_process.add(o)
+        Args:
+            signatures (List[Set[URIRef]]): Signatures, one module is extracted for each
+            verbose (bool, optional): Log printing. Defaults to False.
 
-                    if (o, RDF.type, OWL.ObjectProperty) in self.schema:
-                        elem_to_process.add(o)
+        Returns:
+            List[Graph]: Modularized sub graph of each signature
+        """
+        with self.recorder.phase("signature_modularizer"):
+            if self._ids is None:
+                with self.recorder.phase("index") as phase:
+                    self._build_index()
+                    phase.set(len(self._nodes))
 
-                    if (o, RDF.type, OWL.DatatypeProperty) in self.schema:
-                        elem_to_process.add(o)
+            with self.recorder.phase("modules") as phase:
+                modules = [self._module(seed, verbose) for seed in signatures]
+                phase.set(len(modules))
 
-        return extracted_graph
+        return modules
 
 
 class SchemaDecomposer:
-    """Decompose a given Ontology into TBox and RBox components."""
+    """Decompose a given Ontology into TBox and RBox components.
 
-    def __init__(self, input_graph: Graph):
+    The ontology is scanned once to index the triples and the types of every subject, then the
+    triples are routed to the RBox, Taxonomy and Class definitions graphs. Descriptions of the
+    nodes of each graph are extracted with a single visit that shares its visited set between
+    all the starting nodes, so that blank nodes referenced by many axioms are expanded once.
+    """
+
+    DESCRIPTION_TYPES = (OWL.Class, OWL.ObjectProperty, OWL.DatatypeProperty)
+
+    def __init__(self, input_graph: Graph, recorder: Optional[PhaseRecorder] = None):
         """Initialize Decomposer with input Graph
 
         Args:
             input_graph (Graph): Graph to be decomposed.
+            recorder (Optional[PhaseRecorder], optional): Recorder of the decomposition steps, the process wide one if None. Defaults to None.
         """
         self.onto_graph = input_graph
+        self.recorder = get_recorder() if recorder is None else recorder
+
+        self._triples = None
+        self._types = None
+
+    def _build_index(self):
+        """Group the triples of the ontology by subject and collect the types of every node"""
+        self._triples = {}
+        self._types = {}
+
+        for s, p, o in self.onto_graph:
+            self._triples.setdefault(s, []).append((p, o))
+            if p == RDF.type:
+                self._types.setdefault(s, set()).add(o)
+
+    def _typed(self, node_type: URIRef) -> Set[URIRef]:
+        return {node for node, types in self._types.items() if node_type in types} - BUILTIN_URIS
 
     def decompose(self, verbose: bool) -> Tuple[Graph, Graph, Graph]:
         """Decompose a Graph into RBox, Taxonomy and Classes
@@ -85,11 +266,23 @@ class SchemaDecomposer:
         Returns:
             Tuple[Graph, Graph, Graph]: RBox graph, Taxonomy Graph and Class definitions Graph
         """
-        return (
-            self._rbox_decompose(verbose),
-            self._taxonomy_decompose(verbose),
-            self._schema_decompose(verbose),
-        )
+        with self.recorder.phase("schema_decomposer"):
+            if self._triples is None:
+                with self.recorder.phase("index") as phase:
+                    self._build_index()
+                    phase.set(len(self.onto_graph))
+
+            graphs = []
+            for step, decompose in [
+                ("rbox", self._rbox_decompose),
+                ("taxonomy", self._taxonomy_decompose),
+                ("schema", self._schema_decompose),
+            ]:
+                with self.recorder.phase(step) as phase:
+                    graphs.append(decompose(verbose))
+                    phase.set(len(graphs[-1]))
+
+        return tuple(graphs)
 
     def _rbox_decompose(self, verbose: bool) -> Graph:
         """Extract RBox information from target Graph
@@ -100,17 +293,11 @@ class SchemaDecomposer:
         Returns:
             Graph: RBox only graph.
         """
-        rbox_graph = Graph()
-        for prop in (
-            set(self.onto_graph.subjects(RDF.type, OWL.ObjectProperty)) - BUILTIN_URIS
-        ):
-            rbox_graph += self._extract_description(prop, verbose)
-
-        for prop in (
-            set(self.onto_graph.subjects(RDF.type, OWL.DatatypeProperty)) - BUILTIN_URIS
-        ):
-            rbox_graph += self._extract_description(prop, verbose)
-        return rbox_graph
+        props = self._typed(OWL.ObjectProperty) | self._typed(OWL.DatatypeProperty)
+
+        triples = set()
+        self._extract_description(props, triples, verbose)
+        return self._to_graph(triples)
 
     def _taxonomy_decompose(self, verbose: bool) -> Graph:
         """Extract Taxonomy (TBox) information from target Graph
@@ -121,16 +308,18 @@ class SchemaDecomposer:
         Returns:
             Graph: Taxonomy only graph.
         """
-        taxonomy_graph = Graph()
+        triples = set()
+        descriptions = []
 
-        for c in set(self.onto_graph.subjects(RDF.type, OWL.Class)) - BUILTIN_URIS:
-            for s, p, o in self.onto_graph.triples((c, None, None)):
+        for c in self._typed(OWL.Class):
+            for p, o in self._triples.get(c, ()):
                 if p == RDFS.subClassOf:
-                    taxonomy_graph.add((s, p, o))
+                    triples.add((c, p, o))
                     if isinstance(o, BNode):
-                        taxonomy_graph += self._extract_description(o, verbose)
+                        descriptions.append(o)
 
-        return taxonomy_graph
+        self._extract_description(descriptions, triples, verbose)
+        return self._to_graph(triples)
 
     def _schema_decompose(self, verbose: bool) -> Graph:
         """Extract Non Taxonomic Axioms (TBox) from target Graph
@@ -141,60 +330,63 @@ class SchemaDecomposer:
         Returns:
             Graph: Non Taxonomix Axioms only graph.
         """
-        schema_graph = Graph()
+        triples = set()
+        descriptions = []
 
-        for c in set(self.onto_graph.subjects(RDF.type, OWL.Class)) - BUILTIN_URIS:
+        for c in self._typed(OWL.Class):
             if not isinstance(c, BNode):
-                for s, p, o in self.onto_graph.triples((c, None, None)):
+                for p, o in self._triples.get(c, ()):
                     if p != RDFS.subClassOf:
 
-                        schema_graph.add((s, p, o))
+                        triples.add((c, p, o))
 
-                        for elem in self.onto_graph.objects(o, RDF.type):
-                            schema_graph.add((o, RDF.type, elem))
+                        for elem in self._types.get(o, ()):
+                            triples.add((o, RDF.type, elem))
 
                         if isinstance(o, BNode):
-                            print(f"Found BNODE in Triple {s, p, o}")
-                            schema_graph += self._extract_description(o, verbose)
+                            verbose_print(f"Found BNODE in Triple {c, p, o}", verbose)
+                            descriptions.append(o)
 
-        return schema_graph
+        self._extract_description(descriptions, triples, verbose)
+        return self._to_graph(triples)
 
-    def _extract_description(self, elem: URIRef, verbose: bool) -> Graph:
-        """Recursively extract closure information of a node from a Graph. If a element is found but should be inserted in another file, only its definition is added.
+    def _extract_description(self, elems: Iterable[URIRef], triples: Set, verbose: bool):
+        """Extract the closure information of a set of nodes, following blank node objects. If a
+        element is found but should be inserted in another file, only its definition is added.
+        The visited set is shared by all the nodes, each node is expanded once.
 
         Args:
-            elem (URIRef): Starting elem from which gather recursive description
+            elems (Iterable[URIRef]): Starting elems from which gather recursive description
+            triples (Set): Triples of the output graph, updated in place
             verbose (bool): Log pringing.
-
-        Returns:
-            Graph: Closure of Graph on input node
         """
-
-        extracted_graph = Graph()
-        elem_to_process = {elem}
+        elem_to_process = list(elems)
         processed = set()
 
         while elem_to_process:
 
             e = elem_to_process.pop()
+            if e in processed:
+                continue
             processed.add(e)
 
             verbose_print(f"Processing {e}", verbose)
 
-            for s, p, o in self.onto_graph.triples((e, None, None)):
-                extracted_graph.add((s, p, o))
-
-                if (o not in BUILTIN_URIS) and (o not in processed):
-                    if isinstance(o, BNode):
-                        elem_to_process.add(o)
+            for p, o in self._triples.get(e, ()):
+                triples.add((e, p, o))
 
-                    if (o, RDF.type, OWL.Class) in self.onto_graph:
-                        extracted_graph.add((o, RDF.type, OWL.Class))
+                if o not in BUILTIN_URIS:
+                    if isinstance(o, BNode) and o not in processed:
+                        elem_to_process.append(o)
 
-                    if (o, RDF.type, OWL.ObjectProperty) in self.onto_graph:
-                        extracted_graph.add((o, RDF.type, OWL.ObjectProperty))
+                    types = self._types.get(o)
+                    if types:
+                        for node_type in self.DESCRIPTION_TYPES:
+                            if node_type in types:
+                                triples.add((o, RDF.type, node_type))
 
-                    if (o, RDF.type, OWL.DatatypeProperty) in self.onto_graph:
-                        extracted_graph.add((o, RDF.type, OWL.DatatypeProperty))
-
-        return extracted_graph
+    @staticmethod
+    def _to_graph(triples: Set) -> Graph:
+        graph = Graph()
+        graph.addN((s, p, o, graph) for s, p, o in triples)
+        return graph
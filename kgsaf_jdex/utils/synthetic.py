@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+
+import json
+import random
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from xml.sax.saxutils import quoteattr
+
+import torch
+from rdflib import OWL
+
+import kgsaf_jdex.utils.conventions.paths as pc
+from kgsaf_jdex.loaders.pytorch.index import merge_sorted, sorted_isin
+from kgsaf_jdex.utils.utility import verbose_print
+
+# Namespace of the generated URIs
+
+SYNTHETIC_NAMESPACE = "http://kgsaf.org/synthetic/"
+
+# Generator configuration, written at the dataset root
+
+SYNTHETIC_CONFIG = "synthetic.json"
+
+# Number of triples generated and written at once
+
+CHUNK_SIZE = 1 << 20
+
+RDF_HEADER = """<?xml version="1.0"?>
+<rdf:RDF xmlns="http://www.w3.org/2002/07/owl#"
+     xml:base="http://www.w3.org/2002/07/owl"
+     xmlns:owl="http://www.w3.org/2002/07/owl#"
+     xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+     xmlns:xml="http://www.w3.org/XML/1998/namespace"
+     xmlns:xsd="http://www.w3.org/2001/XMLSchema#"
+     xmlns:rdfs="http://www.w3.org/2000/01/rdf-schema#">
+    <Ontology/>
+
+"""
+
+RDF_FOOTER = "</rdf:RDF>\n"
+
+
+class SyntheticDataset:
+    """Random dataset following the KG-SaF file structure (see `kgsaf_jdex.utils.conventions.paths`),
+    at a configurable scale, for benchmarks and tests.
+
+    Classes are arranged in a taxonomy of `taxonomy_depth` levels, every class below the first
+    level has a random superclass in the level above. Individuals are assigned one class each,
+    in blocks following a depth-first visit of the taxonomy, so that the instances of every
+    class and of its subclasses are a contiguous range of individual IDs. Each object property
+    has a domain and a range class (or `owl:Thing`), and triples are drawn with the head and the
+    tail among the instances of the domain and range of their relation, so the ABox is
+    consistent with the RBox. With `skew` greater than zero, lower IDs of each range are drawn
+    more often, giving a long tailed degree distribution.
+    """
+
+    def __init__(
+        self,
+        num_triples: int,
+        num_individuals: Optional[int] = None,
+        num_classes: int = 100,
+        num_obj_props: int = 50,
+        taxonomy_depth: int = 4,
+        sub_obj_prop_ratio: float = 0.2,
+        thing_ratio: float = 0.2,
+        valid_ratio: float = 0.1,
+        test_ratio: float = 0.1,
+        skew: float = 0.0,
+        seed: int = 0,
+        namespace: str = SYNTHETIC_NAMESPACE,
+    ):
+        """Initialize the generator and draw the schema
+
+        Args:
+            num_triples (int): Number of ABox triples, over all the splits
+            num_individuals (Optional[int], optional): Number of individuals, a tenth of the triples (at least one per class) if None. Defaults to None.
+            num_classes (int, optional): Number of classes. Defaults to 100.
+            num_obj_props (int, optional): Number of object properties. Defaults to 50.
+            taxonomy_depth (int, optional): Number of levels of the taxonomy. Defaults to 4.
+            sub_obj_prop_ratio (float, optional): Fraction of object properties with a super property. Defaults to 0.2.
+            thing_ratio (float, optional): Fraction of domains and ranges that are `owl:Thing`. Defaults to 0.2.
+            valid_ratio (float, optional): Fraction of triples in the validation split. Defaults to 0.1.
+            test_ratio (float, optional): Fraction of triples in the test split. Defaults to 0.1.
+            skew (float, optional): Skew of the entity degrees, uniform if 0. Defaults to 0.0.
+            seed (int, optional): Random seed, the same configuration always generates the same files. Defaults to 0.
+            namespace (str, optional): Namespace of the generated URIs. Defaults to SYNTHETIC_NAMESPACE.
+
+        Raises:
+            ValueError: If the counts or ratios are not valid
+        """
+        if num_individuals is None:
+            num_individuals = max(num_classes, num_triples // 10)
+
+        if min(num_triples, num_classes, num_obj_props, taxonomy_depth) < 1:
+            raise ValueError("Counts of triples, classes, object properties and taxonomy levels must be positive")
+        if num_individuals < num_classes:
+            raise ValueError(f"At least one individual per class is needed, got {num_individuals} for {num_classes} classes")
+        if valid_ratio < 0 or test_ratio < 0 or valid_ratio + test_ratio >= 1:
+            raise ValueError(f"Invalid split ratios, valid {valid_ratio} and test {test_ratio}")
+
+        self.num_triples = num_triples
+        self.num_individuals = num_individuals
+        self.num_classes = num_classes
+        self.num_obj_props = num_obj_props
+        self.taxonomy_depth = min(taxonomy_depth, num_classes)
+        self.sub_obj_prop_ratio = sub_obj_prop_ratio
+        self.thing_ratio = thing_ratio
+        self.valid_ratio = valid_ratio
+        self.test_ratio = test_ratio
+        self.skew = skew
+        self.seed = seed
+        self.namespace = namespace
+
+        self._build_schema()
+
+    @property
+    def config(self) -> dict:
+        """Generator configuration, the files of two datasets with the same one are identical"""
+        return {
+            "num_triples": self.num_triples,
+            "num_individuals": self.num_individuals,
+            "num_classes": self.num_classes,
+            "num_obj_props": self.num_obj_props,
+            "taxonomy_depth": self.taxonomy_depth,
+            "sub_obj_prop_ratio": self.sub_obj_prop_ratio,
+            "thing_ratio": self.thing_ratio,
+            "valid_ratio": self.valid_ratio,
+            "test_ratio": self.test_ratio,
+            "skew": self.skew,
+            "seed": self.seed,
+            "namespace": self.namespace,
+        }
+
+    # URIs
+
+    def individual_uri(self, individual_id: int) -> str:
+        return f"{self.namespace}individual/{individual_id}"
+
+    def class_uri(self, class_id: int) -> str:
+        return str(OWL.Thing) if class_id is None else f"{self.namespace}class/C{class_id}"
+
+    def obj_prop_uri(self, obj_prop_id: int) -> str:
+        return f"{self.namespace}property/p{obj_prop_id}"
+
+    # Schema
+
+    def _build_schema(self):
+        """Draw the taxonomy, the individual types and the RBox"""
+        rng = random.Random(self.seed)
+        num_classes, depth = self.num_classes, self.taxonomy_depth
+
+        # Classes of each level are contiguous, roots have no superclass
+        levels = [class_id * depth // num_classes for class_id in range(num_classes)]
+        starts = [levels.index(level) for level in range(depth)] + [num_classes]
+
+        self.sup_class: List[Optional[int]] = [
+            None if level == 0 else rng.randrange(starts[level - 1], starts[level])
+            for level in levels
+        ]
+
+        children = [[] for _ in range(num_classes)]
+        for class_id, parent in enumerate(self.sup_class):
+            if parent is not None:
+                children[parent].append(class_id)
+
+        # Depth-first order of the classes, with the number of classes of each subtree
+        self.class_order = []
+        subtree = [1] * num_classes
+        stack = [(class_id, False) for class_id in reversed(range(starts[1]))]
+        while stack:
+            class_id, visited = stack.pop()
+            if visited:
+                subtree[class_id] += sum(subtree[child] for child in children[class_id])
+                continue
+            self.class_order.append(class_id)
+            stack.append((class_id, True))
+            stack.extend((child, False) for child in reversed(children[class_id]))
+
+        # Individuals of the k-th class of the order are the k-th block of IDs
+        block_starts = [k * self.num_individuals // num_classes for k in range(num_classes + 1)]
+        self.class_blocks = {
+            class_id: (block_starts[k], block_starts[k + 1])
+            for k, class_id in enumerate(self.class_order)
+        }
+        position = {class_id: k for k, class_id in enumerate(self.class_order)}
+        self.class_instances = {
+            class_id: (
+                block_starts[position[class_id]],
+                block_starts[position[class_id] + subtree[class_id]],
+            )
+            for class_id in range(num_classes)
+        }
+
+        # RBox, a super property always has a lower ID
+        def draw_class() -> Optional[int]:
+            return None if rng.random() < self.thing_ratio else rng.randrange(num_classes)
+
+        self.obj_prop_domain = [draw_class() for _ in range(self.num_obj_props)]
+        self.obj_prop_range = [draw_class() for _ in range(self.num_obj_props)]
+        self.sup_obj_prop: List[Optional[int]] = [
+            rng.randrange(prop) if prop > 0 and rng.random() < self.sub_obj_prop_ratio else None
+            for prop in range(self.num_obj_props)
+        ]
+
+    def _bounds(self, classes: List[Optional[int]]) -> torch.Tensor:
+        return torch.tensor(
+            [
+                (0, self.num_individuals) if c is None else self.class_instances[c]
+                for c in classes
+            ],
+            dtype=torch.int64,
+        )
+
+    # ABox
+
+    def triples(self, chunk_size: int = CHUNK_SIZE) -> Iterable[Tuple[torch.Tensor, torch.Tensor]]:
+        """Generate the ABox triples in chunks. Triples are distinct: draws repeating a triple
+        of the same or of an earlier chunk are discarded and drawn again, so a triple is in one
+        split only
+
+        Args:
+            chunk_size (int, optional): Number of triples of each chunk. Defaults to CHUNK_SIZE.
+
+        Raises:
+            ValueError: If the domains and ranges allow less distinct triples than requested
+
+        Yields:
+            Iterable[Tuple[torch.Tensor, torch.Tensor]]: Triples (N, 3) and their split, 0 for train, 1 for valid and 2 for test (N,)
+        """
+        generator = torch.Generator().manual_seed(self.seed)
+        heads, tails = self._bounds(self.obj_prop_domain), self._bounds(self.obj_prop_range)
+
+        capacity = int(((heads[:, 1] - heads[:, 0]) * (tails[:, 1] - tails[:, 0])).sum())
+        if capacity < self.num_triples:
+            raise ValueError(f"Only {capacity} distinct triples fit the RBox, {self.num_triples} requested")
+
+        seen = torch.empty(0, dtype=torch.int64)
+        generated = 0
+        while generated < self.num_triples:
+            size = min(chunk_size, self.num_triples - generated)
+            relations = torch.randint(self.num_obj_props, (size,), generator=generator)
+
+            entities = []
+            for bounds in (heads[relations], tails[relations]):
+                noise = torch.rand(size, generator=generator, dtype=torch.float64) ** (1 + self.skew)
+                offsets = (noise * (bounds[:, 1] - bounds[:, 0])).to(torch.int64)
+                entities.append(bounds[:, 0] + offsets)
+
+            noise = torch.rand(size, generator=generator, dtype=torch.float64)
+            splits = (noise >= 1 - self.valid_ratio - self.test_ratio).to(torch.int64)
+            splits += noise >= 1 - self.test_ratio
+
+            # Keep the first draw of every triple not generated before
+            keys = (entities[0] * self.num_obj_props + relations) * self.num_individuals + entities[1]
+            unique_keys, inverse = torch.unique(keys, return_inverse=True)
+            first = torch.full((len(unique_keys),), size, dtype=torch.int64)
+            first.scatter_reduce_(0, inverse, torch.arange(size), reduce="amin")
+            new = torch.zeros(size, dtype=torch.bool)
+            new[first[~sorted_isin(unique_keys, seen)]] = True
+
+            seen = merge_sorted(seen, keys[new])
+            generated += int(new.sum())
+            yield torch.stack([entities[0], relations, entities[1]], dim=1)[new], splits[new]
+
+    # Writers
+
+    def generate(self, path: str, owl: bool = True, verbose: bool = False) -> Path:
+        """Write the dataset files: mappings, TSV splits, JSON taxonomy, RBox and class
+        assertions, and optionally the OWL files they are converted from
+
+        Args:
+            path (str): Dataset folder, created if missing
+            owl (bool, optional): Also write taxonomy, roles, class assertions and ontology OWL files. Defaults to True.
+            verbose (bool, optional): Log printing. Defaults to False.
+
+        Returns:
+            Path: Dataset folder
+        """
+        path = Path(path)
+        for folder in ["abox/splits", "tbox", "rbox", pc.MAPPINGS]:
+            (path / folder).mkdir(parents=True, exist_ok=True)
+
+        verbose_print("Writing mappings", verbose)
+        for file_location, uri, count in [
+            (pc.INDIVIDUAL_MAPPINGS, self.individual_uri, self.num_individuals),
+            (pc.CLASS_MAPPINGS, self.class_uri, self.num_classes),
+            (pc.OBJ_PROP_MAPPINGS, self.obj_prop_uri, self.num_obj_props),
+        ]:
+            self._write_entries(
+                path / file_location, (f"{json.dumps(uri(id))}: {id}" for id in range(count))
+            )
+
+        verbose_print("Writing ABox splits", verbose)
+        self._write_splits(path)
+
+        verbose_print("Writing schema and class assertions", verbose)
+        self._write_json(path / pc.TAXONOMY, self._taxonomy_json())
+        self._write_json(path / pc.OBJ_PROP_DOMAIN_RANGE, self._domain_range_json())
+        self._write_json(path / pc.OBJ_PROP_HIERARCHY, self._hierarchy_json())
+        self._write_entries(
+            path / pc.CLASS_ASSERTIONS,
+            (
+                f"{json.dumps(individual)}: [\n        {json.dumps(class_uri)}\n    ]"
+                for individual, class_uri in self._class_assertions()
+            ),
+        )
+
+        if owl:
+            verbose_print("Writing OWL files", verbose)
+            self._write_owl(path / pc.RDF_TAXONOMY, self._taxonomy_owl())
+            self._write_owl(path / pc.RDF_OBJ_PROP, self._roles_owl())
+            self._write_owl(path / pc.ONTOLOGY, self._taxonomy_owl(), self._roles_owl())
+            self._write_owl(path / pc.RDF_CLASS_ASSERTIONS, self._class_assertions_owl())
+
+        self._write_json(path / SYNTHETIC_CONFIG, self.config)
+        return path
+
+    @staticmethod
+    def _write_json(path: Path, data: dict):
+        with open(path, "w") as f:
+            json.dump(data, f, indent=4)
+
+    @staticmethod
+    def _write_entries(path: Path, entries: Iterable[str]):
+        """Write a JSON object one entry at a time, in the layout of `json.dump` with indent 4"""
+        with open(path, "w") as f:
+            f.write("{")
+            separator = "\n    "
+            for entry in entries:
+                f.write(separator)
+                f.write(entry)
+                separator = ",\n    "
+            f.write("\n}")
+
+    def _write_splits(self, path: Path):
+        individual = f"{self.namespace}individual/"
+        obj_props = [self.obj_prop_uri(prop) for prop in range(self.num_obj_props)]
+
+        files = [open(path / split, "w") for split in (pc.TRAIN, pc.VALID, pc.TEST)]
+        try:
+            for triples, splits in self.triples():
+                lines = [[], [], []]
+                for (h, r, t), split in zip(triples.tolist(), splits.tolist()):
+                    lines[split].append(f"{individual}{h}\t{obj_props[r]}\t{individual}{t}\n")
+                for f, split_lines in zip(files, lines):
+                    f.writelines(split_lines)
+        finally:
+            for f in files:
+                f.close()
+
+    def _class_assertions(self) -> Iterable[Tuple[str, str]]:
+        for class_id in self.class_order:
+            class_uri = self.class_uri(class_id)
+            start, end = self.class_blocks[class_id]
+            for individual_id in range(start, end):
+                yield self.individual_uri(individual_id), class_uri
+
+    def _taxonomy_json(self) -> Dict[str, List[str]]:
+        return {
+            self.class_uri(class_id): [self.class_uri(parent)]
+            for class_id, parent in enumerate(self.sup_class)
+            if parent is not None
+        }
+
+    def _domain_range_json(self) -> Dict[str, dict]:
+        return {
+            self.obj_prop_uri(prop): {
+                "domain": [self.class_uri(self.obj_prop_domain[prop])],
+                "range": [self.class_uri(self.obj_prop_range[prop])],
+            }
+            for prop in range(self.num_obj_props)
+        }
+
+    def _hierarchy_json(self) -> Dict[str, List[str]]:
+        return {
+            self.obj_prop_uri(prop): [self.obj_prop_uri(parent)]
+            for prop, parent in enumerate(self.sup_obj_prop)
+            if parent is not None
+        }
+
+    @staticmethod
+    def _write_owl(path: Path, *sections: Iterable[str]):
+        """Write an RDF/XML file with the OWL default namespace, streaming its elements"""
+        with open(path, "w") as f:
+            f.write(RDF_HEADER)
+            for section in sections:
+                f.writelines(section)
+            f.write(RDF_FOOTER)
+
+    def _taxonomy_owl(self) -> Iterable[str]:
+        for class_id, parent in enumerate(self.sup_class):
+            yield (
+                f"    <Class rdf:about={quoteattr(self.class_uri(class_id))}>\n"
+                f"        <rdfs:subClassOf rdf:resource={quoteattr(self.class_uri(parent))}/>\n"
+                f"    </Class>\n"
+            )
+
+    def _roles_owl(self) -> Iterable[str]:
+        for prop in range(self.num_obj_props):
+            axioms = [
+                ("rdfs:subPropertyOf", self.sup_obj_prop[prop], self.obj_prop_uri),
+                ("rdfs:domain", self.obj_prop_domain[prop], self.class_uri),
+                ("rdfs:range", self.obj_prop_range[prop], self.class_uri),
+            ]
+            yield f"    <ObjectProperty rdf:about={quoteattr(self.obj_prop_uri(prop))}>\n"
+            for tag, target, uri in axioms:
+                if target is not None:
+                    yield f"        <{tag} rdf:resource={quoteattr(uri(target))}/>\n"
+            yield "    </ObjectProperty>\n"
+
+    def _class_assertions_owl(self) -> Iterable[str]:
+        for class_id in range(self.num_classes):
+            yield f"    <Class rdf:about={quoteattr(self.class_uri(class_id))}/>\n"
+        for individual, class_uri in self._class_assertions():
+            yield (
+                f"    <NamedIndividual rdf:about={quoteattr(individual)}>\n"
+                f"        <rdf:type rdf:resource={quoteattr(class_uri)}/>\n"
+                f"    </NamedIndividual>\n"
+            )
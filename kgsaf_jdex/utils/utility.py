@@ -1,5 +1,18 @@
 #!/usr/bin/env python3
 
+import hashlib
+import sys
+from pathlib import Path
+from typing import Optional
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from kgsaf_jdex.utils.archive import open_file
+
+
 def verbose_print(msg: str, verbose: bool):
     """Primg msg if verbose is true
 
@@ -8,4 +21,60 @@ def verbose_print(msg: str, verbose: bool):
         verbose (bool): Verbose toggle
     """
     if verbose:
-        print(msg)
\ No newline at end of file
+        print(msg)
+
+
+def file_hash(path: Path, chunk_size: int = 1 << 20) -> str:
+    """Compute the BLAKE2b content hash of a file, reading it in chunks
+
+    Args:
+        path (Path): File to be hashed, possibly an archive member
+        chunk_size (int, optional): Read buffer size in bytes. Defaults to 1 MiB.
+
+    Returns:
+        str: Hexadecimal digest of the file content
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open_file(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def reset_peak_memory():
+    """Reset the peak resident set size of the current process, where supported (Linux)"""
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+    except OSError:
+        pass
+
+
+def peak_memory() -> Optional[int]:
+    """Peak resident set size of the current process in bytes, since the last reset where
+    supported, otherwise since the process start. None if unavailable.
+    """
+    try:
+        with open("/proc/self/status", "r") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    if resource is None:
+        return None
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def current_memory() -> Optional[int]:
+    """Resident set size of the current process in bytes, None if unavailable (Linux only)"""
+    try:
+        with open("/proc/self/status", "r") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
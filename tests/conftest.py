@@ -0,0 +1,11 @@
+#!/usr/bin/env python3
+
+import pytest
+
+from kgsaf_jdex.utils.synthetic import SyntheticDataset
+
+
+@pytest.fixture
+def synthetic_path(tmp_path):
+    """Folder of a small synthetic dataset, written without the OWL files"""
+    return SyntheticDataset(2000, num_classes=20, num_obj_props=10, seed=0).generate(tmp_path / "synthetic", owl=False)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+import os
+
+import torch
+
+import kgsaf_jdex.loaders.pytorch.cache as cache_module
+import kgsaf_jdex.utils.conventions.paths as pc
+from kgsaf_jdex.loaders.pytorch.cache import KnowledgeGraphCache
+from kgsaf_jdex.loaders.pytorch.dataset import KnowledgeGraph
+
+
+def make_cache(tmp_path):
+    source_path = tmp_path / "source"
+    source_path.mkdir()
+    (source_path / "data.tsv").write_text("a\tb\tc\n")
+    cache = KnowledgeGraphCache(tmp_path / "cache", source_path)
+    cache.put("tensor", torch.arange(6).view(2, 3), ["data.tsv"])
+    return cache, source_path / "data.tsv"
+
+
+def bump_mtime(path):
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_cached_tensor_round_trip(tmp_path):
+    cache, _ = make_cache(tmp_path)
+    assert torch.equal(cache.get("tensor"), torch.arange(6).view(2, 3))
+
+    reopened = KnowledgeGraphCache(tmp_path / "cache", tmp_path / "source")
+    assert torch.equal(reopened.get("tensor"), torch.arange(6).view(2, 3))
+    assert reopened.get("missing") is None
+
+
+def test_touched_source_is_hashed_once(tmp_path, monkeypatch):
+    cache, source = make_cache(tmp_path)
+    bump_mtime(source)
+
+    hashes = []
+    file_hash = cache_module.file_hash
+    monkeypatch.setattr(cache_module, "file_hash", lambda path: hashes.append(path) or file_hash(path))
+
+    reopened = KnowledgeGraphCache(tmp_path / "cache", tmp_path / "source")
+    assert reopened.get("tensor") is not None
+    assert len(hashes) == 1
+
+    # The new mtime is written to the manifest, so a later lookup does not hash again
+    reopened = KnowledgeGraphCache(tmp_path / "cache", tmp_path / "source")
+    assert reopened.get("tensor") is not None
+    assert len(hashes) == 1
+
+
+def test_edited_source_invalidates(tmp_path):
+    cache, source = make_cache(tmp_path)
+
+    # Same size, different content
+    source.write_text("a\tb\td\n")
+    bump_mtime(source)
+    assert cache.get("tensor") is None
+
+    cache.put("tensor", torch.arange(6).view(2, 3), ["data.tsv"])
+    source.write_text("a\tb\tc\td\n")
+    assert cache.get("tensor") is None
+
+    cache.put("tensor", torch.arange(6).view(2, 3), ["data.tsv"])
+    source.unlink()
+    assert cache.get("tensor") is None
+
+
+def test_deltas_must_match(tmp_path):
+    cache, _ = make_cache(tmp_path)
+    assert cache.get("tensor", ["delta-1"]) is None
+
+    assert cache.append("tensor", torch.arange(3).view(1, 3), [], ["delta-1"])
+    assert cache.get("tensor") is None
+    assert torch.equal(cache.get("tensor", ["delta-1"])[-1], torch.arange(3))
+
+
+def test_knowledge_graph_reloads_edited_split(synthetic_path):
+    kg = KnowledgeGraph(synthetic_path)
+    num_triples = len(kg.train)
+    assert (synthetic_path / pc.KG_CACHE_MANIFEST).exists()
+
+    with open(synthetic_path / pc.TRAIN, "r") as f:
+        lines = f.readlines()
+    with open(synthetic_path / pc.TRAIN, "w") as f:
+        f.writelines(lines[:-1])
+
+    assert len(KnowledgeGraph(synthetic_path).train) == num_triples - 1
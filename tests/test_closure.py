@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+import random
+from collections import deque
+
+import pytest
+import torch
+
+import kgsaf_jdex.utils.conventions.ids as idc
+from kgsaf_jdex.loaders.pytorch.closure import HierarchyClosure
+
+
+def random_hierarchy(seed: int, num_nodes: int = 40, cycle: bool = False):
+    """Random (child, parent) edges with multiple inheritance, parents have lower IDs"""
+    rng = random.Random(seed)
+    edges = set()
+    for child in range(1, num_nodes):
+        for _ in range(rng.randint(0, 2)):
+            edges.add((child, rng.randrange(child)))
+    if cycle:
+        edges.add((5, 30))
+    return sorted(edges)
+
+
+def reference(edges, num_nodes, root):
+    parents = {node: set() for node in range(num_nodes)}
+    for child, parent in edges:
+        parents[child].add(parent)
+    for node in range(num_nodes):
+        if not parents[node]:
+            parents[node].add(root)
+    parents[root] = set()
+
+    ancestors = {}
+    for node in parents:
+        seen, queue = set(), deque(parents[node])
+        while queue:
+            parent = queue.popleft()
+            if parent not in seen:
+                seen.add(parent)
+                queue.extend(parents[parent])
+        ancestors[node] = seen
+
+    depth = {root: 0}
+    children = {node: [c for c in parents if node in parents[c]] for node in parents}
+    queue = deque([root])
+    while queue:
+        node = queue.popleft()
+        for child in children[node]:
+            if child not in depth:
+                depth[child] = depth[node] + 1
+                queue.append(child)
+    return ancestors, depth
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("cycle", [False, True])
+def test_closure_matches_bfs(seed, cycle):
+    num_nodes = 40
+    edges = random_hierarchy(seed, num_nodes, cycle)
+    closure = HierarchyClosure(torch.tensor(edges), num_nodes, root=idc.THING)
+    ancestors, depth = reference(edges, num_nodes, idc.THING)
+
+    assert set(map(tuple, closure.pairs.tolist())) == {
+        (node, ancestor) for node, node_ancestors in ancestors.items() for ancestor in node_ancestors
+    }
+
+    nodes = list(ancestors)
+    values, offsets = closure.descendants(torch.tensor(nodes))
+    for i, node in enumerate(nodes):
+        descendants = values[offsets[i] : offsets[i + 1]].tolist()
+        assert sorted(descendants) == sorted(d for d in nodes if node in ancestors[d])
+
+    a_ids = torch.tensor([a for a in nodes for _ in nodes])
+    b_ids = torch.tensor([b for _ in nodes for b in nodes])
+    expected = [a == b or b in ancestors[a] for a, b in zip(a_ids.tolist(), b_ids.tolist())]
+    assert closure.is_subclass(a_ids, b_ids).tolist() == expected
+
+    if not cycle:
+        assert closure.depth(torch.tensor(nodes)).tolist() == [depth[node] for node in nodes]
+
+        expected = []
+        for a, b in zip(a_ids.tolist(), b_ids.tolist()):
+            common = (ancestors[a] | {a}) & (ancestors[b] | {b})
+            expected.append(min(common, key=lambda node: (-depth[node], node)))
+        assert closure.lca(a_ids, b_ids).tolist() == expected
+
+
+def test_precomputed_closure_is_reused():
+    edges = torch.tensor(random_hierarchy(0))
+    closure = HierarchyClosure(edges, 40, root=idc.THING)
+    restored = HierarchyClosure(edges, 40, root=idc.THING, closure=closure.pairs)
+    assert torch.equal(restored.keys, closure.keys)
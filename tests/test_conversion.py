@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+
+import logging
+from pathlib import Path
+
+import pytest
+from rdflib import OWL, RDF, BNode, Graph, Namespace
+from rdflib.collection import Collection
+
+from kgsaf_jdex.utils.conversion import (
+    COLLECTION_PREDICATES,
+    OWLConverter,
+    bnode_to_dict,
+    ntriples_to_tsv,
+)
+from kgsaf_jdex.utils.synthetic import SyntheticDataset
+from kgsaf_jdex.utils.utility import peak_memory
+
+
+EX = Namespace("http://kgsaf.org/test/")
+
+
+def reference_bnode_to_dict(graph: Graph, node, depth: int = 1) -> dict:
+    """Recursive conversion of the original implementation, printing every step"""
+    if not isinstance(node, BNode):
+        return str(node)
+    indent = "\t" * depth
+    print(f"{indent}Found BNode {node} Starting Recursive Evaluation")
+    node_dict = {}
+    for _, p, o in graph.triples((node, None, None)):
+        print(f"{indent}Evaluating  - {p} {o}")
+        if str(p) in COLLECTION_PREDICATES:
+            print(f"{indent}\tFound Collection {p} Starting Recursive Evaluation")
+            items = []
+            head = o
+            while head and head != RDF.nil:
+                first = next(graph.objects(head, RDF.first), None)
+                print(f"{indent}\tList Element {first}")
+                if first is not None:
+                    items.append(reference_bnode_to_dict(graph, first, depth + 2))
+                head = next(graph.objects(head, RDF.rest), None)
+            node_dict[str(p)] = items
+        else:
+            node_dict.setdefault(str(p), []).append(reference_bnode_to_dict(graph, o, depth + 1))
+    return node_dict
+
+
+def test_bnode_to_dict_matches_recursive_conversion(capsys):
+    graph = Graph()
+    restriction, union, nested = BNode(), BNode(), BNode()
+    graph.add((restriction, RDF.type, OWL.Restriction))
+    graph.add((restriction, OWL.onProperty, EX.p))
+    graph.add((restriction, OWL.someValuesFrom, union))
+    members = BNode()
+    Collection(graph, members, [EX.A, nested, EX.B])
+    graph.add((union, OWL.unionOf, members))
+    graph.add((nested, OWL.complementOf, EX.C))
+
+    expected = reference_bnode_to_dict(graph, restriction)
+    expected_log = capsys.readouterr().out
+
+    assert bnode_to_dict(graph, restriction, verbose=False) == expected
+    assert capsys.readouterr().out == ""
+    assert bnode_to_dict(graph, restriction, verbose=True) == expected
+    assert capsys.readouterr().out == expected_log
+
+
+def test_preprocess_is_silent_unless_verbose(tmp_path, capsys, caplog):
+    path = SyntheticDataset(1000, num_classes=10, num_obj_props=5).generate(tmp_path / "synthetic")
+
+    with caplog.at_level(logging.INFO, logger="kgsaf_jdex"):
+        converter = OWLConverter(path, cache=False)
+        converter.preprocess(verbose=False)
+
+    assert capsys.readouterr().out == ""
+    assert sorted(converter.report) == sorted(record.getMessage().split(":")[0] for record in caplog.records)
+
+
+def test_preprocess_keeps_peak_memory_when_disabled(tmp_path):
+    if not Path("/proc/self/clear_refs").exists() or peak_memory() is None:
+        pytest.skip("peak memory reset not supported")
+    path = SyntheticDataset(1000, num_classes=10, num_obj_props=5).generate(tmp_path / "synthetic")
+
+    block = b"x" * (256 << 20)
+    del block
+    before = peak_memory()
+
+    converter = OWLConverter(path, cache=False)
+    converter.preprocess(verbose=False)
+
+    assert peak_memory() >= before
+    assert all(entry["peak_memory"] is None for entry in converter.report.values())
+    assert all("parse" in entry["timings"] for entry in converter.report.values())
+
+
+NTRIPLES = r"""# Comment line
+<http://kgsaf.org/test/a> <http://kgsaf.org/test/p> <http://kgsaf.org/test/b> .
+<http://kgsaf.org/test/caff\u00E8> <http://kgsaf.org/test/p> <http://kgsaf.org/test/\U0001F600> .
+
+<http://kgsaf.org/test/a> <http://kgsaf.org/test/label> "tab\tquote\"back\\slash" .
+<http://kgsaf.org/test/b> <http://kgsaf.org/test/label> "ciao"@it .
+<http://kgsaf.org/test/b> <http://kgsaf.org/test/age> "42"^^<http://www.w3.org/2001/XMLSchema#integer> .
+<http://kgsaf.org/test/b>   <http://kgsaf.org/test/q>	<http://kgsaf.org/test/a>	. # trailing comment
+"""
+
+
+def reference_tsv(source: Path) -> str:
+    """Output of the original Graph-based TSV conversion"""
+    triples = Graph()
+    triples.parse(source)
+    return "".join(f"{str(s)}\t{str(p)}\t{str(o)}\n" for s, p, o in triples)
+
+
+def test_ntriples_to_tsv_matches_graph_conversion(tmp_path):
+    source = tmp_path / "triples.nt"
+    source.write_text(NTRIPLES * 50, encoding="utf-8")
+
+    count, unknown = ntriples_to_tsv(source, tmp_path / "triples.tsv")
+    lines = (tmp_path / "triples.tsv").read_text(encoding="utf-8").splitlines(keepends=True)
+
+    # Duplicate triples are kept, unlike in a Graph
+    assert count == len(lines) == 6 * 50 and not unknown
+    assert sorted(set(lines)) == sorted(reference_tsv(source).splitlines(keepends=True))
+
+    count, _ = ntriples_to_tsv(source, tmp_path / "parallel.tsv", workers=2, chunk_size=500)
+    assert count == 6 * 50
+    assert (tmp_path / "parallel.tsv").read_text(encoding="utf-8").splitlines(keepends=True) == lines
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["parallel.tsv", "triples.nt", "triples.tsv"]
+
+
+def test_ntriples_to_tsv_encodes_known_uris(tmp_path):
+    source = tmp_path / "triples.nt"
+    source.write_text(NTRIPLES, encoding="utf-8")
+    entity_to_id = {"http://kgsaf.org/test/a": 0, "http://kgsaf.org/test/b": 1}
+    relation_to_id = {"http://kgsaf.org/test/p": 0, "http://kgsaf.org/test/q": 1}
+
+    _, unknown = ntriples_to_tsv(
+        source, tmp_path / "triples.tsv", tmp_path / "ids.tsv", entity_to_id, relation_to_id
+    )
+
+    assert (tmp_path / "ids.tsv").read_text() == "0\t0\t1\n1\t1\t0\n"
+    assert unknown["http://kgsaf.org/test/label"] == 2
+
+    with pytest.raises(ValueError):
+        ntriples_to_tsv(source, tmp_path / "triples.tsv", tmp_path / "ids.tsv")
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+
+import torch
+
+from kgsaf_jdex.loaders.pytorch.dataset import INDEXES, KnowledgeGraph
+
+
+def test_indexes_are_built_on_first_query(synthetic_path):
+    kg = KnowledgeGraph(synthetic_path)
+    assert not kg._indexes and not kg._closures
+
+    for child, parent in kg.taxonomy.tolist()[:20]:
+        assert parent in kg.sup_classes(child).tolist()
+        assert child in kg.sub_classes(parent).tolist()
+    assert set(kg._indexes) == {"sup_classes", "sub_classes"}
+
+    for individual in kg.class_assertions[:20, 0].tolist():
+        expected = sorted(c for i, c in kg.class_assertions.tolist() if i == individual)
+        assert sorted(kg.individual_classes(individual).tolist()) == expected
+
+    assert kg.taxonomy_closure.is_subclass(kg.taxonomy[:, 0], kg.taxonomy[:, 1]).all()
+    assert set(kg._closures) == {"taxonomy"}
+
+
+def test_build_indexes_at_construction(synthetic_path):
+    kg = KnowledgeGraph(synthetic_path, build_indexes=True)
+    assert set(kg._indexes) == set(INDEXES)
+    assert set(kg._closures) == {"taxonomy", "obj_prop_hierarchy"}
+
+
+def test_filtered_evaluation_queries(synthetic_path):
+    kg = KnowledgeGraph(synthetic_path)
+    known = set(map(tuple, torch.cat([kg.train, kg.valid, kg.test]).tolist()))
+
+    queries = torch.cat([kg.test[:10], kg.test[:10, [2, 1, 0]]])
+    assert kg.contains(queries).tolist() == [tuple(q) in known for q in queries.tolist()]
+
+    mask = kg.filter_mask(queries[:, 0], queries[:, 1], None)
+    assert mask.shape == (len(queries), kg.num_individuals)
+    assert mask.tolist() == [
+        [(h, r, t) in known for t in range(kg.num_individuals)] for h, r, _ in queries.tolist()
+    ]
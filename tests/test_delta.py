@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+
+import pickle
+
+import torch
+
+import kgsaf_jdex.utils.conventions.paths as pc
+from kgsaf_jdex.loaders.pytorch.dataset import KnowledgeGraph
+
+
+def test_append_with_stale_cache_keeps_views_valid(synthetic_path):
+    kg = KnowledgeGraph(synthetic_path)
+    num_triples = len(kg.train)
+    subject = kg.individuals.decode(kg.train[:1, 0])[0]
+    obj_prop = kg.obj_props.decode(kg.train[:1, 1])[0]
+
+    # Rewriting the split makes its cached tensor stale, so the delta is not appended to it
+    with open(synthetic_path / pc.TRAIN, "r") as f:
+        lines = f.readlines()
+    with open(synthetic_path / pc.TRAIN, "w") as f:
+        f.writelines(lines[:-1])
+
+    kg.append(train=[(subject, obj_prop, "http://kgsaf.org/test/new")])
+    assert len(kg.train) == num_triples + 1
+
+    dataset = pickle.loads(pickle.dumps(kg.dataset("train")))
+    assert len(dataset) == num_triples + 1
+    assert torch.equal(dataset[num_triples], kg.train[-1])
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+
+import os
+
+from rdflib import URIRef
+
+import kgsaf_jdex.utils.conventions.paths as pc
+import kgsaf_jdex.utils.graph_cache as graph_cache
+from kgsaf_jdex.utils.conversion import OWLConverter
+from kgsaf_jdex.utils.graph_cache import GraphCache, parse_graph
+from kgsaf_jdex.utils.synthetic import SyntheticDataset
+
+
+def _dataset(tmp_path):
+    return SyntheticDataset(500, num_classes=10, num_obj_props=5).generate(tmp_path / "synthetic")
+
+
+def test_converter_cache_is_opt_in(tmp_path):
+    path = _dataset(tmp_path)
+    OWLConverter(path).preprocess(verbose=False)
+    assert not (path / pc.GRAPH_CACHE).exists()
+
+    OWLConverter(path, cache=True).preprocess(verbose=False)
+    assert any((path / pc.GRAPH_CACHE).glob("*.bin"))
+
+
+def test_unchanged_sources_are_not_hashed_again(tmp_path, monkeypatch):
+    path = _dataset(tmp_path)
+    source = path / pc.RDF_TAXONOMY
+    hashed = []
+    file_hash = graph_cache.file_hash
+    monkeypatch.setattr(graph_cache, "file_hash", lambda p: hashed.append(p) or file_hash(p))
+
+    GraphCache(path / pc.GRAPH_CACHE).snapshot(source)
+    GraphCache(path / pc.GRAPH_CACHE).snapshot(source)
+    assert len(hashed) == 1
+
+    # Same size, new content and mtime: hashed and parsed again
+    content = source.read_text()
+    source.write_text(content.replace("class/C1\"", "class/C9\"", 1))
+    stat = source.stat()
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    snapshot = GraphCache(path / pc.GRAPH_CACHE).snapshot(source)
+    assert len(hashed) == 2
+    assert URIRef("http://kgsaf.org/synthetic/class/C9") in set(snapshot.subjects())
+    assert len(snapshot) == len(parse_graph(source))
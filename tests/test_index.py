@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+
+import torch
+
+from kgsaf_jdex.loaders.pytorch.index import ANY, KnownTripleIndex, TriplePatternIndex
+
+NUM_ENTITIES = 30
+NUM_RELATIONS = 4
+
+
+def random_triples(num_triples: int, seed: int) -> torch.Tensor:
+    generator = torch.Generator().manual_seed(seed)
+    return torch.stack(
+        [
+            torch.randint(NUM_ENTITIES, (num_triples,), generator=generator),
+            torch.randint(NUM_RELATIONS, (num_triples,), generator=generator),
+            torch.randint(NUM_ENTITIES, (num_triples,), generator=generator),
+        ],
+        dim=1,
+    )
+
+
+def as_set(triples: torch.Tensor) -> set:
+    return set(map(tuple, triples.tolist()))
+
+
+def test_known_triples_match_set():
+    triples = random_triples(500, seed=0)
+    known = as_set(triples)
+    index = KnownTripleIndex(triples, NUM_ENTITIES, NUM_RELATIONS)
+
+    assert len(index) == len(known)
+    assert as_set(index.triples) == known
+
+    queries = torch.cat([random_triples(500, seed=1), triples[:50], torch.tensor([[-1, 0, 0], [0, 0, NUM_ENTITIES]])])
+    assert index.contains(queries).tolist() == [tuple(q) in known for q in queries.tolist()]
+
+
+def test_filter_mask_matches_set():
+    triples = random_triples(500, seed=0)
+    known = as_set(triples)
+    index = KnownTripleIndex(triples, NUM_ENTITIES, NUM_RELATIONS)
+
+    queries = random_triples(40, seed=2)
+    heads, relations, tails = queries.unbind(dim=1)
+    entities = range(NUM_ENTITIES)
+
+    tail_mask = index.filter_mask(heads, relations, None)
+    assert tail_mask.tolist() == [[(h, r, t) in known for t in entities] for h, r, _ in queries.tolist()]
+
+    head_mask = index.filter_mask(None, relations, tails)
+    assert head_mask.tolist() == [[(h, r, t) in known for h in entities] for _, r, t in queries.tolist()]
+
+    candidates = torch.randint(NUM_ENTITIES, (40, 7), generator=torch.Generator().manual_seed(3))
+    assert index.filter_mask(heads, relations, candidates).tolist() == [
+        [(h, r, t) in known for t in row] for h, r, row in zip(heads.tolist(), relations.tolist(), candidates.tolist())
+    ]
+    assert index.filter_mask(candidates, relations, tails).tolist() == [
+        [(h, r, t) in known for h in row] for row, r, t in zip(candidates.tolist(), relations.tolist(), tails.tolist())
+    ]
+
+
+def test_extended_known_triples():
+    triples = random_triples(300, seed=0)
+    index = KnownTripleIndex(triples, NUM_ENTITIES, NUM_RELATIONS)
+    new = torch.tensor([[NUM_ENTITIES, NUM_RELATIONS, 0], [1, 1, 1]])
+
+    extended = index.extend(new, NUM_ENTITIES + 1, NUM_RELATIONS + 1)
+    assert as_set(extended.triples) == as_set(triples) | as_set(new)
+    assert torch.equal(extended.keys, torch.sort(extended.keys).values)
+
+
+def test_pattern_match_matches_set():
+    triples = random_triples(500, seed=0)
+    known = as_set(triples)
+    index = TriplePatternIndex(triples, NUM_ENTITIES, NUM_RELATIONS)
+    assert len(index) == len(known)
+
+    # Every combination of bound positions, with out of range IDs
+    generator = torch.Generator().manual_seed(4)
+    patterns = torch.cat([random_triples(16, seed=5 + i) for i in range(8)])
+    for i in range(8):
+        for column in range(3):
+            if not i & (4 >> column):
+                patterns[16 * i : 16 * (i + 1), column] = ANY
+    patterns = torch.cat([patterns, torch.tensor([[NUM_ENTITIES, ANY, ANY], [ANY, NUM_RELATIONS, 0]])])
+    patterns = patterns[torch.randperm(len(patterns), generator=generator)]
+
+    values, offsets = index.match(patterns)
+    assert torch.equal(index.count(patterns), offsets.diff())
+    for i, pattern in enumerate(patterns.tolist()):
+        expected = {t for t in known if all(p == ANY or p == v for p, v in zip(pattern, t))}
+        matches = values[offsets[i] : offsets[i + 1]].tolist()
+        assert len(matches) == len(expected) and set(map(tuple, matches)) == expected
+
+
+def test_extended_and_restored_pattern_index():
+    triples = random_triples(300, seed=0)
+    index = TriplePatternIndex(triples, NUM_ENTITIES, NUM_RELATIONS)
+    restored = TriplePatternIndex(None, NUM_ENTITIES, NUM_RELATIONS, index.arrays)
+    new = torch.tensor([[NUM_ENTITIES, NUM_RELATIONS, 0], [0, NUM_RELATIONS, NUM_ENTITIES]])
+
+    extended = restored.extend(new, NUM_ENTITIES + 1, NUM_RELATIONS + 1)
+    rebuilt = TriplePatternIndex(torch.cat([triples, new]), NUM_ENTITIES + 1, NUM_RELATIONS + 1)
+    for name, array in rebuilt.arrays.items():
+        assert torch.equal(extended.arrays[name], array)
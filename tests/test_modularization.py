@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+
+import random
+
+import pytest
+from rdflib import OWL, RDF, RDFS, BNode, Graph, Literal, Namespace, URIRef
+
+from kgsaf_jdex.utils.conventions.builtins import BUILTIN_URIS
+from kgsaf_jdex.utils.modularization import SchemaDecomposer, SignatureModularizer
+
+EX = Namespace("http://example.org/")
+
+
+def random_schema(seed: int) -> Graph:
+    """Schema with classes, properties, untyped resources and blank node chains, with cycles"""
+    rng = random.Random(seed)
+    graph = Graph()
+    classes = [EX[f"C{i}"] for i in range(30)]
+    props = [EX[f"p{i}"] for i in range(10)]
+    others = [EX[f"x{i}"] for i in range(10)]
+    for c in classes:
+        graph.add((c, RDF.type, OWL.Class))
+    for p in props:
+        graph.add((p, RDF.type, rng.choice([OWL.ObjectProperty, OWL.DatatypeProperty])))
+        graph.add((p, RDFS.domain, rng.choice(classes)))
+    for _ in range(80):
+        graph.add((rng.choice(classes), RDFS.subClassOf, rng.choice(classes + others)))
+    for _ in range(20):
+        restriction = BNode()
+        graph.add((rng.choice(classes), RDFS.subClassOf, restriction))
+        graph.add((restriction, OWL.onProperty, rng.choice(props)))
+        graph.add((restriction, OWL.someValuesFrom, rng.choice(classes)))
+    for x in others:
+        graph.add((x, RDFS.seeAlso, rng.choice(classes)))
+    for _ in range(10):
+        union = BNode()
+        graph.add((rng.choice(classes), OWL.equivalentClass, union))
+        graph.add((union, RDF.type, OWL.Class))
+        graph.add((union, OWL.unionOf, rng.choice(classes)))
+        graph.add((rng.choice(classes), OWL.disjointWith, rng.choice(classes)))
+        graph.add((rng.choice(props), RDFS.subPropertyOf, rng.choice(props)))
+    for c in classes[:5]:
+        graph.add((c, RDFS.label, Literal(f"class {c}")))
+    return graph
+
+
+def reference_module(schema: Graph, seed) -> Graph:
+    """Module extraction of the original, unindexed modularizer"""
+    extracted_graph = Graph()
+    elem_to_process = set(seed)
+    processed = set()
+    while elem_to_process:
+        e = elem_to_process.pop()
+        processed.add(e)
+        for s, p, o in schema.triples((e, None, None)):
+            extracted_graph.add((s, p, o))
+            if o not in BUILTIN_URIS and o not in processed:
+                if isinstance(o, BNode) or any(
+                    (o, RDF.type, t) in schema for t in (OWL.Class, OWL.ObjectProperty, OWL.DatatypeProperty)
+                ):
+                    elem_to_process.add(o)
+    return extracted_graph
+
+
+def reference_description(schema: Graph, elem) -> Graph:
+    """Description extraction of the original, unindexed decomposer"""
+    extracted_graph = Graph()
+    elem_to_process = {elem}
+    processed = set()
+    while elem_to_process:
+        e = elem_to_process.pop()
+        processed.add(e)
+        for s, p, o in schema.triples((e, None, None)):
+            extracted_graph.add((s, p, o))
+            if o not in BUILTIN_URIS and o not in processed:
+                if isinstance(o, BNode):
+                    elem_to_process.add(o)
+                for t in (OWL.Class, OWL.ObjectProperty, OWL.DatatypeProperty):
+                    if (o, RDF.type, t) in schema:
+                        extracted_graph.add((o, RDF.type, t))
+    return extracted_graph
+
+
+def reference_decomposition(schema: Graph):
+    """RBox, taxonomy and class definitions of the original, unindexed decomposer"""
+    rbox, taxonomy, definitions = Graph(), Graph(), Graph()
+    for prop_type in (OWL.ObjectProperty, OWL.DatatypeProperty):
+        for prop in set(schema.subjects(RDF.type, prop_type)) - BUILTIN_URIS:
+            rbox += reference_description(schema, prop)
+
+    for c in set(schema.subjects(RDF.type, OWL.Class)) - BUILTIN_URIS:
+        for s, p, o in schema.triples((c, None, None)):
+            if p == RDFS.subClassOf:
+                taxonomy.add((s, p, o))
+                if isinstance(o, BNode):
+                    taxonomy += reference_description(schema, o)
+            elif not isinstance(c, BNode):
+                definitions.add((s, p, o))
+                for elem in schema.objects(o, RDF.type):
+                    definitions.add((o, RDF.type, elem))
+                if isinstance(o, BNode):
+                    definitions += reference_description(schema, o)
+    return rbox, taxonomy, definitions
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_modules_match_reference(seed):
+    schema = random_schema(seed)
+    rng = random.Random(seed)
+    subjects = sorted(set(schema.subjects()) - set(schema.subjects(predicate=OWL.onProperty)))
+    signatures = [set(rng.sample(subjects, k)) for k in (1, 2, 5)] + [{EX.missing, EX.C0}]
+
+    modules = SignatureModularizer(schema).modularize_many(signatures)
+
+    for signature, module in zip(signatures, modules):
+        assert set(module) == set(reference_module(schema, signature))
+
+
+def test_modularize_without_signature():
+    with pytest.raises(ValueError):
+        SignatureModularizer(random_schema(0)).modularize(verbose=False)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_decomposition_matches_reference(seed):
+    schema = random_schema(seed)
+    decomposition = SchemaDecomposer(schema).decompose(verbose=False)
+
+    for graph, reference in zip(decomposition, reference_decomposition(schema)):
+        assert set(graph) == set(reference)
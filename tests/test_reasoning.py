@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+
+import json
+
+import torch
+from rdflib import OWL
+
+import kgsaf_jdex.utils.conventions.paths as pc
+from kgsaf_jdex.loaders.pytorch.dataset import KnowledgeGraph
+from kgsaf_jdex.loaders.pytorch.reasoning import Materializer
+
+
+def _materialize_with_domain(path, obj_prop, domain):
+    with open(path / pc.OBJ_PROP_DOMAIN_RANGE, "r") as f:
+        data = json.load(f)
+    data[obj_prop]["domain"] = domain
+    with open(path / pc.OBJ_PROP_DOMAIN_RANGE, "w") as f:
+        json.dump(data, f)
+
+    kg = KnowledgeGraph(path, cache=False)
+    class_assertions, _ = Materializer(kg).materialize()
+    return kg, class_assertions
+
+
+def test_union_domain_is_not_asserted(synthetic_path):
+    kg = KnowledgeGraph(synthetic_path, cache=False)
+    obj_prop = kg.obj_props.decode(kg.train[:1, 1])[0]
+    first, second = kg.classes.decode(torch.tensor([kg.num_classes - 2, kg.num_classes - 1]))
+
+    _, single = _materialize_with_domain(synthetic_path, obj_prop, [first])
+    _, thing = _materialize_with_domain(synthetic_path, obj_prop, [str(OWL.Thing)])
+    kg, union = _materialize_with_domain(synthetic_path, obj_prop, [{str(OWL.unionOf): [first, second]}])
+
+    assert sorted(kg.obj_prop_domain(kg.obj_props[obj_prop]).tolist()) == [kg.num_classes - 2, kg.num_classes - 1]
+    assert len(single) > len(thing)
+    assert torch.equal(union, thing)
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+import torch
+
+from kgsaf_jdex.loaders.pytorch.dataset import KnowledgeGraph
+from kgsaf_jdex.loaders.pytorch.splitting import DROPPED, SPLIT_FILES, SPLITS, TripleSplitter, main
+
+NUM_ENTITIES = 200
+
+
+def leaking_triples() -> torch.Tensor:
+    """Random triples of relations 0-3, relation 4 inverse of 0 on fewer pairs, relation 5
+    duplicate of 1 on fewer pairs, relation 6 with a single triple, plus duplicate triples"""
+    generator = torch.Generator().manual_seed(0)
+    triples = torch.stack(
+        [
+            torch.randint(NUM_ENTITIES, (2000,), generator=generator),
+            torch.randint(4, (2000,), generator=generator),
+            torch.randint(NUM_ENTITIES, (2000,), generator=generator),
+        ],
+        dim=1,
+    )
+    triples = torch.unique(triples, dim=0)
+    triples = triples[torch.randperm(len(triples), generator=generator)]
+    base = triples[triples[:, 1] == 0]
+    inverse = torch.stack([base[:-1, 2], torch.full_like(base[:-1, 1], 4), base[:-1, 0]], dim=1)
+    duplicate = triples[triples[:, 1] == 1][:-1].clone()
+    duplicate[:, 1] = 5
+    return torch.cat([triples, inverse, duplicate, torch.tensor([[0, 6, 1]]), triples[:10]])
+
+
+def test_split_cleaning():
+    triples = leaking_triples()
+    splitter = TripleSplitter(seed=0)
+    labels = splitter.split(triples)
+
+    assert splitter.leaking_relations.tolist() == [4, 5]
+    kept = labels != DROPPED
+    assert set(triples[kept, 1].tolist()) == {0, 1, 2, 3}
+    assert not kept[-10:].any() and kept[:10].all()
+    assert len(torch.unique(triples[kept], dim=0)) == int(kept.sum())
+
+
+def test_split_coverage_and_ratios():
+    triples = leaking_triples()
+    labels = TripleSplitter(seed=1).split(triples)
+    splits = TripleSplitter.splits(triples, labels)
+
+    train = splits["train"]
+    train_entities = set(train[:, [0, 2]].flatten().tolist())
+    for split in SPLITS[1:]:
+        assert set(splits[split][:, [0, 2]].flatten().tolist()) <= train_entities
+        assert set(splits[split][:, 1].tolist()) <= set(train[:, 1].tolist())
+        assert abs(len(splits[split]) - 0.08 * int((labels != DROPPED).sum())) <= 1
+
+    # Triples keep their input order in every split, the same seed gives the same split
+    positions = (labels == 0).nonzero().flatten()
+    assert torch.equal(train, triples[positions])
+    assert torch.equal(TripleSplitter(seed=1).split(triples), labels)
+    assert not torch.equal(TripleSplitter(seed=2).split(triples), labels)
+
+
+def test_split_dataset_cli(synthetic_path, tmp_path):
+    output = tmp_path / "resplit"
+    main([str(synthetic_path), "--output", str(output), "--seed", "3"])
+
+    kg = KnowledgeGraph(synthetic_path)
+    resplit = {
+        split: [line.split("\t") for line in (output / split_file).read_text().splitlines()]
+        for split, split_file in zip(SPLITS, SPLIT_FILES)
+    }
+    train_entities = {term for h, _, t in resplit["train"] for term in (h, t)}
+    for split in SPLITS[1:]:
+        assert resplit[split]
+        assert {term for h, _, t in resplit[split] for term in (h, t)} <= train_entities
+    assert sum(map(len, resplit.values())) <= len(kg.triples)
@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+
+import torch
+
+from kgsaf_jdex.loaders.pytorch.dataset import KnowledgeGraph
+from kgsaf_jdex.loaders.pytorch.validation import ABoxValidator
+from kgsaf_jdex.utils.synthetic import SyntheticDataset
+
+
+def test_triples_are_distinct():
+    dataset = SyntheticDataset(20000, num_individuals=500, num_classes=10, num_obj_props=5, seed=3)
+    triples = torch.cat([triples for triples, _ in dataset.triples(chunk_size=4096)])
+    assert len(triples) == 20000
+    assert len(torch.unique(triples, dim=0)) == 20000
+
+
+def test_splits_have_no_duplicates_or_leaks(synthetic_path):
+    report = ABoxValidator(KnowledgeGraph(synthetic_path)).validate()
+    counts = report.counts
+    assert all(counts[split]["duplicate"] == 0 and counts[split]["leaked"] == 0 for split in counts)
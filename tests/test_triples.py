@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+import pytest
+import torch
+
+from kgsaf_jdex.loaders.pytorch.triples import (
+    byte_ranges,
+    count_lines,
+    load_triples,
+    load_triples_concurrently,
+    read_range,
+)
+
+ENTITIES = [f"http://kgsaf.org/test/e{i}" for i in range(50)] + [
+    "http://kgsaf.org/test/with space",
+    "http://kgsaf.org/test/caffè",
+    "http://kgsaf.org/test/line\u2028separator",
+]
+RELATIONS = [f"http://kgsaf.org/test/r{i}" for i in range(5)]
+
+
+@pytest.fixture
+def mappings():
+    return {uri: i for i, uri in enumerate(ENTITIES)}, {uri: i for i, uri in enumerate(RELATIONS)}
+
+
+def write_triples(path, num_triples: int, seed: int = 0, newline: str = "\n"):
+    generator = torch.Generator().manual_seed(seed)
+    h = torch.randint(len(ENTITIES), (num_triples,), generator=generator).tolist()
+    r = torch.randint(len(RELATIONS), (num_triples,), generator=generator).tolist()
+    t = torch.randint(len(ENTITIES), (num_triples,), generator=generator).tolist()
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.writelines(f"{ENTITIES[a]}\t{RELATIONS[b]}\t{ENTITIES[c]}{newline}" for a, b, c in zip(h, r, t))
+    return torch.tensor([h, r, t]).T
+
+
+def test_byte_ranges_cover_every_line(tmp_path):
+    write_triples(tmp_path / "triples.tsv", 1000)
+    content = (tmp_path / "triples.tsv").read_bytes()
+
+    ranges = byte_ranges(tmp_path / "triples.tsv", range_size=997)
+    assert len(ranges) > 1
+    chunks = [chunk for start, end in ranges for chunk in read_range(tmp_path / "triples.tsv", start, end, 100)]
+    assert b"".join(chunks) == content
+    assert sum(count_lines(tmp_path / "triples.tsv", start, end) for start, end in ranges) == 1000
+
+
+def test_fields_are_split_on_tabs_only(tmp_path, mappings):
+    expected = write_triples(tmp_path / "triples.tsv", 1000, newline="\r\n")
+    with open(tmp_path / "triples.tsv", "a", encoding="utf-8") as f:
+        f.write("\n   \nhttp://kgsaf.org/test/e0\thttp://kgsaf.org/test/r0\thttp://kgsaf.org/test/unknown")
+
+    # Small chunks, so that the blank lines fall back to line by line splitting of the last one
+    triples, unknown = load_triples(tmp_path / "triples.tsv", *mappings, chunk_size=1000)
+    assert torch.equal(triples, expected)
+    assert unknown == {"http://kgsaf.org/test/unknown": 1}
+
+    with open(tmp_path / "triples.tsv", "a", encoding="utf-8") as f:
+        f.write("\nhttp://kgsaf.org/test/e0 http://kgsaf.org/test/r0 http://kgsaf.org/test/e1\n")
+    with pytest.raises(ValueError):
+        load_triples(tmp_path / "triples.tsv", *mappings)
+
+
+def test_concurrent_loading_matches_sequential(tmp_path, mappings):
+    paths = {name: tmp_path / f"{name}.tsv" for name in ("train", "valid", "test")}
+    expected = {name: write_triples(path, 2000, seed=i) for i, (name, path) in enumerate(paths.items())}
+
+    for workers in (1, 2):
+        loaded = load_triples_concurrently(paths, *mappings, workers=workers, range_size=4096)
+        assert list(loaded) == list(paths)
+        for name, (triples, unknown) in loaded.items():
+            assert torch.equal(triples, expected[name]) and not unknown
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+
+import pytest
+import torch
+
+from kgsaf_jdex.loaders.pytorch.dataset import KnowledgeGraph
+
+
+@pytest.mark.parametrize("num_workers, persistent_workers", [(0, False), (2, False), (2, True)])
+def test_iterable_loader_reshuffles_every_pass(synthetic_path, num_workers, persistent_workers):
+    kg = KnowledgeGraph(synthetic_path)
+    loader = kg.loader(
+        batch_size=64,
+        iterable=True,
+        seed=1,
+        num_workers=num_workers,
+        persistent_workers=persistent_workers,
+    )
+
+    passes = [torch.cat(list(loader)) for _ in range(3)]
+    for triples in passes:
+        assert torch.equal(torch.unique(triples, dim=0), torch.unique(kg.train, dim=0))
+        assert len(triples) == len(kg.train)
+    assert not torch.equal(passes[0], passes[1])
+    assert not torch.equal(passes[1], passes[2])
+
+    again = kg.loader(batch_size=64, iterable=True, seed=1, num_workers=num_workers, persistent_workers=persistent_workers)
+    assert torch.equal(torch.cat(list(again)), passes[0])
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+import zlib
+
+import torch
+
+from kgsaf_jdex.loaders.pytorch.dataset import KnowledgeGraph
+from kgsaf_jdex.loaders.pytorch.triples import UNKNOWN_ID
+from kgsaf_jdex.loaders.pytorch.vocabulary import ExtendedVocabulary, Vocabulary
+
+# Two URIs with the same CRC32, so the same table slot, and different Adler-32
+COLLIDING = ["http://kgsaf.org/test/plumless", "http://kgsaf.org/test/buckeroo"]
+
+
+def test_round_trip():
+    mapping = {f"http://kgsaf.org/test/{i}": i for i in range(1000)}
+    mapping["http://kgsaf.org/test/caffè"] = 1000
+    vocabulary = Vocabulary.from_mapping(mapping)
+
+    uris = list(mapping)
+    assert vocabulary.encode(uris).tolist() == list(mapping.values())
+    assert vocabulary.decode(torch.tensor(list(mapping.values()))) == uris
+    assert [vocabulary[uri] for uri in uris] == list(mapping.values())
+    assert vocabulary.num_ids == 1001
+
+    assert vocabulary.encode(["http://kgsaf.org/test/missing"]).tolist() == [UNKNOWN_ID]
+    assert vocabulary.decode(torch.tensor([-5, 1001])) == [None, None]
+    assert "http://kgsaf.org/test/missing" not in vocabulary
+
+
+def test_colliding_uris():
+    assert zlib.crc32(COLLIDING[0].encode()) == zlib.crc32(COLLIDING[1].encode())
+
+    vocabulary = Vocabulary.from_mapping({COLLIDING[0]: 0, COLLIDING[1]: 1})
+    assert vocabulary.encode(COLLIDING).tolist() == [0, 1]
+    assert [vocabulary.position(uri) for uri in COLLIDING] == [0, 1]
+
+    # The second URI probes past the slot of the first one when it is missing
+    vocabulary = Vocabulary.from_mapping({COLLIDING[0]: 0})
+    assert vocabulary.encode(COLLIDING).tolist() == [0, UNKNOWN_ID]
+    assert COLLIDING[1] not in vocabulary
+
+
+def test_aliases_decode_to_last_uri():
+    vocabulary = Vocabulary.from_mapping({"a": -1, "b": 0, "c": -1})
+    assert vocabulary.encode(["a", "b", "c"]).tolist() == [-1, 0, -1]
+    assert vocabulary.decode(torch.tensor([-1, 0])) == ["c", "b"]
+
+
+def test_empty_and_extended():
+    empty = Vocabulary.from_mapping({})
+    assert len(empty) == 0 and empty.num_ids == 0
+    assert empty.encode(["a"]).tolist() == [UNKNOWN_ID]
+    assert empty.decode(torch.tensor([0])) == [None]
+
+    extended = ExtendedVocabulary(
+        Vocabulary.from_mapping({"a": 0, "b": 1}), Vocabulary.from_mapping({"c": 2})
+    )
+    assert extended.encode(["a", "c", "d"]).tolist() == [0, 2, UNKNOWN_ID]
+    assert extended.decode(torch.tensor([1, 2, 3])) == ["b", "c", None]
+    assert len(extended) == 3 and extended.num_ids == 3
+
+
+def test_cached_vocabulary_matches(synthetic_path):
+    built = KnowledgeGraph(synthetic_path).individuals
+    mapped = KnowledgeGraph(synthetic_path).individuals
+    assert not isinstance(mapped.blob, bytes)
+
+    ids = torch.arange(built.num_ids)
+    uris = built.decode(ids)
+    assert mapped.decode(ids) == uris
+    assert torch.equal(mapped.encode(uris), ids)